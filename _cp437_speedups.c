@@ -0,0 +1,520 @@
+/*
+ * _cp437_speedups - Compiled CP437 decoding, tokenizing and encoding.
+ *
+ * The same walk as cp437_tokens.tokenize_into (CSI, OSC and charset
+ * scanning included), a text-only decode that builds the string without
+ * tokens, and a table-driven encoder. cp437_speedups selects this module
+ * when it is built and falls back to the Python code when it is not; the
+ * two must give identical results, which the test suite checks by running
+ * the codec tests against both.
+ *
+ * Build in place with:  python3 setup.py build_ext --inplace
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <string.h>
+
+#define ESC 0x1B
+#define BEL 0x07
+
+/* The CSI and OSC length limits of cp437_tokens: a CSI has at most 97
+   bytes between ESC [ and its final byte, an OSC is abandoned after 200 */
+#define CSI_MAX_BODY 97
+#define CSI_GIVE_UP 100
+#define OSC_GIVE_UP 200
+
+/* Bytes CONTROL_PRESERVING_TABLE leaves as controls (NUL, BS, TAB, LF, CR):
+   with controls=True each one is a CONTROL token */
+static const unsigned char is_control[256] = {
+    [0x00] = 1, [0x08] = 1, [0x09] = 1, [0x0A] = 1, [0x0D] = 1,
+};
+
+/* Decoding/encoding data for one 256-character table, built on first use */
+typedef struct {
+    Py_UCS4 ch;
+    unsigned char byte;
+} HighEntry;
+
+typedef struct {
+    PyObject *table;          /* the str it was built from (strong ref) */
+    Py_UCS4 decode[256];
+    unsigned char low[256];   /* U+0000-U+00FF -> byte */
+    HighEntry high[256];      /* other table characters, sorted */
+    int nhigh;
+} Table;
+
+#define TABLE_CACHE_SIZE 4
+static Table table_cache[TABLE_CACHE_SIZE];
+static int table_cache_next = 0;
+
+static PyObject *kind_text, *kind_csi, *kind_osc, *kind_charset, *kind_control;
+
+static int
+high_entry_cmp(const void *a, const void *b)
+{
+    Py_UCS4 x = ((const HighEntry *)a)->ch, y = ((const HighEntry *)b)->ch;
+    return (x > y) - (x < y);
+}
+
+static Table *
+get_table(PyObject *table)
+{
+    int i, n;
+    Table *entry;
+    unsigned char seen_low[256];
+
+    for (i = 0; i < TABLE_CACHE_SIZE; i++) {
+        if (table_cache[i].table == table)
+            return &table_cache[i];
+    }
+    if (!PyUnicode_Check(table) || PyUnicode_GET_LENGTH(table) != 256) {
+        PyErr_SetString(PyExc_ValueError, "table must be a str of 256 characters");
+        return NULL;
+    }
+
+    entry = &table_cache[table_cache_next];
+    table_cache_next = (table_cache_next + 1) % TABLE_CACHE_SIZE;
+    Py_INCREF(table);
+    Py_XSETREF(entry->table, table);
+
+    entry->nhigh = 0;
+    memset(seen_low, 0, sizeof(seen_low));
+    /* Latin-1 fallback for characters the table does not have */
+    for (i = 0; i < 256; i++)
+        entry->low[i] = (unsigned char)i;
+    for (i = 0; i < 256; i++) {
+        Py_UCS4 ch = PyUnicode_READ_CHAR(table, i);
+        entry->decode[i] = ch;
+        /* The first (lowest) byte wins for duplicate glyphs */
+        if (ch < 256) {
+            if (!seen_low[ch]) {
+                seen_low[ch] = 1;
+                entry->low[ch] = (unsigned char)i;
+            }
+        }
+        else {
+            for (n = 0; n < entry->nhigh; n++) {
+                if (entry->high[n].ch == ch)
+                    break;
+            }
+            if (n == entry->nhigh) {
+                entry->high[n].ch = ch;
+                entry->high[n].byte = (unsigned char)i;
+                entry->nhigh++;
+            }
+        }
+    }
+    qsort(entry->high, entry->nhigh, sizeof(HighEntry), high_entry_cmp);
+    return entry;
+}
+
+/* What the scanner found; the sink turns it into tokens or text */
+enum { RUN_TEXT, RUN_CONTROL, RUN_CSI, RUN_OSC, RUN_CHARSET, RUN_ESC_GLYPHS };
+
+typedef struct {
+    Table *table;
+    Py_ssize_t offset;
+    PyObject *tokens;   /* tokenize_into: list to append to */
+    Py_UCS4 *out;       /* decode_text: output characters */
+    Py_ssize_t out_len;
+} Sink;
+
+static PyObject *
+run_text(Table *table, const unsigned char *data, Py_ssize_t s, Py_ssize_t e)
+{
+    Py_ssize_t k, n = e - s;
+    Py_UCS4 maxchar = 0;
+    PyObject *text;
+    int kind;
+    void *out;
+
+    for (k = s; k < e; k++) {
+        Py_UCS4 ch = table->decode[data[k]];
+        if (ch > maxchar)
+            maxchar = ch;
+    }
+    text = PyUnicode_New(n, maxchar);
+    if (text == NULL)
+        return NULL;
+    kind = PyUnicode_KIND(text);
+    out = PyUnicode_DATA(text);
+    for (k = 0; k < n; k++)
+        PyUnicode_WRITE(kind, out, k, table->decode[data[s + k]]);
+    return text;
+}
+
+static int
+emit_token(Sink *sink, PyObject *kind, PyObject *text, Py_ssize_t s, Py_ssize_t e)
+{
+    PyObject *token, *start, *end;
+    int result;
+
+    if (text == NULL)
+        return -1;
+    start = PyLong_FromSsize_t(s + sink->offset);
+    end = PyLong_FromSsize_t(e + sink->offset);
+    if (start == NULL || end == NULL) {
+        Py_DECREF(text);
+        Py_XDECREF(start);
+        Py_XDECREF(end);
+        return -1;
+    }
+    token = PyTuple_New(4);
+    if (token == NULL) {
+        Py_DECREF(text);
+        Py_DECREF(start);
+        Py_DECREF(end);
+        return -1;
+    }
+    Py_INCREF(kind);
+    PyTuple_SET_ITEM(token, 0, kind);
+    PyTuple_SET_ITEM(token, 1, text);
+    PyTuple_SET_ITEM(token, 2, start);
+    PyTuple_SET_ITEM(token, 3, end);
+    result = PyList_Append(sink->tokens, token);
+    Py_DECREF(token);
+    return result;
+}
+
+static int
+emit(Sink *sink, int what, const unsigned char *data, Py_ssize_t s, Py_ssize_t e)
+{
+    Table *table = sink->table;
+    Py_ssize_t k;
+
+    if (sink->tokens == NULL) {
+        /* Text only: escape sequences as latin-1, everything else mapped */
+        Py_UCS4 *out = sink->out + sink->out_len;
+        switch (what) {
+        case RUN_CSI:
+        case RUN_OSC:
+        case RUN_CHARSET:
+            for (k = s; k < e; k++)
+                *out++ = data[k];
+            break;
+        case RUN_ESC_GLYPHS:
+            for (k = s; k < e; k++)
+                *out++ = table->decode[ESC];
+            break;
+        default:
+            for (k = s; k < e; k++)
+                *out++ = table->decode[data[k]];
+        }
+        sink->out_len += e - s;
+        return 0;
+    }
+
+    switch (what) {
+    case RUN_TEXT:
+        return emit_token(sink, kind_text, run_text(table, data, s, e), s, e);
+    case RUN_CONTROL:
+        return emit_token(sink, kind_control, PyUnicode_FromOrdinal(table->decode[data[s]]), s, e);
+    case RUN_CSI:
+        return emit_token(sink, kind_csi, PyUnicode_DecodeLatin1((const char *)data + s, e - s, NULL), s, e);
+    case RUN_OSC:
+        return emit_token(sink, kind_osc, PyUnicode_DecodeLatin1((const char *)data + s, e - s, NULL), s, e);
+    case RUN_CHARSET:
+        return emit_token(sink, kind_charset, PyUnicode_DecodeLatin1((const char *)data + s, e - s, NULL), s, e);
+    default: {
+        /* ESC (and a malformed sequence's introducer) shown as ESC glyphs */
+        Py_UCS4 glyphs[2] = {table->decode[ESC], table->decode[ESC]};
+        return emit_token(sink, kind_text,
+                          PyUnicode_FromKindAndData(PyUnicode_4BYTE_KIND, glyphs, e - s), s, e);
+    }
+    }
+}
+
+/*
+ * Walk data[start:stop], sending runs to the sink. Returns the index the
+ * unfinished tail starts at (stop if there is none), or -1 on error.
+ */
+static Py_ssize_t
+scan(Sink *sink, const unsigned char *data, Py_ssize_t start, Py_ssize_t stop, int controls)
+{
+    Py_ssize_t i = start;
+
+    while (i < stop) {
+        const unsigned char *found = memchr(data + i, ESC, stop - i);
+        Py_ssize_t esc = found ? found - data : -1;
+        Py_ssize_t text_end = found ? esc : stop;
+        Py_ssize_t available, j, end;
+        unsigned char introducer;
+
+        if (text_end > i) {
+            if (controls) {
+                Py_ssize_t s = i, k;
+                for (k = i; k < text_end; k++) {
+                    if (is_control[data[k]]) {
+                        if (k > s && emit(sink, RUN_TEXT, data, s, k) < 0)
+                            return -1;
+                        if (emit(sink, RUN_CONTROL, data, k, k + 1) < 0)
+                            return -1;
+                        s = k + 1;
+                    }
+                }
+                if (text_end > s && emit(sink, RUN_TEXT, data, s, text_end) < 0)
+                    return -1;
+            }
+            else if (emit(sink, RUN_TEXT, data, i, text_end) < 0) {
+                return -1;
+            }
+        }
+        if (!found)
+            break;
+        i = esc;
+
+        available = stop - i;
+        if (available < 2)
+            return i;
+
+        introducer = data[i + 1];
+        if (introducer == '[') {
+            /* ESC [ - CSI: up to CSI_MAX_BODY bytes, then a final byte */
+            Py_ssize_t limit = i + 2 + CSI_MAX_BODY + 1;
+            if (limit > stop)
+                limit = stop;
+            end = 0;
+            for (j = i + 2; j < limit; j++) {
+                if (data[j] >= 0x40 && data[j] <= 0x7E) {
+                    end = j + 1;
+                    break;
+                }
+            }
+            if (end) {
+                if (emit(sink, RUN_CSI, data, i, end) < 0)
+                    return -1;
+                i = end;
+            }
+            else if (available >= CSI_GIVE_UP) {
+                if (emit(sink, RUN_ESC_GLYPHS, data, i, i + 2) < 0)
+                    return -1;
+                i += 2;
+            }
+            else {
+                return i;
+            }
+        }
+        else if (introducer == ']') {
+            /* ESC ] - OSC, ends with BEL or ESC \ */
+            Py_ssize_t bel_limit = i + OSC_GIVE_UP < stop ? i + OSC_GIVE_UP : stop;
+            Py_ssize_t st_limit = i + OSC_GIVE_UP + 1 < stop ? i + OSC_GIVE_UP + 1 : stop;
+            end = 0;
+            for (j = i + 2; j < st_limit; j++) {
+                if (data[j] == BEL && j < bel_limit) {
+                    end = j + 1;
+                    break;
+                }
+                if (data[j] == ESC && j + 1 < st_limit && data[j + 1] == '\\') {
+                    end = j + 2;
+                    break;
+                }
+            }
+            if (end) {
+                if (emit(sink, RUN_OSC, data, i, end) < 0)
+                    return -1;
+                i = end;
+            }
+            else if (available >= OSC_GIVE_UP) {
+                if (emit(sink, RUN_ESC_GLYPHS, data, i, i + 2) < 0)
+                    return -1;
+                i += 2;
+            }
+            else {
+                return i;
+            }
+        }
+        else if (introducer == '(' || introducer == ')' || introducer == '*' || introducer == '+') {
+            /* ESC ( ) * + - charset */
+            unsigned char final;
+            if (available < 3)
+                return i;
+            final = data[i + 2];
+            if (final == '0' || final == 'A' || final == 'B' || final == 'U') {
+                if (emit(sink, RUN_CHARSET, data, i, i + 3) < 0)
+                    return -1;
+                i += 3;
+            }
+            else {
+                if (emit(sink, RUN_ESC_GLYPHS, data, i, i + 2) < 0)
+                    return -1;
+                i += 2;
+            }
+        }
+        else {
+            /* Not a recognized sequence, map ESC as CP437 */
+            if (emit(sink, RUN_ESC_GLYPHS, data, i, i + 1) < 0)
+                return -1;
+            i += 1;
+        }
+    }
+    return stop;
+}
+
+static void
+clamp(Py_ssize_t length, Py_ssize_t *start, Py_ssize_t *stop)
+{
+    if (*stop > length)
+        *stop = length;
+    if (*start < 0)
+        *start = 0;
+    if (*start > *stop)
+        *start = *stop;
+}
+
+PyDoc_STRVAR(tokenize_into_doc,
+"tokenize_into(tokens, data, start, stop, controls, offset, table) -> int\n\n"
+"Append the tokens of data[start:stop] to tokens; return where the\n"
+"unfinished tail starts. See cp437_tokens.tokenize_into.");
+
+static PyObject *
+speedups_tokenize_into(PyObject *module, PyObject *args)
+{
+    PyObject *tokens, *table;
+    Py_buffer view;
+    Py_ssize_t start, stop, offset, index;
+    int controls;
+    Sink sink;
+
+    if (!PyArg_ParseTuple(args, "O!y*nnpnU:tokenize_into", &PyList_Type, &tokens,
+                          &view, &start, &stop, &controls, &offset, &table))
+        return NULL;
+    sink.table = get_table(table);
+    if (sink.table == NULL) {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+    sink.offset = offset;
+    sink.tokens = tokens;
+    sink.out = NULL;
+    sink.out_len = 0;
+    clamp(view.len, &start, &stop);
+    index = scan(&sink, (const unsigned char *)view.buf, start, stop, controls);
+    PyBuffer_Release(&view);
+    if (index < 0)
+        return NULL;
+    return PyLong_FromSsize_t(index);
+}
+
+PyDoc_STRVAR(decode_text_doc,
+"decode_text(data, start, stop, table) -> (str, int)\n\n"
+"The text of data[start:stop]'s tokens, built without the tokens, and\n"
+"where the unfinished tail starts.");
+
+static PyObject *
+speedups_decode_text(PyObject *module, PyObject *args)
+{
+    PyObject *table, *text;
+    Py_buffer view;
+    Py_ssize_t start, stop, index;
+    Sink sink;
+
+    if (!PyArg_ParseTuple(args, "y*nnU:decode_text", &view, &start, &stop, &table))
+        return NULL;
+    sink.table = get_table(table);
+    if (sink.table == NULL) {
+        PyBuffer_Release(&view);
+        return NULL;
+    }
+    clamp(view.len, &start, &stop);
+    sink.offset = 0;
+    sink.tokens = NULL;
+    sink.out_len = 0;
+    /* At most one character per byte */
+    sink.out = PyMem_New(Py_UCS4, stop - start + 1);
+    if (sink.out == NULL) {
+        PyBuffer_Release(&view);
+        return PyErr_NoMemory();
+    }
+    index = scan(&sink, (const unsigned char *)view.buf, start, stop, 0);
+    PyBuffer_Release(&view);
+    text = PyUnicode_FromKindAndData(PyUnicode_4BYTE_KIND, sink.out, sink.out_len);
+    PyMem_Free(sink.out);
+    if (text == NULL)
+        return NULL;
+    return Py_BuildValue("(Nn)", text, index);
+}
+
+PyDoc_STRVAR(encode_doc,
+"encode(text, table) -> bytes or None\n\n"
+"Encode text through the inverse of a decoding table (characters below\n"
+"U+0100 the table lacks encode as themselves). Returns None if any\n"
+"character has no byte, so the caller can apply its error handler.");
+
+static PyObject *
+speedups_encode(PyObject *module, PyObject *args)
+{
+    PyObject *text, *table, *result;
+    Table *entry;
+    Py_ssize_t k, n;
+    int kind;
+    const void *in;
+    char *out;
+
+    if (!PyArg_ParseTuple(args, "UU:encode", &text, &table))
+        return NULL;
+    entry = get_table(table);
+    if (entry == NULL)
+        return NULL;
+    n = PyUnicode_GET_LENGTH(text);
+    kind = PyUnicode_KIND(text);
+    in = PyUnicode_DATA(text);
+    result = PyBytes_FromStringAndSize(NULL, n);
+    if (result == NULL)
+        return NULL;
+    out = PyBytes_AS_STRING(result);
+    for (k = 0; k < n; k++) {
+        Py_UCS4 ch = PyUnicode_READ(kind, in, k);
+        if (ch < 256) {
+            out[k] = (char)entry->low[ch];
+        }
+        else {
+            int lo = 0, hi = entry->nhigh - 1;
+            while (lo <= hi) {
+                int mid = (lo + hi) / 2;
+                if (entry->high[mid].ch < ch)
+                    lo = mid + 1;
+                else if (entry->high[mid].ch > ch)
+                    hi = mid - 1;
+                else {
+                    out[k] = (char)entry->high[mid].byte;
+                    break;
+                }
+            }
+            if (lo > hi) {
+                Py_DECREF(result);
+                Py_RETURN_NONE;
+            }
+        }
+    }
+    return result;
+}
+
+static PyMethodDef speedups_methods[] = {
+    {"tokenize_into", speedups_tokenize_into, METH_VARARGS, tokenize_into_doc},
+    {"decode_text", speedups_decode_text, METH_VARARGS, decode_text_doc},
+    {"encode", speedups_encode, METH_VARARGS, encode_doc},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef speedups_module = {
+    PyModuleDef_HEAD_INIT,
+    "_cp437_speedups",
+    "Compiled CP437 decoding, tokenizing and encoding (see cp437_speedups).",
+    -1,
+    speedups_methods
+};
+
+PyMODINIT_FUNC
+PyInit__cp437_speedups(void)
+{
+    /* The same (interned) strings as cp437_tokens.TEXT, CSI, ... */
+    kind_text = PyUnicode_InternFromString("text");
+    kind_csi = PyUnicode_InternFromString("csi");
+    kind_osc = PyUnicode_InternFromString("osc");
+    kind_charset = PyUnicode_InternFromString("charset");
+    kind_control = PyUnicode_InternFromString("control");
+    if (!kind_text || !kind_csi || !kind_osc || !kind_charset || !kind_control)
+        return NULL;
+    return PyModule_Create(&speedups_module);
+}
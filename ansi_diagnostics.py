@@ -4,83 +4,225 @@ ANSI Compatibility Diagnostic Tool
 Analyzes telnet session logs for ANSI sequence issues.
 """
 
+import argparse
+import codecs
+import glob
+import json
+import os
 import re
 import sys
-from collections import defaultdict
-from typing import Dict, List, Tuple
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from cp437_screen import Screen
+
+# Longest token the tokenizer can match (an OSC body is capped at 200 chars).
+# Text within this distance of a chunk end is carried over to the next chunk.
+MAX_TOKEN_LENGTH = 256
+
+# One pass classifies every sequence and issue; the outermost named group of
+# the matching alternative tells which kind it is. The leading lookahead lets
+# the scan skip plain text without trying each alternative.
+_TOKEN = re.compile(
+    r'(?=[\x1b\r\n])'
+    r'(?:(?P<csi>\x1b\[(?P<params>[\x30-\x3f]{0,64})(?P<inter>[\x20-\x2f]{0,8})(?P<final>[\x40-\x7e]))'
+    r'|(?P<osc>\x1b\][^\x07\x1b]{0,200}(?:\x07|\x1b\\))'
+    r'|(?P<charset>\x1b[()*+][^\n])'
+    r'|(?P<incomplete_csi>\x1b\[[0-9;]{0,64}(?=\n|\Z))'
+    r'|(?P<orphaned_esc>\x1b(?![\[()\]*+\x07]))'
+    r'|(?P<cr_not_lf>\r(?![\n\x1b]))'
+    r'|(?P<control_then_text>\n(?=[a-zA-Z])))'
+)
+
+# Sequence statistics by CSI final character (numeric parameters only)
+_CSI_STATS = {
+    'A': 'Relative cursor moves', 'B': 'Relative cursor moves',
+    'C': 'Relative cursor moves', 'D': 'Relative cursor moves',
+    'E': 'Relative cursor moves', 'F': 'Relative cursor moves',
+    'H': 'Absolute positioning', 'f': 'Absolute positioning',
+    'J': 'Clear screen',
+    'K': 'Erase line',
+    'm': 'Color/SGR',
+}
+
+
+def _csi_label(final: str, params: str, inter: str) -> str:
+    """Statistics label for a CSI sequence, or None."""
+    label = _CSI_STATS.get(final)
+    if not label or inter or params.strip('0123456789;'):
+        return None
+    if label == 'Clear screen' and params != '2':
+        return None
+    if label == 'Erase line' and params not in ('', '0', '1', '2'):
+        return None
+    return label
+
+
+ISSUE_MESSAGES = {
+    'cr_not_lf': "Found {} CR not followed by LF or ESC",
+    'incomplete_csi': "Found {} potentially incomplete CSI sequences",
+    'control_then_text': "Found {} control chars directly followed by letters",
+    'orphaned_esc': "Found {} orphaned ESC characters",
+}
+
+_LETTERS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+CHUNK_SIZE = 1024 * 1024
+
 
 class ANSIDiagnostics:
-    """Analyze ANSI sequences in logged data."""
+    """
+    Analyze ANSI sequences in logged data.
+
+    The log is read in fixed-size chunks and tokenized in a single regex
+    pass; only counters and a bounded sample of issue locations are kept,
+    so memory use does not grow with the size of the log.
+    """
     
-    def __init__(self, log_file: str):
+    def __init__(self, log_file: str, chunk_size: int = CHUNK_SIZE, sample_limit: int = 10):
         self.log_file = log_file
-        self.sequences = []
-        self.issues = []
+        self.chunk_size = chunk_size
+        self.sample_limit = sample_limit
+        self.sequence_counts = Counter()  # CSI / OSC / Charset
         self.stats = defaultdict(int)
+        self.issues = Counter()  # Issue kind -> occurrences
+        self.samples = defaultdict(list)  # Issue kind -> [(line, offset)]
+        self.chars = 0
+        self.lines = 0
+        self.error = None
+        self._pending = ''
+    
+    @property
+    def sequence_total(self) -> int:
+        return sum(self.sequence_counts.values())
     
     def parse_log(self):
         """Parse log file and extract ANSI sequences."""
         try:
-            with open(self.log_file, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
+            self.analyze_range()
         except Exception as e:
             print(f"Error reading log: {e}")
             return
         
-        # Find all ANSI sequences
-        # CSI sequences: ESC [ ... (letter)
-        csi_pattern = r'\x1b\[([^a-zA-Z]*)[a-zA-Z]'
-        self.sequences.extend(re.finditer(csi_pattern, content))
-        
-        # OSC sequences: ESC ] ... (BEL or ESC\)
-        osc_pattern = r'\x1b\]([^\x07\x1b]*?)(?:\x07|\x1b\\)'
-        self.sequences.extend(re.finditer(osc_pattern, content))
-        
-        # Charset sequences: ESC ( or ESC ) ... 
-        charset_pattern = r'\x1b[\(\)\*\+].'
-        self.sequences.extend(re.finditer(charset_pattern, content))
-        
-        print(f"Found {len(self.sequences)} ANSI sequences")
-        
-        # Analyze sequence types
-        self._analyze_sequences(content)
-        self._check_issues(content)
+        print(f"Found {self.sequence_total} ANSI sequences")
     
-    def _analyze_sequences(self, content: str):
-        """Analyze types and frequency of sequences."""
-        cursor_moves = re.findall(r'\x1b\[[0-9;]*[ABCDEF]', content)
-        cursor_pos = re.findall(r'\x1b\[[0-9;]*[Hf]', content)
-        clear_screen = re.findall(r'\x1b\[2J', content)
-        erase_line = re.findall(r'\x1b\[[0-2]?K', content)
-        colors = re.findall(r'\x1b\[[0-9;]*m', content)
-        
-        self.stats['Relative cursor moves'] = len(cursor_moves)
-        self.stats['Absolute positioning'] = len(cursor_pos)
-        self.stats['Clear screen'] = len(clear_screen)
-        self.stats['Erase line'] = len(erase_line)
-        self.stats['Color/SGR'] = len(colors)
+    def analyze_range(self, start: int = 0, end: Optional[int] = None):
+        """
+        Analyze bytes [start, end) of the log. Tokens starting before end are
+        completed from the bytes that follow it, so adjacent ranges together
+        count every sequence exactly once.
+        """
+        # Bytes are decoded here rather than by a text-mode file so ranges can
+        # start at any byte offset and bare CRs stay visible to the CR checks
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        with open(self.log_file, 'rb') as f:
+            f.seek(start)
+            remaining = end - start if end is not None else None
+            while remaining is None or remaining > 0:
+                size = self.chunk_size if remaining is None else min(self.chunk_size, remaining)
+                chunk = f.read(size)
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                self.feed(decoder.decode(chunk))
+            text = decoder.decode(b'', final=True)
+            if text:
+                self.feed(text)
+            lookahead = f.read(MAX_TOKEN_LENGTH * 4) if end is not None else b''
+        self.finish(lookahead.decode('utf-8', errors='replace'))
     
-    def _check_issues(self, content: str):
-        """Check for common issues."""
-        # Issue 1: CR followed by non-LF
-        cr_not_lf = re.findall(r'\r(?![\n\x1b])', content)
-        if cr_not_lf:
-            self.issues.append(f"Found {len(cr_not_lf)} CR not followed by LF or ESC")
-        
-        # Issue 2: Incomplete sequences at packet boundaries
-        incomplete_csi = re.findall(r'\x1b\[([0-9;]*?)$', content, re.MULTILINE)
-        if incomplete_csi:
-            self.issues.append(f"Found {len(incomplete_csi)} potentially incomplete CSI sequences")
-        
-        # Issue 3: Text immediately after control codes (no space)
-        control_then_text = re.findall(r'[\x1b\r\n][a-zA-Z]', content)
-        if control_then_text:
-            self.issues.append(f"Found {len(control_then_text)} control chars directly followed by letters")
-        
-        # Issue 4: Orphaned ESC characters
-        orphaned_esc = re.findall(r'\x1b(?![\[\(\)\]\*\+\x07])', content)
-        if orphaned_esc:
-            self.issues.append(f"Found {len(orphaned_esc)} orphaned ESC characters")
+    def feed(self, text: str):
+        """Analyze the next piece of log text."""
+        buf = self._pending + text
+        # Tokens starting within MAX_TOKEN_LENGTH of the end might match
+        # differently once more text arrives, so they wait for the next chunk
+        self._scan(buf, len(buf) - MAX_TOKEN_LENGTH, final=False)
+    
+    def finish(self, lookahead: str = ''):
+        """
+        Analyze text held back at the end of the log. lookahead is text that
+        follows it (the start of the next range); it completes tokens but is
+        not counted itself.
+        """
+        self._scan(self._pending + lookahead, len(self._pending), final=True)
+    
+    def _scan(self, buf: str, limit: int, final: bool):
+        processed = 0
+        issues = self.issues
+        csi = {}  # (final, params, intermediates) -> count, classified below
+        for match in _TOKEN.finditer(buf):
+            start = match.start()
+            if start >= limit:
+                break
+            processed = match.end()
+            kind = match.lastgroup
+            if kind == 'csi':
+                key = match.group(4, 2, 3)
+                csi[key] = csi.get(key, 0) + 1
+                continue
+            if kind == 'osc':
+                self.sequence_counts['OSC'] += 1
+                continue
+            if kind == 'charset':
+                self.sequence_counts['Charset'] += 1
+                continue
+            issues[kind] += 1
+            if len(self.samples[kind]) < self.sample_limit:
+                self._sample(kind, buf, start)
+            if kind in ('orphaned_esc', 'cr_not_lf') and buf[processed:processed + 1] in _LETTERS:
+                # ESC/CR directly followed by a letter
+                issues['control_then_text'] += 1
+                if len(self.samples['control_then_text']) < self.sample_limit:
+                    self._sample('control_then_text', buf, start)
+
+        for (final_char, params, inter), count in csi.items():
+            self.sequence_counts['CSI'] += count
+            label = _csi_label(final_char, params, inter)
+            if label:
+                self.stats[label] += count
+
+        consumed = limit if final else max(processed, limit, 0)
+        self.chars += consumed
+        self.lines += buf.count('\n', 0, consumed)
+        self._pending = '' if final else buf[consumed:]
+    
+    def _sample(self, kind: str, buf: str, pos: int):
+        line = self.lines + buf.count('\n', 0, pos) + 1
+        self.samples[kind].append((line, self.chars + pos))
+    
+    def to_dict(self) -> dict:
+        """Counters and samples as plain JSON-serializable data."""
+        return {
+            'file': self.log_file,
+            'chars': self.chars,
+            'lines': self.lines,
+            'sequence_counts': dict(self.sequence_counts),
+            'stats': dict(self.stats),
+            'issues': dict(self.issues),
+            'samples': {kind: [list(location) for location in locations]
+                        for kind, locations in self.samples.items()},
+        }
+    
+    def merge(self, report: dict, follows: bool = True):
+        """
+        Add a to_dict() report into this one. With follows=True the report is
+        the next range of the same log: its sample locations are shifted past
+        the text counted so far and kept up to sample_limit. Reports from other
+        files only contribute counters.
+        """
+        self.sequence_counts.update(report['sequence_counts'])
+        for label, count in report['stats'].items():
+            self.stats[label] += count
+        self.issues.update(report['issues'])
+        if follows:
+            for kind, locations in report['samples'].items():
+                kept = self.samples[kind]
+                for line, offset in locations[:self.sample_limit - len(kept)]:
+                    kept.append((line + self.lines, offset + self.chars))
+        self.chars += report['chars']
+        self.lines += report['lines']
     
     def print_report(self):
         """Print diagnostic report."""
@@ -88,7 +230,7 @@ class ANSIDiagnostics:
         print("ANSI DIAGNOSTICS REPORT")
         print("="*60)
         
-        if not self.sequences:
+        if not self.sequence_total:
             print("No ANSI sequences found in log")
             return
         
@@ -98,8 +240,13 @@ class ANSIDiagnostics:
         
         if self.issues:
             print("\n⚠️  Issues Found:")
-            for issue in self.issues:
-                print(f"  - {issue}")
+            for kind, message in ISSUE_MESSAGES.items():
+                if self.issues[kind]:
+                    print(f"  - {message.format(self.issues[kind])}")
+                    if self.samples[kind]:
+                        locations = ", ".join(f"line {line} (offset {offset})"
+                                              for line, offset in self.samples[kind][:3])
+                        print(f"      first at {locations}")
         else:
             print("\n✓ No issues found")
         
@@ -107,94 +254,242 @@ class ANSIDiagnostics:
 
 
 class CursorTracker:
-    """Track cursor position changes throughout a session."""
-    
-    def __init__(self, log_file: str, width: int = 80, height: int = 24):
+    """
+    Track cursor position changes throughout a session.
+
+    The log is replayed through a Screen, so relative moves, CR/LF, wrapping
+    and scrolling are followed exactly; a jump is an absolute positioning
+    sequence that moves the cursor more than 100 cells from where it was.
+    """
+
+    def __init__(self, log_file: str, width: int = 80, height: int = 24,
+                 chunk_size: int = CHUNK_SIZE, sample_limit: int = 10):
         self.log_file = log_file
         self.width = width
         self.height = height
-        self.x = 1
-        self.y = 1
-        self.jumps = []
-        self.movements = []
-    
+        self.chunk_size = chunk_size
+        self.sample_limit = sample_limit
+        self.screen = Screen(width, height, on_position=self._on_position)
+        self.jumps = []  # the first sample_limit jumps
+        self.jump_count = 0
+        self.rapid_positions = 0
+        self.position_then_lf = 0
+
+    def _on_position(self, before: Tuple[int, int], after: Tuple[int, int]):
+        distance = abs((after[1] - before[1]) * self.width + (after[0] - before[0]))
+        if distance > 100:
+            self.jump_count += 1
+            if len(self.jumps) < self.sample_limit:
+                # Reported 1-based as (row, col), like the sequences themselves
+                self.jumps.append({
+                    'from': (before[1] + 1, before[0] + 1),
+                    'to': (after[1] + 1, after[0] + 1),
+                    'distance': distance
+                })
+
     def analyze(self):
         """Analyze cursor movements in log."""
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        pending = ''
         try:
-            with open(self.log_file, 'r', encoding='utf-8', errors='replace') as f:
-                content = f.read()
+            with open(self.log_file, 'rb') as f:
+                while True:
+                    chunk = f.read(self.chunk_size)
+                    text = decoder.decode(chunk, final=not chunk)
+                    self.screen.feed(text)
+                    # Pattern checks run on whole lines; none of them spans a line break
+                    pending += text
+                    cut = pending.rfind('\n') + 1 if chunk else len(pending)
+                    if cut:
+                        self._check_patterns(pending[:cut])
+                        pending = pending[cut:]
+                    if not chunk:
+                        break
         except Exception as e:
             print(f"Error reading log: {e}")
             return
-        
-        # Track cursor positioning
-        pos_pattern = r'\x1b\[(\d+)?(?:;(\d+))?[Hf]'
-        for match in re.finditer(pos_pattern, content):
-            row = int(match.group(1)) if match.group(1) else 1
-            col = int(match.group(2)) if match.group(2) else 1
-            
-            # Check if this is a huge jump
-            distance = abs((row - self.y) * self.width + (col - self.x))
-            if distance > 100:
-                self.jumps.append({
-                    'from': (self.y, self.x),
-                    'to': (row, col),
-                    'distance': distance
-                })
-            
-            self.x = col
-            self.y = row
-        
-        # Check for erratic movements
-        self._check_patterns(content)
-    
+
+        if self.rapid_positions:
+            print(f"⚠️  Found {self.rapid_positions} instances of 3+ rapid cursor positions")
+        if self.position_then_lf:
+            print(f"ℹ️  Found {self.position_then_lf} instances of positioning followed by LF (may be intentional)")
+
     def _check_patterns(self, content: str):
-        """Check for suspicious movement patterns."""
+        """Count suspicious movement patterns."""
         # Pattern: Multiple positioning in close sequence
-        rapid_pos = re.findall(r'(?:\x1b\[[0-9;]*[Hf]){3,}', content)
-        if rapid_pos:
-            print(f"⚠️  Found {len(rapid_pos)} instances of 3+ rapid cursor positions")
-        
+        self.rapid_positions += len(re.findall(r'(?:\x1b\[[0-9;]*[Hf]){3,}', content))
+
         # Pattern: Cursor moved, then LF (instead of newline + position)
-        pos_then_lf = re.findall(r'\x1b\[[0-9;]*[Hf]\x0a', content)
-        if pos_then_lf:
-            print(f"ℹ️  Found {len(pos_then_lf)} instances of positioning followed by LF (may be intentional)")
-    
-    def print_report(self):
+        self.position_then_lf += len(re.findall(r'\x1b\[[0-9;]*[Hf]\x0a', content))
+
+    def print_report(self, screenshot: bool = False):
         """Print cursor tracking report."""
         print("\n" + "="*60)
         print("CURSOR TRACKING REPORT")
         print("="*60)
-        
-        if not self.jumps:
+
+        if not self.jump_count:
             print("No large cursor jumps detected")
         else:
-            print(f"Large cursor jumps: {len(self.jumps)}")
+            print(f"Large cursor jumps: {self.jump_count}")
             for i, jump in enumerate(self.jumps[:5]):  # Show first 5
                 print(f"  Jump {i+1}: ({jump['from'][0]},{jump['from'][1]}) → ({jump['to'][0]},{jump['to'][1]}) [distance: {jump['distance']}]")
-        
+
+        x, y = self.screen.cursor
+        print(f"Final cursor position: ({y + 1},{x + 1})")
+
+        if screenshot:
+            print("\nFinal screen:")
+            for line in self.screen.display():
+                print(f"  {line}")
+
         print("\n" + "="*60)
 
 
+def analyze_shard(path: str, start: int, end: Optional[int], sample_limit: int = 10) -> dict:
+    """Analyze one byte range of a log (run in a worker process)."""
+    diagnostics = ANSIDiagnostics(path, sample_limit=sample_limit)
+    diagnostics.analyze_range(start, end)
+    return diagnostics.to_dict()
+
+
+def shard_ranges(path: str, shard_size: int) -> List[Tuple[int, Optional[int]]]:
+    """
+    Split a log into byte ranges of about shard_size. Each range after the
+    first starts on a newline: no escape sequence this tool tokenizes (except
+    an OSC title) spans one, and it is never inside a UTF-8 character.
+    """
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, 'rb') as f:
+        target = shard_size
+        while target < size:
+            f.seek(target)
+            window = f.read(65536)
+            newline = window.find(b'\n')
+            if newline < 0:
+                target += len(window)  # No line break yet; keep looking
+                if not window:
+                    break
+                continue
+            bounds.append(target + newline)
+            target = target + newline + shard_size
+    ends = bounds[1:] + [None]
+    return list(zip(bounds, ends))
+
+
+def expand_paths(patterns: List[str]) -> List[str]:
+    """Expand files, directories (recursively) and glob patterns to files."""
+    files = {}
+    for pattern in patterns:
+        matches = glob.glob(pattern, recursive=True) if glob.has_magic(pattern) else [pattern]
+        for match in sorted(matches):
+            if os.path.isdir(match):
+                for root, _, names in os.walk(match):
+                    for name in sorted(names):
+                        path = os.path.join(root, name)
+                        files.setdefault(os.path.realpath(path), path)
+            else:
+                files.setdefault(os.path.realpath(match), match)
+    return list(files.values())  # Each file once, in the order first given
+
+
+def analyze_files(files: List[str], jobs: Optional[int] = None,
+                  shard_size: int = 64 * 1024 * 1024) -> Tuple[List[ANSIDiagnostics], ANSIDiagnostics]:
+    """
+    Analyze many logs in parallel, large ones split into shards. Returns the
+    per-file diagnostics (in input order) and the merged total.
+    """
+    shards = []
+    per_file = []
+    errors = {}
+    for path in files:
+        per_file.append(ANSIDiagnostics(path))
+        try:
+            shards.extend((len(per_file) - 1, start, end) for start, end in shard_ranges(path, shard_size))
+        except OSError as e:
+            errors[path] = str(e)
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [(index, pool.submit(analyze_shard, files[index], start, end))
+                   for index, start, end in shards]
+        # Shards of a file were submitted in order, so merging in submission
+        # order keeps sample locations consecutive
+        for index, future in futures:
+            try:
+                per_file[index].merge(future.result())
+            except OSError as e:
+                errors[files[index]] = str(e)
+
+    total = ANSIDiagnostics(f"{len(files)} files")
+    for diagnostics in per_file:
+        diagnostics.error = errors.get(diagnostics.log_file)
+        total.merge(diagnostics.to_dict(), follows=False)
+    return per_file, total
+
+
+def print_file_breakdown(per_file: List[ANSIDiagnostics]):
+    """Print one line of totals per analyzed log."""
+    print(f"  {'File':<44} {'Lines':>10} {'Sequences':>10} {'Issues':>8}")
+    for diagnostics in per_file:
+        if diagnostics.error:
+            print(f"  {diagnostics.log_file:<44} error: {diagnostics.error}")
+            continue
+        print(f"  {diagnostics.log_file:<44} {diagnostics.lines:>10} "
+              f"{diagnostics.sequence_total:>10} {sum(diagnostics.issues.values()):>8}")
+
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python3 ansi_diagnostics.py <log_file> [--cursor]")
-        sys.exit(1)
-    
-    log_file = sys.argv[1]
-    
-    print(f"Analyzing: {log_file}\n")
-    
-    # Run ANSI diagnostics
-    ansi = ANSIDiagnostics(log_file)
-    ansi.parse_log()
-    ansi.print_report()
-    
-    # Run cursor tracking if requested
-    if '--cursor' in sys.argv:
-        tracker = CursorTracker(log_file)
-        tracker.analyze()
-        tracker.print_report()
+    parser = argparse.ArgumentParser(description="Analyze telnet session logs for ANSI sequence issues")
+    parser.add_argument("logs", nargs="+", help="Log files, directories or glob patterns")
+    parser.add_argument("--cursor", action="store_true", help="Also track cursor jumps (single log only)")
+    parser.add_argument("--cols", type=int, default=80, help="Screen width for cursor tracking (default: 80)")
+    parser.add_argument("--rows", type=int, default=24, help="Screen height for cursor tracking (default: 24)")
+    parser.add_argument("--screenshot", action="store_true", help="With --cursor, print the final screen")
+    parser.add_argument("--jobs", type=int, help="Worker processes for batch mode (default: CPU count)")
+    parser.add_argument(
+        "--shard-size",
+        type=int,
+        default=64 * 1024 * 1024,
+        help="Split logs larger than this many bytes across workers (default: 64 MiB)"
+    )
+    parser.add_argument("--json", metavar="FILE", help="Also write the report as JSON ('-' for stdout)")
+    args = parser.parse_args()
+
+    files = expand_paths(args.logs)
+    if not files:
+        parser.error("no log files found")
+
+    if len(files) == 1 and not args.jobs:
+        log_file = files[0]
+        print(f"Analyzing: {log_file}\n")
+        
+        # Run ANSI diagnostics
+        ansi = ANSIDiagnostics(log_file)
+        ansi.parse_log()
+        ansi.print_report()
+        report = {'files': [ansi.to_dict()], 'total': ansi.to_dict()}
+        
+        # Run cursor tracking if requested
+        if args.cursor:
+            tracker = CursorTracker(log_file, args.cols, args.rows)
+            tracker.analyze()
+            tracker.print_report(screenshot=args.screenshot)
+    else:
+        print(f"Analyzing: {len(files)} logs\n")
+        per_file, total = analyze_files(files, args.jobs, args.shard_size)
+        print_file_breakdown(per_file)
+        total.print_report()
+        report = {
+            'files': [dict(d.to_dict(), error=d.error) for d in per_file],
+            'total': total.to_dict(),
+        }
+
+    if args.json == '-':
+        print(json.dumps(report, indent=2))
+    elif args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Allocation benchmark: carrying escape sequences over between reads.
+
+Feeds escape-dense corpora to the incremental decoder in read-sized chunks
+(7 bytes splits nearly every sequence, 4096 is a normal read) and measures
+with tracemalloc what each decode_tokens() call allocates and frees again
+before returning - memory that is not part of the tokens it returns:
+
+  copying  the carry-over before the ring buffer: the held-back tail joined
+           to a bytes copy of the next chunk's head (pending + head), and
+           the unfinished tail sliced off into a new bytes object each call
+  ring     CP437IncrementalDecoder: the tail and head are copied into one
+           reused bytearray and tokenized there by index
+
+For each case the mean and worst transient bytes per call are printed,
+along with throughput (measured separately, without tracemalloc running).
+
+Usage:
+    python3 benchmarks/bench_alloc.py [--size BYTES] [--chunk N ...] [--corpus NAME ...]
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import CORPORA, chunked  # noqa: E402
+from cp437_telnet import MAX_SEQUENCE_LENGTH, CP437IncrementalDecoder  # noqa: E402
+from cp437_tokens import tokenize  # noqa: E402
+
+ESCAPE_DENSE = ('sgr_art', 'cursor_heavy', 'ansi_art_screens', 'menu_repaints')
+
+
+class CopyingDecoder:
+    """The previous CP437IncrementalDecoder carry-over, kept as the baseline."""
+
+    def __init__(self):
+        self.pending = b''
+        self.position = 0
+
+    def decode_tokens(self, input_bytes: bytes, final: bool = False, controls: bool = True) -> list:
+        tokens = []
+        start = 0
+        length = len(input_bytes)
+        base = self.position + len(self.pending)
+        while self.pending and start < length:
+            head_end = min(length, start + MAX_SEQUENCE_LENGTH)
+            taken = head_end - start
+            more, tail = tokenize(self.pending + bytes(input_bytes[start:head_end]), 0, controls, self.position)
+            tokens.extend(more)
+            if len(tail) > taken:
+                self.position = base + head_end - len(tail)
+                self.pending = tail
+                start = head_end
+            else:
+                self.pending = b''
+                start = head_end - len(tail)
+                self.position = base + start
+        if not self.pending and start < length:
+            more, tail = tokenize(input_bytes, start, controls, base)
+            tokens.extend(more)
+            self.pending = bytes(tail)
+            self.position = base + length - len(tail)
+        return tokens
+
+
+DECODERS = {
+    'copying': CopyingDecoder,
+    'ring': CP437IncrementalDecoder,
+}
+
+
+def transient(decoder_class, chunks: list, controls: bool) -> tuple:
+    """Mean and worst bytes allocated and freed within one call."""
+    decoder = decoder_class()
+    total = worst = 0
+    tracemalloc.start()
+    try:
+        for chunk in chunks:
+            tracemalloc.reset_peak()
+            tokens = decoder.decode_tokens(chunk, controls=controls)
+            current, peak = tracemalloc.get_traced_memory()
+            churn = peak - current
+            total += churn
+            worst = max(worst, churn)
+            del tokens
+    finally:
+        tracemalloc.stop()
+    return total / len(chunks), worst
+
+
+def throughput(decoder_class, chunks: list, controls: bool, size: int, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        decoder = decoder_class()
+        start = time.perf_counter()
+        for chunk in chunks:
+            decoder.decode_tokens(chunk, controls=controls)
+        best = min(best, time.perf_counter() - start)
+    return size / best / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=256 * 1024, help="Bytes per corpus (default: 256 KiB)")
+    parser.add_argument("--chunk", type=int, nargs="+", default=[7, 64, 4096],
+                        help="Read sizes to split the corpora into (default: 7 64 4096)")
+    parser.add_argument("--corpus", nargs="+", choices=sorted(CORPORA), default=list(ESCAPE_DENSE),
+                        help="Corpora to run (default: the escape-dense ones)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (default: 3)")
+    args = parser.parse_args()
+
+    print(f"{'corpus':<18}{'chunk':>6}  {'mode':<7}{'decoder':<9}"
+          f"{'mean B/call':>12}{'worst B/call':>13}{'MB/s':>8}")
+    for name in args.corpus:
+        data = CORPORA[name](args.size)
+        for chunk_size in args.chunk:
+            chunks = chunked(data, chunk_size)
+            for controls in (True, False):
+                mode = 'tokens' if controls else 'text'
+                for label, decoder_class in DECODERS.items():
+                    mean, worst = transient(decoder_class, chunks, controls)
+                    rate = throughput(decoder_class, chunks, controls, len(data), args.repeat)
+                    print(f"{name:<18}{chunk_size:>6}  {mode:<7}{label:<9}"
+                          f"{mean:>12.0f}{worst:>13}{rate:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
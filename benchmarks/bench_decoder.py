@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Decoder microbenchmarks: CP437 decode/encode throughput and per-chunk latency.
+
+Runs each codec entry point over synthetic corpora (pure text, dense SGR
+color art, heavy cursor positioning, full-screen ANSI art) in read-sized
+chunks, plus a pathological split-at-every-byte pass over a smaller slice:
+
+  decode[<engine>]   decode_cp437_graphical_buffered with carried-over tails
+  incremental        CP437IncrementalDecoder.decode
+  tokens             CP437IncrementalDecoder.decode_tokens (controls split out)
+  encode             encode_to_cp437 on the decoded text
+  translator         cp437_translator.decode_cp437
+  pipeline           server_reader's path: incremental decode, default output
+                     filters and FrameRenderer (interval 0, in-memory stream)
+  screen             incremental decode replayed into an 80x24 cp437_screen.Screen
+
+Results are printed as JSON (MB/s of input plus mean/p50/p99 latency per
+chunk in microseconds) so they can be tracked across releases. With
+--baseline, throughput is compared against an earlier JSON result and the
+exit status is 1 if any case regressed by more than --tolerance.
+
+The results record which cp437_speedups backend ran; run once with
+CP437_BACKEND=python to compare the compiled decoder against pure Python.
+
+Usage:
+    python3 benchmarks/bench_decoder.py [--size BYTES] [--repeat N] [--output FILE]
+        [--only NAME ...] [--baseline FILE] [--tolerance 0.2]
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import cp437_speedups  # noqa: E402
+import cp437_translator  # noqa: E402
+from corpus import CORPORA, chunked  # noqa: E402
+from cp437_filters import DEFAULT_FILTERS, build_filters  # noqa: E402
+from cp437_telnet import (  # noqa: E402
+    DECODER_ENGINES,
+    CP437IncrementalDecoder,
+    FrameRenderer,
+    decode_cp437_graphical_buffered,
+    encode_to_cp437,
+    decode_filtered,
+)
+from cp437_screen import Screen  # noqa: E402
+
+CHUNK_SIZE = 4096
+BYTEWISE_SLICE = 64 * 1024
+
+
+def _decode_runner(engine):
+    def run(chunks, timings):
+        tail = b''
+        for chunk in chunks:
+            start = time.perf_counter_ns()
+            text, tail = decode_cp437_graphical_buffered(tail + chunk, engine)
+            timings.append(time.perf_counter_ns() - start)
+    return run
+
+
+def _run_incremental(chunks, timings):
+    decoder = CP437IncrementalDecoder()
+    for chunk in chunks:
+        start = time.perf_counter_ns()
+        decoder.decode(chunk)
+        timings.append(time.perf_counter_ns() - start)
+
+
+def _run_tokens(chunks, timings):
+    decoder = CP437IncrementalDecoder()
+    for chunk in chunks:
+        start = time.perf_counter_ns()
+        decoder.decode_tokens(chunk)
+        timings.append(time.perf_counter_ns() - start)
+
+
+def _run_encode(chunks, timings):
+    for chunk in chunks:
+        start = time.perf_counter_ns()
+        encode_to_cp437(chunk)
+        timings.append(time.perf_counter_ns() - start)
+
+
+def _run_translator(chunks, timings):
+    for chunk in chunks:
+        start = time.perf_counter_ns()
+        cp437_translator.decode_cp437(chunk)
+        timings.append(time.perf_counter_ns() - start)
+
+
+def _run_pipeline(chunks, timings):
+    decoder = CP437IncrementalDecoder()
+    filters = build_filters(DEFAULT_FILTERS)
+    renderer = FrameRenderer(0, stream=io.BytesIO())
+    for chunk in chunks:
+        start = time.perf_counter_ns()
+        renderer.write(decode_filtered(decoder, chunk, filters))
+        timings.append(time.perf_counter_ns() - start)
+    renderer.close()
+
+
+def _run_screen(chunks, timings):
+    decoder = CP437IncrementalDecoder()
+    screen = Screen()
+    for chunk in chunks:
+        start = time.perf_counter_ns()
+        screen.feed(decoder.decode(chunk))
+        timings.append(time.perf_counter_ns() - start)
+
+
+def benchmark_cases():
+    """Return {name: runner}; encode takes decoded text, the rest raw bytes."""
+    cases = {f"decode[{engine}]": _decode_runner(engine) for engine in DECODER_ENGINES}
+    cases.update({
+        'incremental': _run_incremental,
+        'tokens': _run_tokens,
+        'encode': _run_encode,
+        'translator': _run_translator,
+        'pipeline': _run_pipeline,
+        'screen': _run_screen,
+    })
+    return cases
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def measure(runner, chunks, input_bytes, repeat):
+    """Run a case repeat times and summarize the fastest run."""
+    best = None
+    for _ in range(repeat):
+        timings = []
+        runner(chunks, timings)
+        if best is None or sum(timings) < sum(best):
+            best = timings
+    total = sum(best) or 1
+    ordered = sorted(best)
+    return {
+        'bytes': input_bytes,
+        'chunks': len(best),
+        'mb_per_s': round(input_bytes / (total / 1e9) / 1e6, 3),
+        'latency_us': {
+            'mean': round(total / len(best) / 1e3, 3),
+            'p50': round(_percentile(ordered, 0.50) / 1e3, 3),
+            'p99': round(_percentile(ordered, 0.99) / 1e3, 3),
+        },
+    }
+
+
+def run_suite(size, repeat, only=None):
+    """Run every selected case on every corpus; return the JSON report."""
+    results = {}
+    for corpus_name, build in CORPORA.items():
+        data = build(size)
+        text = CP437IncrementalDecoder().decode(data, final=True)
+        text_bytes = len(text.encode('utf-8'))
+        for chunking, chunk_size, sample in (
+            ('read', CHUNK_SIZE, data),
+            ('bytewise', 1, data[:BYTEWISE_SLICE]),
+        ):
+            for name, runner in benchmark_cases().items():
+                if only and not any(part in name for part in only):
+                    continue
+                if name == 'encode':
+                    if chunking == 'bytewise':
+                        continue  # Encoding has no carried state to split
+                    chunks, input_bytes = chunked(text, chunk_size), text_bytes
+                else:
+                    chunks, input_bytes = chunked(sample, chunk_size), len(sample)
+                key = f"{corpus_name}/{chunking}/{name}"
+                results[key] = measure(runner, chunks, input_bytes, repeat)
+                print(f"  {key:<48} {results[key]['mb_per_s']:9.2f} MB/s  "
+                      f"p99 {results[key]['latency_us']['p99']:9.1f} us",
+                      file=sys.stderr)
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'backend': cp437_speedups.backend(),
+        'size': size,
+        'chunk_size': CHUNK_SIZE,
+        'bytewise_slice': BYTEWISE_SLICE,
+        'repeat': repeat,
+        'timestamp': time.time(),
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Return (key, baseline MB/s, current MB/s) for each regressed case."""
+    regressions = []
+    for key, old in baseline.get('results', {}).items():
+        new = report['results'].get(key)
+        if new is not None and new['mb_per_s'] < old['mb_per_s'] * (1 - tolerance):
+            regressions.append((key, old['mb_per_s'], new['mb_per_s']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=1024 * 1024,
+        help="Bytes per corpus (default: 1048576)"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case (default: 3)")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    parser.add_argument(
+        "--only",
+        action="append",
+        help="Only run cases whose name contains this (repeatable)"
+    )
+    parser.add_argument("--baseline", help="Earlier JSON report to check for regressions")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="Allowed throughput drop vs. baseline (default: 0.2)"
+    )
+    args = parser.parse_args()
+
+    report = run_suite(args.size, args.repeat, args.only)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+            f.write('\n')
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance)
+        for key, old, new in regressions:
+            print(f"REGRESSION {key}: {old:.2f} -> {new:.2f} MB/s", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
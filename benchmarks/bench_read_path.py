@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Read path benchmark: latin-1 str round trip vs. binary-native reads.
+
+Feeds an ANSI capture through telnetlib3 readers in network-sized segments
+and consumes it the way server_reader does (read(4096) + CP437 decode),
+reporting throughput for:
+
+  latin-1  TelnetReaderUnicode -> str -> encode('latin-1') -> decoder
+  binary   TelnetReader -> bytes -> decoder
+
+Usage:
+    python3 benchmarks/bench_read_path.py [capture_file] [--repeat N] [--segment BYTES]
+
+Without a capture file a ~4 MB synthetic ANSI art screen dump is used.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import telnetlib3  # noqa: E402
+
+from corpus import ansi_art_screens  # noqa: E402
+from cp437_telnet import CP437IncrementalDecoder  # noqa: E402
+
+READ_SIZE = 4096
+
+
+async def read_latin1(capture: bytes, segment: int) -> int:
+    """Old path: telnetlib3 decodes to str, server_reader re-encodes it."""
+    reader = telnetlib3.TelnetReaderUnicode(lambda incoming: 'latin-1')
+    decoder = CP437IncrementalDecoder()
+    chars = 0
+    for offset in range(0, len(capture), segment):
+        reader.feed_data(capture[offset:offset + segment])
+        while reader._buffer:
+            data = await reader.read(READ_SIZE)
+            chars += len(decoder.decode(data.encode('latin-1', errors='replace')))
+    return chars
+
+
+async def read_binary(capture: bytes, segment: int) -> int:
+    """New path: raw bytes from the reader go straight to the decoder."""
+    reader = telnetlib3.TelnetReader()
+    decoder = CP437IncrementalDecoder()
+    chars = 0
+    for offset in range(0, len(capture), segment):
+        reader.feed_data(capture[offset:offset + segment])
+        while reader._buffer:
+            data = await reader.read(READ_SIZE)
+            chars += len(decoder.decode(data))
+    return chars
+
+
+def measure(path, capture: bytes, segment: int, repeat: int) -> float:
+    """Return the best throughput in MB/s over repeat runs."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        asyncio.run(path(capture, segment))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(capture) / best / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("capture", nargs="?", help="Raw CP437/ANSI capture file")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per path (default: 5)")
+    parser.add_argument(
+        "--segment",
+        type=int,
+        default=READ_SIZE,
+        help="Bytes arriving from the network between reads (default: 4096)"
+    )
+    args = parser.parse_args()
+
+    if args.capture:
+        with open(args.capture, 'rb') as f:
+            capture = f.read()
+    else:
+        capture = ansi_art_screens(4 * 1024 * 1024)
+
+    print(f"Capture: {len(capture) / 1e6:.1f} MB, segment {args.segment}, read size {READ_SIZE}")
+    old = measure(read_latin1, capture, args.segment, args.repeat)
+    new = measure(read_binary, capture, args.segment, args.repeat)
+    print(f"  latin-1 round trip  {old:8.1f} MB/s")
+    print(f"  binary-native       {new:8.1f} MB/s  ({new / old:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Render mode benchmark: bytes written to the local terminal, passthrough vs. diff.
+
+Replays server output through the same path as server_reader (incremental
+decode, clear-screen fixup, renderer) once per --render-mode and reports
+how many bytes each mode wrote to the (in-memory) terminal. Every read is
+its own frame (render interval 0), the worst case for the diff renderer.
+
+Inputs are session recordings (--record files); the server side of each
+recording is replayed read by read. Without recordings the synthetic
+corpora are used, split into 4096-byte reads.
+
+Usage:
+    python3 benchmarks/bench_render.py [recording ...] [--size BYTES] [--cols N] [--rows N]
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import CORPORA, chunked  # noqa: E402
+from cp437_filters import DEFAULT_FILTERS, build_filters  # noqa: E402
+from cp437_telnet import (  # noqa: E402
+    RENDER_MODES,
+    CP437IncrementalDecoder,
+    create_renderer,
+    decode_filtered,
+)
+from session_recorder import SERVER, read_recording  # noqa: E402
+
+READ_SIZE = 4096
+
+
+def render(reads, mode: str, cols: int, rows: int) -> dict:
+    """Replay reads through one render mode; return bytes written and time."""
+    decoder = CP437IncrementalDecoder()
+    filters = build_filters(DEFAULT_FILTERS)
+    renderer = create_renderer(mode, 0, cols, rows, stream=io.BytesIO())
+    start = time.perf_counter()
+    for data in reads:
+        renderer.write(decode_filtered(decoder, data, filters))
+    renderer.write(decode_filtered(decoder, b'', filters, final=True))
+    renderer.close()
+    elapsed = time.perf_counter() - start
+    return {
+        'bytes_written': renderer.bytes_written,
+        'mb_per_s': round(sum(map(len, reads)) / elapsed / 1e6, 3) if elapsed else 0.0,
+    }
+
+
+def measure(name: str, reads, cols: int, rows: int) -> dict:
+    result = {'input': name, 'reads': len(reads), 'bytes_in': sum(map(len, reads))}
+    for mode in RENDER_MODES:
+        result[mode] = render(reads, mode, cols, rows)
+    passthrough = result['passthrough']['bytes_written']
+    if passthrough:
+        result['diff_ratio'] = round(result['diff']['bytes_written'] / passthrough, 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument("recordings", nargs="*", help="Session recordings to replay")
+    parser.add_argument("--size", type=int, default=1024 * 1024, help="Synthetic corpus size in bytes")
+    parser.add_argument("--cols", type=int, default=80, help="Screen width (default: 80)")
+    parser.add_argument("--rows", type=int, default=24, help="Screen height (default: 24)")
+    args = parser.parse_args()
+
+    if args.recordings:
+        inputs = [
+            (path, [frame.data for frame in read_recording(path) if frame.direction == SERVER])
+            for path in args.recordings
+        ]
+    else:
+        inputs = [(name, chunked(build(args.size), READ_SIZE)) for name, build in CORPORA.items()]
+
+    results = [measure(name, reads, args.cols, args.rows) for name, reads in inputs]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""
+Synthetic CP437/ANSI corpora shared by the benchmarks.
+
+Each builder returns exactly size bytes of server output with a distinct
+escape-sequence density, so decoder changes can be compared on inputs that
+stress different code paths.
+"""
+
+import random
+
+
+def _repeat(block: bytes, size: int) -> bytes:
+    return (block * (size // len(block) + 1))[:size]
+
+
+def pure_text(size: int) -> bytes:
+    """Plain CP437 text with line breaks and some high/low glyphs, no escapes."""
+    line = (b'Welcome to the \x01 Board \x02 - Messages: 42  Files: 1337  '
+            b'\xc9\xcd\xcd\xcd\xbb \xb0\xb1\xb2\xdb\r\n')
+    return _repeat(line, size)
+
+
+def sgr_art(size: int) -> bytes:
+    """Dense color ANSI art: an SGR change every few block glyphs."""
+    rng = random.Random(437)
+    cells = []
+    for _ in range(2000):
+        cells.append(b'\x1b[%d;%d;%dm' % (rng.choice((0, 1)), rng.randint(30, 37), rng.randint(40, 47)))
+        cells.append(bytes(rng.choice(b'\xdb\xdc\xdf\xb0\xb1\xb2 ') for _ in range(rng.randint(1, 6))))
+    return _repeat(b''.join(cells) + b'\x1b[0m\r\n', size)
+
+
+def cursor_heavy(size: int) -> bytes:
+    """Screen painting by absolute positioning, erases and relative moves."""
+    rng = random.Random(2600)
+    parts = [b'\x1b[2J\x1b[H']
+    for _ in range(2000):
+        parts.append(b'\x1b[%d;%dH' % (rng.randint(1, 24), rng.randint(1, 80)))
+        parts.append(rng.choice((b'\x1b[K', b'\x1b[2C', b'\x1b[A', b'\x1b[1D', b'')))
+        parts.append(bytes(rng.choice(b'\xc4\xb3\xda\xbf\xc0\xd9*') for _ in range(rng.randint(1, 4))))
+    return _repeat(b''.join(parts), size)
+
+
+def ansi_art_screens(size: int) -> bytes:
+    """Full-screen ANSI art dumps: clear, row positioning, colored blocks."""
+    rows = []
+    for row in range(1, 25):
+        cells = []
+        for col in range(0, 80, 8):
+            color = 30 + (row + col) % 8
+            cells.append(b'\x1b[1;%d;40m\xdb\xdb\xb2\xb1\xb0 \x01\x03' % color)
+        rows.append(b'\x1b[%d;1H' % row + b''.join(cells))
+    screen = b'\x1b[2J\x1b[H' + b''.join(rows) + b'\x1b[0m\r\n'
+    return _repeat(screen, size)
+
+
+def menu_repaints(size: int) -> bytes:
+    """A BBS menu repainted in full on every keypress, moving the highlight."""
+    items = [b'M) Message Areas', b'F) File Areas', b'D) Door Games', b'B) Bulletins',
+             b"W) Who's Online", b'U) User Settings', b'C) Chat with SysOp', b'G) Goodbye']
+    screens = []
+    for selected in range(len(items)):
+        parts = [b'\x1b[2J\x1b[H\x1b[1;33;44m\xc9' + b'\xcd' * 40 + b'\xbb\x1b[0m\r\n']
+        for i, item in enumerate(items):
+            color = b'\x1b[1;37;44m' if i == selected else b'\x1b[0;36m'
+            parts.append(b'\x1b[%d;5H%s \xfe %-30s\x1b[0m' % (i + 3, color, item))
+        parts.append(b'\x1b[14;1H\x1b[0;32mSelection: \x1b[0m')
+        screens.append(b''.join(parts))
+    return _repeat(b''.join(screens), size)
+
+
+CORPORA = {
+    'pure_text': pure_text,
+    'sgr_art': sgr_art,
+    'cursor_heavy': cursor_heavy,
+    'ansi_art_screens': ansi_art_screens,
+    'menu_repaints': menu_repaints,
+}
+
+
+def chunked(data: bytes, chunk_size: int) -> list:
+    """Split data into read-sized chunks (1 = split at every byte)."""
+    return [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+CP437 Filters - Streaming rewrites of server output before it is displayed.
+
+A filter receives the cp437_tokens tokens of one read and returns the tokens
+to pass on, keeping any state it needs across reads, so a sequence that
+arrives in the next read is handled the same as one in the same read.
+Tokens a filter inserts have start == end (they came from no input byte).
+
+Built-in filters (FILTERS):
+
+    clear-home  home the cursor after ESC[2J unless the server positions
+                it next (ANSI.SYS homed on clear; many BBSes rely on it)
+    crlf        turn a bare LF into CR LF
+    colors-8    map bright, 256-color and RGB colors to the 8 basic ones
+    mono        drop color from SGR sequences, keeping bold/underline/...
+
+A FilterChain runs filters in order. An empty chain is falsy, and callers
+skip the token stage entirely, so disabled filters cost nothing.
+"""
+
+import re
+from typing import Iterable, List, Optional
+
+from cp437_tokens import CONTROL, CSI, Token, csi_params
+
+CLEAR_SCREEN = '\x1b[2J'
+CURSOR_HOME = '\x1b[H'
+
+# Plain SGR parameters; anything else (private markers, intermediates,
+# ':' sub-parameters) is not rewritten
+_SGR_BODY = re.compile(r'[0-9;]*')
+
+
+class TokenFilter:
+    """Base class: passes tokens through unchanged."""
+
+    # Set when the filter needs C0 controls as CONTROL tokens
+    needs_controls = False
+
+    def filter(self, tokens: List[Token]) -> List[Token]:
+        """Return the tokens to pass on for one read."""
+        return tokens
+
+    def reset(self):
+        """Forget state carried from earlier reads."""
+
+
+class ClearHome(TokenFilter):
+    """
+    Insert ESC[H after ESC[2J unless the next token is a cursor position.
+    A clear that ends a read is homed before the first token of the next
+    read, so a position arriving there is seen as well.
+    """
+
+    def __init__(self):
+        self.pending_home = False
+
+    def filter(self, tokens: List[Token]) -> List[Token]:
+        if not tokens:
+            return tokens
+        clears = [index for index, token in enumerate(tokens) if token[1] == CLEAR_SCREEN]
+        if not clears and not self.pending_home:
+            return tokens
+        result = []
+        if self.pending_home and not _positions(tokens[0]):
+            start = tokens[0][2]
+            result.append((CSI, CURSOR_HOME, start, start))
+        last = 0
+        for index in clears:
+            result.extend(tokens[last:index + 1])
+            last = index + 1
+            if last < len(tokens) and not _positions(tokens[last]):
+                end = tokens[index][3]
+                result.append((CSI, CURSOR_HOME, end, end))
+        result.extend(tokens[last:])
+        self.pending_home = last == len(tokens)
+        return result
+
+    def reset(self):
+        self.pending_home = False
+
+
+def _positions(token: Token) -> bool:
+    """True for a cursor position sequence (CUP or HVP)."""
+    return token[0] == CSI and token[1][-1] in 'Hf'
+
+
+class CRLF(TokenFilter):
+    """Insert CR before every LF that does not follow one."""
+
+    needs_controls = True
+
+    def __init__(self):
+        self.after_cr = False
+
+    def filter(self, tokens: List[Token]) -> List[Token]:
+        result = []
+        append = result.append
+        after_cr = self.after_cr
+        for token in tokens:
+            if token[0] == CONTROL:
+                if token[1] == '\n' and not after_cr:
+                    append((CONTROL, '\r', token[2], token[2]))
+                after_cr = token[1] == '\r'
+            else:
+                after_cr = False
+            append(token)
+        self.after_cr = after_cr
+        return result
+
+    def reset(self):
+        self.after_cr = False
+
+
+def _basic_color(n: int) -> int:
+    """Nearest of the 8 basic colors to a 256-color palette entry."""
+    if n < 16:
+        return n % 8
+    if n < 232:
+        n -= 16
+        r, g, b = n // 36, n // 6 % 6, n % 6
+        return (r >= 3) | (g >= 3) << 1 | (b >= 3) << 2
+    return 7 if n >= 244 else 0
+
+
+def _rgb_color(r: int, g: int, b: int) -> int:
+    return (r >= 128) | (g >= 128) << 1 | (b >= 128) << 2
+
+
+class ColorDowngrade(TokenFilter):
+    """
+    Rewrite SGR sequences for terminals with fewer colors: mode '8' maps
+    every color to the 8 basic ones, 'mono' drops colors altogether.
+    """
+
+    MODES = ('8', 'mono')
+
+    def __init__(self, mode: str = '8'):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown color mode: {mode}")
+        self.mode = mode
+        self._cache = {}
+
+    def filter(self, tokens: List[Token]) -> List[Token]:
+        result = tokens
+        for index, token in enumerate(tokens):
+            if token[0] != CSI or token[1][-1] != 'm':
+                continue
+            text = self._cache.get(token[1])
+            if text is None:
+                text = self._cache[token[1]] = self._rewrite(token[1])
+            if text == token[1]:
+                continue
+            if result is tokens:
+                result = list(tokens)
+            result[index] = (CSI, text, token[2], token[3]) if text else None
+        if result is not tokens:
+            result = [token for token in result if token is not None]
+        return result
+
+    def _rewrite(self, text: str) -> Optional[str]:
+        """New SGR text, or '' to drop the sequence."""
+        if not _SGR_BODY.fullmatch(text, 2, len(text) - 1):
+            return text
+        values = csi_params(text)
+        if not values:
+            return text  # ESC[m is a reset
+        params = []
+        i = 0
+        while i < len(values):
+            value = values[i]
+            color = None
+            if value in (38, 48):
+                # Extended color: 5;n or 2;r;g;b
+                mode = values[i + 1] if i + 1 < len(values) else None
+                if mode == 5 and i + 2 < len(values):
+                    color = _basic_color(values[i + 2] or 0)
+                    i += 2
+                elif mode == 2 and i + 4 < len(values):
+                    color = _rgb_color(*(v or 0 for v in values[i + 2:i + 5]))
+                    i += 4
+                else:
+                    # Cut short: what follows would be read as other attributes
+                    break
+                base = 30 if value == 38 else 40
+            elif value is not None and (90 <= value <= 97 or 100 <= value <= 107):
+                color = value % 10
+                base = 30 if value < 100 else 40
+            elif value is not None and (30 <= value <= 39 or 40 <= value <= 49):
+                color = value % 10
+                base = 30 if value < 40 else 40
+            if color is None:
+                if value not in (38, 48):
+                    params.append('' if value is None else str(value))
+            elif self.mode == '8':
+                params.append(str(base + color))
+            i += 1
+        if not params:
+            return ''
+        return f"\x1b[{';'.join(params)}m"
+
+
+FILTERS = {
+    'clear-home': ClearHome,
+    'crlf': CRLF,
+    'colors-8': lambda: ColorDowngrade('8'),
+    'mono': lambda: ColorDowngrade('mono'),
+}
+
+DEFAULT_FILTERS = ('clear-home',)
+
+
+class FilterChain:
+    """Filters applied in order; falsy when empty."""
+
+    def __init__(self, filters: Iterable[TokenFilter] = ()):
+        self.filters = list(filters)
+        self.needs_controls = any(f.needs_controls for f in self.filters)
+
+    def __bool__(self) -> bool:
+        return bool(self.filters)
+
+    def filter(self, tokens: List[Token]) -> List[Token]:
+        for token_filter in self.filters:
+            tokens = token_filter.filter(tokens)
+        return tokens
+
+    def reset(self):
+        for token_filter in self.filters:
+            token_filter.reset()
+
+
+def build_filters(names: Iterable[str]) -> FilterChain:
+    """FilterChain of the named FILTERS, in order."""
+    try:
+        return FilterChain(FILTERS[name]() for name in names)
+    except KeyError as e:
+        raise ValueError(f"Unknown output filter: {e.args[0]}") from None
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+CP437 Macros - Keystroke macros compiled once into send programs.
+
+Macro text is compiled at startup into a list of steps (plain tuples):
+
+    (SEND, text)             write text to the server in one write
+    (WAIT, seconds)          pause
+    (EXPECT, text, timeout)  wait until the server sends text
+
+Every key - plain characters, named keys and, in --bell macros, the vim
+keys h/j/k/l, which stand for the arrow keys - is sent on its own with
+key_delay after it, as typing would, since BBS menus read keys one by one.
+With burst=True (--macro-burst) runs of plain characters are sent in one
+write and only named and vim keys are paced. With a key_delay of 0
+everything up to the next WAIT or EXPECT is one write.
+
+Inside braces:
+
+    {up} {down} {left} {right} {enter} {esc} {tab} {bs} {home} {end} ...
+    {wait 0.5}            pause half a second
+    {expect Password:}    wait for the server to send "Password:"
+    {timeout 5}           time limit of the expects that follow (default 10 s)
+    {{                    a literal {
+
+run_macro() schedules steps against the loop's monotonic clock: each pause
+moves an absolute deadline, so a long macro does not drift by the time its
+own writes and wakeups take.
+"""
+
+import asyncio
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+SEND = 'send'
+WAIT = 'wait'
+EXPECT = 'expect'
+
+DEFAULT_EXPECT_TIMEOUT = 10.0
+
+NAMED_KEYS = {
+    'up': '\x1b[A',
+    'down': '\x1b[B',
+    'right': '\x1b[C',
+    'left': '\x1b[D',
+    'home': '\x1b[H',
+    'end': '\x1b[F',
+    'enter': '\r',
+    'esc': '\x1b',
+    'tab': '\t',
+    'bs': '\x08',
+    'del': '\x7f',
+    'space': ' ',
+}
+
+# --bell macros: vim-style keys are arrows
+VIM_KEYS = {
+    'h': NAMED_KEYS['left'],
+    'j': NAMED_KEYS['down'],
+    'k': NAMED_KEYS['up'],
+    'l': NAMED_KEYS['right'],
+}
+
+# Ctrl+] ends the session and cannot be bound
+ESCAPE_KEY = '\x1d'
+
+# Control characters that ordinary keys already send: binding one would
+# swallow Esc (and the arrow and function keys it starts), Enter,
+# Backspace or Tab
+RESERVED_KEYS = {
+    '\x1b': 'Esc',
+    '\r': 'Enter',
+    '\n': 'Enter',
+    '\x08': 'Backspace',
+    '\t': 'Tab',
+}
+
+# Names are matched case-insensitively ({Enter} is {enter})
+_BRACED = re.compile(r'\{\{|\{([A-Za-z]+)(?: ([^}]*))?\}')
+
+# A step: (SEND, text) | (WAIT, seconds) | (EXPECT, text, timeout)
+Step = Tuple
+
+
+class MacroTimeout(Exception):
+    """An EXPECT step did not see its text in time."""
+
+
+class MacroProgram:
+    """A compiled macro: its source text and the steps to run."""
+
+    def __init__(self, source: str, steps: List[Step], name: str = ''):
+        self.source = source
+        self.steps = steps
+        self.name = name
+
+    @property
+    def expects(self) -> bool:
+        """True if the macro waits for server output."""
+        return any(step[0] == EXPECT for step in self.steps)
+
+    def __repr__(self) -> str:
+        return f"MacroProgram({self.name or self.source!r}, {len(self.steps)} steps)"
+
+
+def compile_macro(text: str, key_delay: float = 0.0, vim_keys: bool = False,
+                  prefix: str = '', name: str = '', burst: bool = False) -> MacroProgram:
+    """
+    Compile macro text into a MacroProgram. prefix is sent with the first
+    key (--bell macros send Ctrl+G first); burst sends runs of plain
+    characters without key_delay between them. Raises ValueError for an
+    unknown {name} or a bad {wait}/{timeout} value.
+    """
+    steps = []
+    pending = [prefix]
+    timeout = DEFAULT_EXPECT_TIMEOUT
+
+    def flush():
+        if pending and any(pending):
+            steps.append((SEND, ''.join(pending)))
+        pending.clear()
+
+    def key(sequence: str):
+        # Sent on its own, with key_delay before whatever follows
+        if key_delay > 0:
+            pending.append(sequence)
+            flush()
+            steps.append((WAIT, key_delay))
+        else:
+            pending.append(sequence)
+
+    def plain(chars: str):
+        for char in chars:
+            if vim_keys and char in VIM_KEYS:
+                key(VIM_KEYS[char])
+            elif burst:
+                pending.append(char)
+            else:
+                key(char)
+
+    position = 0
+    for match in _BRACED.finditer(text):
+        plain(text[position:match.start()])
+        position = match.end()
+
+        command, argument = match.group(1), match.group(2)
+        if command is not None:
+            command = command.lower()
+        if command is None:
+            plain('{')
+        elif command in NAMED_KEYS and argument is None:
+            key(NAMED_KEYS[command])
+        elif command == 'wait':
+            flush()
+            steps.append((WAIT, _seconds(command, argument)))
+        elif command == 'timeout':
+            timeout = _seconds(command, argument)
+        elif command == 'expect' and argument:
+            flush()
+            steps.append((EXPECT, argument, timeout))
+        else:
+            raise ValueError(f"Unknown macro command: {match.group(0)}")
+    plain(text[position:])
+    flush()
+
+    # A delay after the last key holds nothing back
+    while steps and steps[-1][0] == WAIT:
+        steps.pop()
+    return MacroProgram(text, _merge_waits(steps), name)
+
+
+def _seconds(command: str, argument: Optional[str]) -> float:
+    try:
+        value = float(argument)
+    except (TypeError, ValueError):
+        raise ValueError(f"{{{command}}} needs a number of seconds, got {argument!r}") from None
+    if value < 0:
+        raise ValueError(f"{{{command}}} needs a number of seconds, got {argument!r}")
+    return value
+
+
+def _merge_waits(steps: List[Step]) -> List[Step]:
+    merged = []
+    for step in steps:
+        if step[0] == WAIT and merged and merged[-1][0] == WAIT:
+            merged[-1] = (WAIT, merged[-1][1] + step[1])
+        else:
+            merged.append(step)
+    return merged
+
+
+def macro_key(spec: str) -> str:
+    """
+    The control character for a key spec: '^B', 'ctrl-b' or 'ctrl+b'.
+    Raises ValueError for anything else, for Ctrl+] and for the
+    RESERVED_KEYS.
+    """
+    lowered = spec.lower()
+    if lowered.startswith('^') and len(spec) == 2:
+        letter = spec[1]
+    elif lowered[:5] in ('ctrl-', 'ctrl+') and len(spec) == 6:
+        letter = spec[5]
+    else:
+        raise ValueError(f"Macro key must look like ^B or ctrl-b, got {spec!r}")
+    code = ord(letter.upper()) ^ 0x40
+    if not 0 <= code < 0x20:
+        raise ValueError(f"Not a control key: {spec!r}")
+    if chr(code) == ESCAPE_KEY:
+        raise ValueError("Ctrl+] ends the session and cannot be a macro key")
+    if chr(code) in RESERVED_KEYS:
+        raise ValueError(f"{spec} is the {RESERVED_KEYS[chr(code)]} key and cannot be a macro key")
+    return chr(code)
+
+
+def key_name(key: str) -> str:
+    """Display name of a control character key ('\\x02' -> '^B')."""
+    return '^' + chr(ord(key) ^ 0x40)
+
+
+def compile_macros(bindings: Dict[str, str], key_delay: float = 0.0,
+                   bell_macro: Optional[str] = None, burst: bool = False) -> Dict[str, MacroProgram]:
+    """
+    Compile --macro KEY=TEXT bindings (key specs as accepted by macro_key)
+    and the --bell macro, keyed by trigger character. Raises ValueError
+    if two of them would share a key (^G with --bell, or ^B and ctrl-b).
+    """
+    programs = {}
+    if bell_macro:
+        # The bell macro sends Ctrl+G itself first and uses vim keys
+        programs['\x07'] = compile_macro(bell_macro, key_delay, vim_keys=True, prefix='\x07',
+                                         name='BELL', burst=burst)
+    for spec, text in bindings.items():
+        key = macro_key(spec)
+        if key in programs:
+            if programs[key].name == 'BELL':
+                raise ValueError(f"{spec} is the --bell macro key; give --bell or a {spec} macro, not both")
+            raise ValueError(f"{spec} is bound to more than one macro")
+        programs[key] = compile_macro(text, key_delay, name=key_name(key), burst=burst)
+    return programs
+
+
+class OutputWatcher:
+    """
+    Server output as seen by EXPECT steps. Only output that arrives while
+    an expect is being watched for is looked at, and only the last len(text) - 1
+    characters are carried between reads, so nothing is re-scanned.
+    """
+
+    def __init__(self):
+        self.window = ''
+        self._waiters = []
+
+    def feed(self, text: str):
+        """Look at the next piece of decoded server output."""
+        if not self._waiters:
+            return
+        window = self.window + text
+        for waiter in list(self._waiters):
+            expected, future = waiter
+            if expected in window:
+                self._waiters.remove(waiter)
+                if not future.done():
+                    future.set_result(None)
+        keep = max((len(expected) for expected, _ in self._waiters), default=1) - 1
+        self.window = window[len(window) - keep:] if keep else ''
+
+    def watch(self, text: str) -> Tuple[str, asyncio.Future]:
+        """
+        Start looking for text now; pass the waiter to wait(). Output fed
+        between the two is not missed.
+        """
+        waiter = (text, asyncio.get_running_loop().create_future())
+        self._waiters.append(waiter)
+        return waiter
+
+    async def wait(self, waiter: Tuple[str, asyncio.Future], timeout: float):
+        """Wait until a watch()ed text is seen; raises MacroTimeout."""
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+        except asyncio.TimeoutError:
+            raise MacroTimeout(f"timed out waiting for {waiter[0]!r}") from None
+        finally:
+            self.unwatch(waiter)
+
+    def unwatch(self, waiter: Tuple[str, asyncio.Future]):
+        """Stop looking for a watch()ed text."""
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+        if not self._waiters:
+            self.window = ''
+
+    async def wait_for(self, text: str, timeout: float):
+        """Wait until text is seen; raises MacroTimeout."""
+        await self.wait(self.watch(text), timeout)
+
+
+async def run_macro(program: MacroProgram, send: Callable[[str], None],
+                    watcher: Optional[OutputWatcher] = None):
+    """
+    Run a compiled macro. send() is called once per SEND step. EXPECT steps
+    need a watcher fed with the server's output; raises MacroTimeout. An
+    EXPECT is watched for from the SEND before it, so a prompt the server
+    sends during the key delay or a {wait} in between is still seen.
+    """
+    loop = asyncio.get_running_loop()
+    due = loop.time()
+    steps = program.steps
+    watching = None
+    try:
+        for index, step in enumerate(steps):
+            kind = step[0]
+            if kind == WAIT:
+                due += step[1]
+                continue
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if kind == SEND:
+                following = _next_expect(steps, index + 1)
+                if following is not None and watcher is not None and watching is None:
+                    watching = watcher.watch(following[1])
+                send(step[1])
+            else:
+                if watcher is None:
+                    raise MacroTimeout(f"no server output to wait for {step[1]!r}")
+                if watching is None:
+                    watching = watcher.watch(step[1])
+                waiter, watching = watching, None
+                await watcher.wait(waiter, step[2])
+                # Pauses after an expect count from when the text arrived
+                due = loop.time()
+    finally:
+        if watching is not None:
+            watcher.unwatch(watching)
+
+
+def _next_expect(steps: List[Step], index: int) -> Optional[Step]:
+    """The EXPECT step at index, skipping WAITs, or None."""
+    while index < len(steps) and steps[index][0] == WAIT:
+        index += 1
+    if index < len(steps) and steps[index][0] == EXPECT:
+        return steps[index]
+    return None
@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+CP437 Pool - Warm, reusable scripted sessions per host:port.
+
+Health checks and scripted logins that connect again for every run pay
+for the TCP connect, telnet negotiation and login each time. A
+ConnectionPool keeps sessions open between runs instead:
+
+    pool = ConnectionPool(login=my_login, max_per_host=4)
+    async with pool.session('bbs.example.com', 23) as session:
+        session.sendline('w')
+        await session.expect('Who is online')
+
+A new connection runs the login coroutine once (login(session)); after
+that the session is handed out again as it is. At most max_per_host
+sessions are open per host:port; checkout() waits for one to be checked in
+once that many are busy. A session returned after an error is closed, not
+reused, since its position in the server's menus is unknown.
+
+Idle sessions are kept alive with a telnet NOP (or AYT, which most servers
+answer with text) every keepalive_interval seconds and closed after
+idle_timeout seconds or when the server hangs up. Whatever the server sent
+while a session was idle - AYT replies, idle warnings, broadcasts - is
+dropped on checkout (ScriptSession.discard_pending), so the next user's
+expect() only sees output that arrives after it got the session.
+"""
+
+import asyncio
+import contextlib
+import time
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+from telnetlib3.telopt import AYT, IAC, NOP
+
+from cp437_script import ScriptSession, open_session
+
+KEEPALIVES = {'nop': IAC + NOP, 'ayt': IAC + AYT}
+
+
+class _HostPool:
+    """Sessions for one host:port."""
+
+    def __init__(self):
+        self.idle = []  # (session, checked in at, last keepalive at)
+        self.busy = 0
+        self.available = asyncio.Condition()
+
+    @property
+    def open(self) -> int:
+        return len(self.idle) + self.busy
+
+
+class ConnectionPool:
+    """Hands out ScriptSessions with checkout/checkin, reusing open connections."""
+
+    def __init__(self, login: Optional[Callable[[ScriptSession], Awaitable]] = None,
+                 max_per_host: int = 4, idle_timeout: float = 300.0,
+                 keepalive_interval: Optional[float] = 60.0, keepalive: str = 'nop',
+                 **connect_options):
+        if keepalive not in KEEPALIVES:
+            raise ValueError(f"Unknown keepalive: {keepalive}")
+        if max_per_host < 1:
+            raise ValueError("max_per_host must be at least 1")
+        self.login = login
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.keepalive_interval = keepalive_interval
+        self.keepalive = keepalive
+        self.connect_options = connect_options
+
+        # Metrics
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.created = 0
+        self.discarded = 0
+        self.keepalives_sent = 0
+        self.setup_seconds = 0.0
+        self.max_setup_seconds = 0.0
+
+        self._hosts: Dict[Tuple[str, int], _HostPool] = {}
+        self._sessions: Dict[int, Tuple[str, int]] = {}
+        self._maintainer = None
+        self._checked_in = None
+        self._closed = False
+
+    async def checkout(self, host: str, port: int = 23, timeout: Optional[float] = None) -> ScriptSession:
+        """
+        An idle session for host:port, or a new one (connected and logged
+        in) if none is idle and fewer than max_per_host are open. Waits up
+        to timeout seconds for a session to be checked in otherwise.
+        """
+        if self._closed:
+            raise RuntimeError("ConnectionPool is closed")
+        if self._maintainer is None and (self.keepalive_interval or self.idle_timeout):
+            self._checked_in = asyncio.Event()
+            self._maintainer = asyncio.create_task(self._maintain())
+        key = (host, port)
+        pool = self._hosts.setdefault(key, _HostPool())
+        async with pool.available:
+            waited = False
+            while True:
+                session = self._take_idle(pool)
+                if session is not None:
+                    await session.discard_pending()
+                    if self._alive(session):
+                        self.hits += 1
+                        return session
+                    pool.busy -= 1
+                    self._discard(session)
+                    continue
+                if pool.open < self.max_per_host:
+                    break
+                if not waited:
+                    self.waits += 1
+                    waited = True
+                await asyncio.wait_for(pool.available.wait(), timeout)
+            # Reserve the slot before connecting, so others wait for it
+            pool.busy += 1
+        self.misses += 1
+        try:
+            session = await self._create(host, port)
+        except BaseException:
+            async with pool.available:
+                pool.busy -= 1
+                pool.available.notify()
+            raise
+        self._sessions[id(session)] = key
+        return session
+
+    async def checkin(self, session: ScriptSession, reuse: bool = True):
+        """Return a session; reuse=False (or a closed connection) closes it."""
+        key = self._sessions.get(id(session))
+        if key is None:
+            raise ValueError("Session does not belong to this pool")
+        pool = self._hosts[key]
+        async with pool.available:
+            pool.busy -= 1
+            if reuse and not self._closed and self._alive(session):
+                now = time.monotonic()
+                pool.idle.append((session, now, now))
+                if self._checked_in is not None:
+                    self._checked_in.set()
+            else:
+                self._discard(session)
+            pool.available.notify()
+
+    @contextlib.asynccontextmanager
+    async def session(self, host: str, port: int = 23, timeout: Optional[float] = None):
+        """Check a session out for the body of an async with block."""
+        session = await self.checkout(host, port, timeout)
+        try:
+            yield session
+        except BaseException:
+            await self.checkin(session, reuse=False)
+            raise
+        await self.checkin(session)
+
+    async def close(self):
+        """Close every idle session; busy ones are closed when checked in."""
+        self._closed = True
+        if self._maintainer is not None:
+            self._maintainer.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._maintainer
+        for pool in self._hosts.values():
+            async with pool.available:
+                for session, _, _ in pool.idle:
+                    self._discard(session)
+                pool.idle.clear()
+                pool.available.notify_all()
+
+    def stats(self) -> dict:
+        """Return pool counters and per-host open/idle session counts."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'waits': self.waits,
+            'created': self.created,
+            'discarded': self.discarded,
+            'keepalives_sent': self.keepalives_sent,
+            'setup_seconds': self.setup_seconds,
+            'max_setup_seconds': self.max_setup_seconds,
+            'mean_setup_seconds': self.setup_seconds / self.created if self.created else 0.0,
+            'hosts': {
+                f"{host}:{port}": {'open': pool.open, 'idle': len(pool.idle), 'busy': pool.busy}
+                for (host, port), pool in self._hosts.items()
+            },
+        }
+
+    async def _create(self, host: str, port: int) -> ScriptSession:
+        """Connect and log in; the time this takes is the setup time."""
+        started = time.monotonic()
+        session = await open_session(host, port, **self.connect_options)
+        try:
+            if self.login:
+                await self.login(session)
+        except BaseException:
+            session.close()
+            raise
+        elapsed = time.monotonic() - started
+        self.created += 1
+        self.setup_seconds += elapsed
+        self.max_setup_seconds = max(self.max_setup_seconds, elapsed)
+        return session
+
+    def _take_idle(self, pool: _HostPool) -> Optional[ScriptSession]:
+        """Most recently used live idle session (dead ones are dropped)."""
+        while pool.idle:
+            session, _, _ = pool.idle.pop()
+            if self._alive(session):
+                pool.busy += 1
+                return session
+            self._discard(session)
+        return None
+
+    @staticmethod
+    def _alive(session: ScriptSession) -> bool:
+        return not (session.eof or session.writer.is_closing() or session.reader.at_eof())
+
+    def _discard(self, session: ScriptSession):
+        self._sessions.pop(id(session), None)
+        session.close()
+        self.discarded += 1
+
+    async def _maintain(self):
+        """
+        Keep idle sessions alive and close those idle for too long. Sleeps
+        until the next keepalive or idle timeout is due (a checkin wakes it
+        to reschedule), so each session gets its keepalive keepalive_interval
+        after the last one, or after it was checked in.
+        """
+        command = KEEPALIVES[self.keepalive]
+        while True:
+            self._checked_in.clear()
+            now = time.monotonic()
+            due = None
+            for pool in self._hosts.values():
+                async with pool.available:
+                    kept = []
+                    for session, since, last_keepalive in pool.idle:
+                        if not self._alive(session) or (self.idle_timeout and now - since >= self.idle_timeout):
+                            self._discard(session)
+                            continue
+                        if self.keepalive_interval and now - last_keepalive >= self.keepalive_interval:
+                            session.writer.send_iac(command)
+                            self.keepalives_sent += 1
+                            last_keepalive = now
+                        kept.append((session, since, last_keepalive))
+                        for deadline in (self.keepalive_interval and last_keepalive + self.keepalive_interval,
+                                         self.idle_timeout and since + self.idle_timeout):
+                            if deadline and (due is None or deadline < due):
+                                due = deadline
+                    pool.idle = kept
+                    pool.available.notify_all()
+            timeout = None if due is None else max(0.0, due - time.monotonic())
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._checked_in.wait(), timeout)
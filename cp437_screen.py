@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+CP437 Screen - In-memory terminal screen model for decoded BBS output.
+
+Screen consumes the text produced by the CP437 decoders (glyphs plus the
+CSI/OSC/charset escape sequences they pass through), or the cp437_tokens
+tokens they are built on, and keeps the state a terminal would show: a grid
+of cells with glyph and SGR attributes, the exact cursor position,
+autowrap, the scrolling region and erases. It gives
+cursor tracking, diagnostics and screenshots one authoritative view of a
+session without a real terminal.
+
+Each row is a list of one-character strings plus an array of packed
+attribute ints; runs of plain text are written with slice assignment, so
+Python only does per-character work at escape sequences and controls.
+
+Attributes are packed as:
+
+    bits 0-3   foreground color (0-7, 8-15 bright)
+    bits 4-7   background color (0-7, 8-15 bright)
+    bit  8     bold
+    bit  9     underline
+    bit  10    blink
+    bit  11    reverse
+"""
+
+import re
+from array import array
+from typing import Callable, List, Optional, Tuple
+
+from cp437_tokens import CONTROL, CSI, TEXT
+
+FG_MASK = 0x000F
+BG_MASK = 0x00F0
+BOLD = 0x0100
+UNDERLINE = 0x0200
+BLINK = 0x0400
+REVERSE = 0x0800
+
+DEFAULT_FG = 7
+DEFAULT_BG = 0
+DEFAULT_ATTR = DEFAULT_FG | (DEFAULT_BG << 4)
+
+TAB_WIDTH = 8
+
+# Plain text, CSI, OSC, charset designation, a control (NUL included, which
+# terminals ignore), ESC 7/ESC 8 (save/restore cursor), or a lone ESC (held
+# back until the next feed when it starts an incomplete sequence)
+_TOKEN = re.compile(
+    r'([^\x00\x1b\x07\x08\x09\x0a\x0d]+)'
+    r'|\x1b\[([\x30-\x3f]*)[\x20-\x2f]*([\x40-\x7e])'
+    r'|\x1b\][^\x07\x1b]*(?:\x07|\x1b\\)'
+    r'|\x1b[()*+][^\x1b]'
+    r'|(\r\n|[\x00\x07\x08\x09\x0a\x0d])'
+    r'|\x1b([78])'
+    r'|(\x1b)'
+)
+
+_INTERMEDIATES = ' !"#$%&\'()*+,-./'
+
+_INCOMPLETE = re.compile(r'\x1b(?:\[[\x30-\x3f]*[\x20-\x2f]*|\][^\x07\x1b]*|[()*+])?\Z')
+
+# Flags set and cleared by single SGR parameters
+_SGR_FLAGS = {1: BOLD, 4: UNDERLINE, 5: BLINK, 7: REVERSE}
+_SGR_CLEAR = {22: BOLD, 24: UNDERLINE, 25: BLINK, 27: REVERSE}
+
+
+_PARAMS_CACHE = {}
+
+
+def _params(text: str, default: int = 0) -> Tuple[int, ...]:
+    """Parse 'n;n;...' CSI parameters (private markers are ignored)."""
+    key = (text, default)
+    values = _PARAMS_CACHE.get(key)
+    if values is None:
+        # BBS output reuses a small set of parameter strings; remember them
+        if len(_PARAMS_CACHE) > 4096:
+            _PARAMS_CACHE.clear()
+        values = _PARAMS_CACHE[key] = tuple(
+            int(part) if part.isdigit() else default
+            for part in text.lstrip('<=>?').split(';')
+        )
+    return values
+
+
+def apply_sgr(attr: int, params: str) -> int:
+    """Return attr updated by an SGR ('m') parameter string."""
+    values = _params(params)
+    i = 0
+    while i < len(values):
+        value = values[i]
+        if value == 0:
+            attr = DEFAULT_ATTR
+        elif value in _SGR_FLAGS:
+            attr |= _SGR_FLAGS[value]
+        elif value in _SGR_CLEAR:
+            attr &= ~_SGR_CLEAR[value]
+        elif 30 <= value <= 37:
+            attr = (attr & ~FG_MASK) | (value - 30)
+        elif value == 39:
+            attr = (attr & ~FG_MASK) | DEFAULT_FG
+        elif 40 <= value <= 47:
+            attr = (attr & ~BG_MASK) | ((value - 40) << 4)
+        elif value == 49:
+            attr = (attr & ~BG_MASK) | (DEFAULT_BG << 4)
+        elif 90 <= value <= 97:
+            attr = (attr & ~FG_MASK) | (value - 90 + 8)
+        elif 100 <= value <= 107:
+            attr = (attr & ~BG_MASK) | ((value - 100 + 8) << 4)
+        elif value in (38, 48):
+            # Extended colors: keep the 16-color palette entries, skip the rest
+            mode = values[i + 1] if i + 1 < len(values) else None
+            if mode == 5 and i + 2 < len(values):
+                color = values[i + 2]
+                if color < 16:
+                    if value == 38:
+                        attr = (attr & ~FG_MASK) | color
+                    else:
+                        attr = (attr & ~BG_MASK) | (color << 4)
+                i += 2
+            elif mode == 2:
+                i += 4
+        i += 1
+    return attr
+
+
+_SGR_SEQUENCES = {}
+
+
+def sgr_sequence(attr: int) -> str:
+    """
+    SGR sequence that sets exactly attr whatever the previous state was.
+    Default colors are left to the terminal's own default.
+    """
+    sequence = _SGR_SEQUENCES.get(attr)
+    if sequence is None:
+        params = ['0']
+        params.extend(str(value) for value, flag in _SGR_FLAGS.items() if attr & flag)
+        fg = attr & FG_MASK
+        bg = (attr & BG_MASK) >> 4
+        if fg != DEFAULT_FG:
+            params.append(str(30 + fg if fg < 8 else 90 + fg - 8))
+        if bg != DEFAULT_BG:
+            params.append(str(40 + bg if bg < 8 else 100 + bg - 8))
+        sequence = _SGR_SEQUENCES[attr] = f"\x1b[{';'.join(params)}m"
+    return sequence
+
+
+class Screen:
+    """
+    A cols x rows terminal screen. Coordinates are 0-based (x = column,
+    y = row); on_position(from_xy, to_xy) is called for every absolute cursor
+    positioning sequence.
+    """
+
+    def __init__(self, cols: int = 80, rows: int = 24,
+                 on_position: Optional[Callable[[Tuple[int, int], Tuple[int, int]], None]] = None):
+        self.cols = cols
+        self.rows = rows
+        self.on_position = on_position
+        self._sgr_cache = {}
+        self._fills = {}
+        self.scrolled = 0  # lines scrolled off the whole screen, ever
+        self.reset()
+
+    def reset(self):
+        """Clear the screen and restore power-on state."""
+        self.chars = [self._blank_chars() for _ in range(self.rows)]
+        self.attrs = [self._blank_attrs(DEFAULT_ATTR) for _ in range(self.rows)]
+        self.x = 0
+        self.y = 0
+        self.attr = DEFAULT_ATTR
+        self.wrap_pending = False
+        self.autowrap = True
+        self.cursor_visible = True
+        self.top = 0
+        self.bottom = self.rows - 1
+        self.saved = (0, 0, DEFAULT_ATTR)
+        self._pending = ''
+
+    def _blank_chars(self) -> list:
+        return [' '] * self.cols
+
+    def _blank_attrs(self, attr: int) -> array:
+        return self._fill(attr)[:]
+
+    def _fill(self, attr: int) -> array:
+        """A full row of one attribute, sliced to paint runs of cells."""
+        fill = self._fills.get(attr)
+        if fill is None:
+            fill = self._fills[attr] = array('I', [attr]) * self.cols
+        return fill
+
+    @property
+    def erase_attr(self) -> int:
+        """Erased cells take the current colors (background color erase)."""
+        return self.attr & (FG_MASK | BG_MASK)
+
+    # -- Input -------------------------------------------------------------
+
+    def feed(self, text: str):
+        """Apply decoded terminal output to the screen."""
+        if self._pending:
+            text = self._pending + text
+            self._pending = ''
+        write = self._write
+        handlers = _CSI_HANDLERS
+        for match in _TOKEN.finditer(text):
+            run, params, final, control, dec, lone_esc = match.groups()
+            if run is not None:
+                write(run)
+            elif final is not None:
+                handler = handlers.get(final)
+                if handler is not None:
+                    handler(self, params)
+            elif control is not None:
+                self._control(control)
+            elif dec is not None:
+                (self._save if dec == '7' else self._restore)('')
+            elif lone_esc is not None and _INCOMPLETE.match(text, match.start()):
+                # Start of a sequence that has not fully arrived yet
+                self._pending = text[match.start():]
+                return
+            # OSC and charset designations do not change the screen
+
+    def feed_tokens(self, tokens):
+        """
+        Apply cp437_tokens tokens (tokenized with controls=True) without
+        parsing the text again.
+        """
+        write = self._write
+        handlers = _CSI_HANDLERS
+        for kind, text, _, _ in tokens:
+            if kind == TEXT:
+                write(text)
+            elif kind == CSI:
+                handler = handlers.get(text[-1])
+                if handler is not None:
+                    handler(self, text[2:-1].rstrip(_INTERMEDIATES))
+            elif kind == CONTROL:
+                self._control(text)
+
+    def _write(self, run: str):
+        x = self.x
+        end = x + len(run)
+        cols = self.cols
+        if end < cols and not self.wrap_pending:
+            # Fast path: the run fits on the current row
+            self.chars[self.y][x:end] = run
+            self.attrs[self.y][x:end] = self._fill(self.attr)[x:end]
+            self.x = end
+            return
+        while run:
+            if self.wrap_pending:
+                self.wrap_pending = False
+                self.x = 0
+                self._linefeed()
+            x = self.x
+            piece = run[:cols - x]
+            end = x + len(piece)
+            self.chars[self.y][x:end] = piece
+            self.attrs[self.y][x:end] = self._fill(self.attr)[x:end]
+            run = run[len(piece):]
+            if end >= cols:
+                self.x = cols - 1
+                if self.autowrap:
+                    self.wrap_pending = True
+                elif run:
+                    # Without autowrap the rest overwrites the last column
+                    self.chars[self.y][cols - 1] = run[-1]
+                    self.attrs[self.y][cols - 1] = self.attr
+                    run = ''
+            else:
+                self.x = end
+
+    def _control(self, char: str):
+        if char == '\r\n':
+            self.x = 0
+            self._linefeed()
+        elif char == '\n':
+            self._linefeed()
+        elif char == '\r':
+            self.x = 0
+        elif char == '\x08':
+            self.x = max(0, self.x - 1)
+        elif char == '\t':
+            self.x = min(self.cols - 1, (self.x // TAB_WIDTH + 1) * TAB_WIDTH)
+        else:
+            return  # BEL, and NUL (padding some servers send)
+        self.wrap_pending = False
+
+    def _linefeed(self):
+        if self.y == self.bottom:
+            self.scroll_up(1)
+        elif self.y < self.rows - 1:
+            self.y += 1
+
+    # -- Scrolling and editing ---------------------------------------------
+
+    def scroll_up(self, count: int = 1):
+        """Scroll the scrolling region up, blank lines entering at the bottom."""
+        top, bottom = self.top, self.bottom
+        count = min(count, bottom - top + 1)
+        chars, attrs = self.chars, self.attrs
+        blank = self._fill(self.erase_attr)
+        if top == 0 and bottom == self.rows - 1:
+            self.scrolled += count
+        for _ in range(count):
+            del chars[top]
+            del attrs[top]
+            chars.insert(bottom, [' '] * self.cols)
+            attrs.insert(bottom, blank[:])
+
+    def scroll_down(self, count: int = 1):
+        """Scroll the scrolling region down, blank lines entering at the top."""
+        top, bottom = self.top, self.bottom
+        count = min(count, bottom - top + 1)
+        chars, attrs = self.chars, self.attrs
+        blank = self._fill(self.erase_attr)
+        for _ in range(count):
+            del chars[bottom]
+            del attrs[bottom]
+            chars.insert(top, [' '] * self.cols)
+            attrs.insert(top, blank[:])
+
+    def _erase(self, y: int, start: int, end: int):
+        self.chars[y][start:end] = [' '] * (end - start)
+        self.attrs[y][start:end] = self._fill(self.erase_attr)[start:end]
+
+    def _move(self, x: int, y: int):
+        cols, rows = self.cols, self.rows
+        self.x = x if 0 <= x < cols else (0 if x < 0 else cols - 1)
+        self.y = y if 0 <= y < rows else (0 if y < 0 else rows - 1)
+        self.wrap_pending = False
+
+    def _position(self, x: int, y: int):
+        before = (self.x, self.y)
+        self._move(x, y)
+        if self.on_position is not None:
+            self.on_position(before, (self.x, self.y))
+
+    # -- CSI handlers (params is the raw parameter string) ------------------
+
+    def _cuu(self, params):
+        limit = self.top if self.y >= self.top else 0
+        self._move(self.x, max(limit, self.y - (_params(params, 1)[0] or 1)))
+
+    def _cud(self, params):
+        limit = self.bottom if self.y <= self.bottom else self.rows - 1
+        self._move(self.x, min(limit, self.y + (_params(params, 1)[0] or 1)))
+
+    def _cuf(self, params):
+        self._move(self.x + (_params(params, 1)[0] or 1), self.y)
+
+    def _cub(self, params):
+        self._move(self.x - (_params(params, 1)[0] or 1), self.y)
+
+    def _cnl(self, params):
+        self._cud(params)
+        self.x = 0
+
+    def _cpl(self, params):
+        self._cuu(params)
+        self.x = 0
+
+    def _cha(self, params):
+        self._position((_params(params, 1)[0] or 1) - 1, self.y)
+
+    def _vpa(self, params):
+        self._position(self.x, (_params(params, 1)[0] or 1) - 1)
+
+    def _cup(self, params):
+        values = _params(params, 1)
+        column = values[1] if len(values) > 1 else 1
+        self._position((column or 1) - 1, (values[0] or 1) - 1)
+
+    def _ed(self, params):
+        mode = _params(params)[0]
+        if mode == 0:
+            self._erase(self.y, self.x, self.cols)
+            rows = range(self.y + 1, self.rows)
+        elif mode == 1:
+            self._erase(self.y, 0, self.x + 1)
+            rows = range(0, self.y)
+        elif mode in (2, 3):
+            rows = range(self.rows)
+        else:
+            return
+        for y in rows:
+            self._erase(y, 0, self.cols)
+
+    def _el(self, params):
+        mode = _params(params)[0]
+        if mode == 0:
+            self._erase(self.y, self.x, self.cols)
+        elif mode == 1:
+            self._erase(self.y, 0, self.x + 1)
+        elif mode == 2:
+            self._erase(self.y, 0, self.cols)
+
+    def _il(self, params):
+        if self.top <= self.y <= self.bottom:
+            top, self.top = self.top, self.y
+            self.scroll_down(_params(params, 1)[0] or 1)
+            self.top = top
+            self.x = 0
+
+    def _dl(self, params):
+        if self.top <= self.y <= self.bottom:
+            top, self.top = self.top, self.y
+            self.scroll_up(_params(params, 1)[0] or 1)
+            self.top = top
+            self.x = 0
+
+    def _dch(self, params):
+        count = min(_params(params, 1)[0] or 1, self.cols - self.x)
+        chars, attrs = self.chars[self.y], self.attrs[self.y]
+        del chars[self.x:self.x + count]
+        del attrs[self.x:self.x + count]
+        chars.extend([' '] * count)
+        attrs.extend(self._fill(self.erase_attr)[:count])
+
+    def _ich(self, params):
+        count = min(_params(params, 1)[0] or 1, self.cols - self.x)
+        chars, attrs = self.chars[self.y], self.attrs[self.y]
+        chars[self.x:self.x] = [' '] * count
+        attrs[self.x:self.x] = self._fill(self.erase_attr)[:count]
+        del chars[self.cols:]
+        del attrs[self.cols:]
+
+    def _ech(self, params):
+        count = _params(params, 1)[0] or 1
+        self._erase(self.y, self.x, min(self.cols, self.x + count))
+
+    def _su(self, params):
+        self.scroll_up(_params(params, 1)[0] or 1)
+
+    def _sd(self, params):
+        self.scroll_down(_params(params, 1)[0] or 1)
+
+    def _sgr(self, params):
+        key = (self.attr, params)
+        attr = self._sgr_cache.get(key)
+        if attr is None:
+            if len(self._sgr_cache) > 4096:
+                self._sgr_cache.clear()
+            attr = self._sgr_cache[key] = apply_sgr(self.attr, params)
+        self.attr = attr
+
+    def _decstbm(self, params):
+        values = _params(params, 0)
+        top = (values[0] or 1) - 1
+        bottom = ((values[1] if len(values) > 1 else 0) or self.rows) - 1
+        if 0 <= top < bottom < self.rows:
+            self.top, self.bottom = top, bottom
+            self._move(0, 0)
+
+    def _save(self, params):
+        self.saved = (self.x, self.y, self.attr)
+
+    def _restore(self, params):
+        x, y, self.attr = self.saved
+        self._move(x, y)
+
+    def _set_mode(self, params, enabled=True):
+        if params.startswith('?'):
+            for value in _params(params):
+                if value == 7:
+                    self.autowrap = enabled
+                    if not enabled:
+                        self.wrap_pending = False
+                elif value == 25:
+                    self.cursor_visible = enabled
+
+    def _reset_mode(self, params):
+        self._set_mode(params, enabled=False)
+
+    # -- Output ------------------------------------------------------------
+
+    @property
+    def cursor(self) -> Tuple[int, int]:
+        """Cursor position as (x, y), 0-based."""
+        return self.x, self.y
+
+    def cell(self, x: int, y: int) -> Tuple[str, int]:
+        """Glyph and attribute of one cell."""
+        return self.chars[y][x], self.attrs[y][x]
+
+    def line(self, y: int) -> str:
+        """Text of one row (trailing blanks kept)."""
+        return ''.join(self.chars[y])
+
+    def display(self) -> List[str]:
+        """Text of every row, trailing blanks stripped (a plain screenshot)."""
+        return [''.join(row).rstrip() for row in self.chars]
+
+
+_CSI_HANDLERS = {
+    'A': Screen._cuu,
+    'B': Screen._cud,
+    'C': Screen._cuf,
+    'D': Screen._cub,
+    'E': Screen._cnl,
+    'F': Screen._cpl,
+    'G': Screen._cha,
+    '`': Screen._cha,
+    'H': Screen._cup,
+    'f': Screen._cup,
+    'd': Screen._vpa,
+    'J': Screen._ed,
+    'K': Screen._el,
+    'L': Screen._il,
+    'M': Screen._dl,
+    'P': Screen._dch,
+    '@': Screen._ich,
+    'X': Screen._ech,
+    'S': Screen._su,
+    'T': Screen._sd,
+    'm': Screen._sgr,
+    'r': Screen._decstbm,
+    's': Screen._save,
+    'u': Screen._restore,
+    'h': Screen._set_mode,
+    'l': Screen._reset_mode,
+}
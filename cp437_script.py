@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+CP437 Script - Expect-style automation of BBS sessions.
+
+A ScriptSession wraps a binary telnetlib3 connection:
+
+    session = await open_session('bbs.example.com', 23)
+    await session.expect('Name:', timeout=10)
+    session.sendline('sysop')
+    index = await session.expect([PASSWORD, Regex(r'Unknown user')])  # PASSWORD = Literal('Password:')
+
+Server output is decoded as CP437 and, by default, only the text tokens are
+matched (escape sequences are left out, so a prompt drawn in two colors
+still reads 'Password:'). Patterns are Literal or Regex matchers, compiled
+once; a str is a Literal and a compiled re pattern a Regex.
+
+Matching is incremental: after a read only the new text is searched, plus
+the last few characters before it, for a match that straddles reads (a
+Literal needs len(text) - 1 of them, a Regex max_length). Text up to the
+end of a match is consumed; unmatched text is kept up to max_buffer
+characters.
+
+run_scripts() runs one script coroutine per target, all in one event loop.
+
+Usage:
+    python3 cp437_script.py login.py bbs1.example.com bbs2.example.com:2323
+
+where login.py defines `async def run(session)`; each target's return value
+(or error) is printed as a JSON line.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import json
+import re
+import sys
+import time
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple, Union
+
+import telnetlib3
+
+from cp437_telnet import (
+    CP437IncrementalDecoder,
+    FastConnectClient,
+    ReadSizer,
+    encode_to_cp437,
+)
+from cp437_tokens import TEXT, tokens_text
+from multi_session import parse_target
+
+
+class ExpectTimeout(TimeoutError):
+    """No pattern matched before the timeout."""
+
+
+class ExpectEOF(EOFError):
+    """The connection closed before any pattern matched."""
+
+
+class Literal:
+    """Matches exact text."""
+
+    def __init__(self, text: str):
+        if not text:
+            raise ValueError("Literal pattern must not be empty")
+        self.text = text
+        # Characters before new text that a match may start in
+        self.overlap = len(text) - 1
+
+    def search(self, buffer: str, start: int) -> Optional[Tuple[int, int, str]]:
+        index = buffer.find(self.text, start)
+        if index < 0:
+            return None
+        return index, index + len(self.text), self.text
+
+    def __repr__(self) -> str:
+        return f"Literal({self.text!r})"
+
+
+class Regex:
+    """
+    Matches a regular expression. Matches are assumed to be at most
+    max_length characters long; that many characters before new text are
+    searched again. The buffer is consumed up to each match and trimmed
+    to max_buffer, so its start is not a line or screen position: ^ and \\A
+    match at index 0 of whatever happens to be buffered (^ also after a
+    newline with re.M), which may be mid-line. Avoid them; to match at a
+    line start, match the newline itself, e.g. r'\\n(\\d+) messages'.
+    """
+
+    def __init__(self, pattern: Union[str, re.Pattern], flags: int = 0, max_length: int = 256):
+        self.regex = re.compile(pattern, flags) if isinstance(pattern, str) else pattern
+        self.overlap = max_length
+
+    def search(self, buffer: str, start: int) -> Optional[Tuple[int, int, re.Match]]:
+        match = self.regex.search(buffer, start)
+        if match is None:
+            return None
+        return match.start(), match.end(), match
+
+    def __repr__(self) -> str:
+        return f"Regex({self.regex.pattern!r})"
+
+
+Pattern = Union[str, re.Pattern, Literal, Regex]
+
+
+def compile_pattern(pattern: Pattern):
+    """Matcher for a pattern: str -> Literal, compiled re -> Regex."""
+    if isinstance(pattern, (Literal, Regex)):
+        return pattern
+    if isinstance(pattern, str):
+        return Literal(pattern)
+    if isinstance(pattern, re.Pattern):
+        return Regex(pattern)
+    raise TypeError(f"Not a pattern: {pattern!r}")
+
+
+class ScriptSession:
+    """
+    Expect/send over one telnet connection. before holds the text skipped
+    by the last expect() and match what matched (the text for a Literal,
+    the re.Match for a Regex).
+    """
+
+    def __init__(self, reader, writer, plain: bool = True, max_buffer: int = 65536,
+                 sizer: Optional[ReadSizer] = None):
+        self.reader = reader
+        self.writer = writer
+        self.plain = plain
+        self.max_buffer = max_buffer
+        self.sizer = sizer or ReadSizer()
+        self.decoder = CP437IncrementalDecoder()
+        self.buffer = ''
+        self.before = ''
+        self.match = None
+        self.eof = False
+        self.bytes_read = 0
+        self.chars_scanned = 0
+
+    async def expect(self, patterns: Union[Pattern, Sequence[Pattern]],
+                     timeout: Optional[float] = 30.0) -> int:
+        """
+        Wait until one of patterns matches the server's output; return its
+        index (0 for a single pattern). The earliest match wins. Raises
+        ExpectTimeout or ExpectEOF.
+        """
+        if isinstance(patterns, (list, tuple)):
+            matchers = [compile_pattern(pattern) for pattern in patterns]
+        else:
+            matchers = [compile_pattern(patterns)]
+        overlap = max(matcher.overlap for matcher in matchers)
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        # Text from here on has not been searched for these patterns yet
+        scanned = 0
+        while True:
+            start = max(0, scanned - overlap)
+            self.chars_scanned += len(self.buffer) - start
+            best = None
+            for index, matcher in enumerate(matchers):
+                found = matcher.search(self.buffer, max(0, scanned - matcher.overlap))
+                if found and (best is None or found[0] < best[1][0]):
+                    best = (index, found)
+            if best is not None:
+                index, (match_start, match_end, match) = best
+                self.before = self.buffer[:match_start]
+                self.match = match
+                self.buffer = self.buffer[match_end:]
+                return index
+            if self.eof:
+                raise ExpectEOF(f"connection closed while waiting for {matchers!r}")
+
+            scanned = len(self.buffer)
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                raise ExpectTimeout(f"timed out waiting for {matchers!r}")
+            try:
+                text = await asyncio.wait_for(self._read(), remaining)
+            except asyncio.TimeoutError:
+                raise ExpectTimeout(f"timed out waiting for {matchers!r}") from None
+            self.buffer += text
+            if len(self.buffer) > self.max_buffer:
+                # Drop the oldest text; keep what a match could still start in
+                drop = len(self.buffer) - self.max_buffer
+                self.buffer = self.buffer[drop:]
+                scanned = max(0, scanned - drop)
+
+    def send(self, text: str):
+        """Send text to the server as CP437."""
+        self.writer.write(encode_to_cp437(text))
+
+    def sendline(self, text: str = ''):
+        """Send text followed by Enter (CR)."""
+        self.send(text + '\r')
+
+    async def drain(self):
+        """Wait until sent data has been handed to the transport."""
+        await self.writer.drain()
+
+    def close(self):
+        self.writer.close()
+
+    async def discard_pending(self) -> int:
+        """
+        Drop server output that no expect() has looked at: what the reader
+        has buffered, the decoder's held-back tail and the unmatched text.
+        Does not wait for more output; returns the number of bytes dropped.
+        """
+        dropped = 0
+        while not self.eof:
+            # A read returns at once when data is buffered; one loop pass
+            # tells, and cancelling a read still waiting loses nothing
+            read = asyncio.ensure_future(self.reader.read(self.sizer.size))
+            await asyncio.sleep(0)
+            if not read.done():
+                read.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await read
+                break
+            data = read.result()
+            if not data:
+                self.eof = True
+            dropped += len(data)
+        self.decoder.reset()
+        self.buffer = ''
+        self.before = ''
+        self.match = None
+        return dropped
+
+    async def _read(self) -> str:
+        """Read and decode the next piece of server output."""
+        while True:
+            data = await self.reader.read(self.sizer.size)
+            if not data:
+                self.eof = True
+                tokens = self.decoder.decode_tokens(b'', final=True, controls=False)
+            else:
+                self.sizer.update(len(data))
+                self.bytes_read += len(data)
+                tokens = self.decoder.decode_tokens(data, controls=False)
+            if self.plain:
+                tokens = [token for token in tokens if token[0] == TEXT]
+            text = tokens_text(tokens)
+            if text or self.eof:
+                return text
+
+
+async def open_session(host: str, port: int = 23, cols: int = 80, rows: int = 24,
+                       negotiate_timeout: float = 1.0, connect_timeout: Optional[float] = 10.0,
+                       **options) -> ScriptSession:
+    """Connect and return a ScriptSession; options go to ScriptSession."""
+    reader, writer = await telnetlib3.open_connection(
+        host,
+        port,
+        client_factory=FastConnectClient,
+        encoding=False,
+        force_binary=True,
+        cols=cols,
+        rows=rows,
+        connect_minwait=0.0,
+        connect_maxwait=negotiate_timeout,
+        connect_timeout=connect_timeout,
+    )
+    return ScriptSession(reader, writer, **options)
+
+
+async def run_scripts(script: Callable[[ScriptSession], Awaitable],
+                      targets: List[Tuple[str, int]], max_concurrent: int = 20,
+                      pool=None, **connect_options) -> List[dict]:
+    """
+    Run script(session) against every target concurrently (at most
+    max_concurrent at a time). Returns one result per target, in order:
+    {'target', 'result' or 'error', 'seconds'}. With a cp437_pool
+    ConnectionPool, sessions are checked out of the pool (connect_options
+    are then the pool's) instead of connected and closed per run.
+    """
+    slots = asyncio.Semaphore(max_concurrent)
+
+    async def run_one(host: str, port: int) -> dict:
+        entry = {'target': f"{host}:{port}"}
+        async with slots:
+            started = time.monotonic()
+            try:
+                if pool is not None:
+                    async with pool.session(host, port) as session:
+                        entry['result'] = await script(session)
+                else:
+                    session = await open_session(host, port, **connect_options)
+                    try:
+                        entry['result'] = await script(session)
+                    finally:
+                        session.close()
+            except Exception as e:
+                entry['error'] = f"{type(e).__name__}: {e}"
+            entry['seconds'] = time.monotonic() - started
+        return entry
+
+    return await asyncio.gather(*(run_one(host, port) for host, port in targets))
+
+
+def load_script(path: str):
+    """
+    Load a script file as a module. It must define async def run(session);
+    an optional async def login(session) is run once per pooled connection.
+    """
+    spec = importlib.util.spec_from_file_location('cp437_user_script', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    if not asyncio.iscoroutinefunction(getattr(module, 'run', None)):
+        raise ValueError(f"{path} does not define async def run(session)")
+    return module
+
+
+async def _repeat(module, targets: List[Tuple[str, int]], repeat: int, interval: float,
+                  max_concurrent: int, **connect_options) -> List[dict]:
+    """Run the script repeat times per target over pooled connections."""
+    # Imported here: cp437_pool builds on this module
+    from cp437_pool import ConnectionPool
+
+    pool = ConnectionPool(login=getattr(module, 'login', None), **connect_options)
+    results = []
+    try:
+        for round_number in range(repeat):
+            if round_number:
+                await asyncio.sleep(interval)
+            for entry in await run_scripts(module.run, targets, max_concurrent, pool=pool):
+                entry['round'] = round_number + 1
+                results.append(entry)
+    finally:
+        await pool.close()
+    print(json.dumps(pool.stats()), file=sys.stderr)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an expect script against BBS sessions")
+    parser.add_argument("script", help="Python file defining async def run(session)")
+    parser.add_argument("targets", nargs="+", help="Targets as host or host:port")
+    parser.add_argument(
+        "--max-concurrent",
+        type=int,
+        default=20,
+        help="Sessions running at once (default: 20)"
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Run the script this many times per target over pooled connections, "
+             "logging in once with the script's login(session) if it has one (default: 1)"
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=0.0,
+        help="Seconds between --repeat rounds (default: 0)"
+    )
+    parser.add_argument("--cols", type=int, default=80, help="Terminal width (default: 80)")
+    parser.add_argument("--rows", type=int, default=24, help="Terminal height (default: 24)")
+    args = parser.parse_args()
+
+    try:
+        module = load_script(args.script)
+    except (OSError, ValueError, SyntaxError) as e:
+        parser.error(f"cannot load script: {e}")
+    targets = [parse_target(target) for target in args.targets]
+    if args.repeat > 1:
+        results = asyncio.run(_repeat(
+            module, targets, args.repeat, args.interval, args.max_concurrent,
+            cols=args.cols, rows=args.rows))
+    else:
+        results = asyncio.run(run_scripts(
+            module.run, targets, args.max_concurrent, cols=args.cols, rows=args.rows))
+    for entry in results:
+        print(json.dumps(entry, default=str))
+    sys.exit(1 if any('error' in entry for entry in results) else 0)
+
+
+if __name__ == '__main__':
+    main()
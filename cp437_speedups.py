@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+CP437 Speedups - Picks the compiled decoder backend when it is built.
+
+_cp437_speedups is an optional C extension implementing the tokenizer walk
+(CSI, OSC and charset scanning), the text-only decode and the table-driven
+encode. setup.py builds it when a compiler is available; for a source
+checkout run
+
+    python3 setup.py build_ext --inplace
+
+Without it - or with CP437_BACKEND=python in the environment - the pure
+Python code in cp437_tokens and cp437_tables is used; both give the same
+results. The codec functions check `compiled` on every call, so
+use_backend() switches backends at run time (the tests run the codec
+suites against each one).
+"""
+
+import os
+from typing import Tuple
+
+try:
+    import _cp437_speedups
+except ImportError:
+    _cp437_speedups = None
+
+BACKENDS = ('c', 'python')
+
+# The compiled module in use, or None for pure Python
+compiled = _cp437_speedups if os.environ.get('CP437_BACKEND') != 'python' else None
+
+
+def available() -> Tuple[str, ...]:
+    """Backends that can be used here."""
+    return BACKENDS if _cp437_speedups is not None else ('python',)
+
+
+def backend() -> str:
+    """Name of the backend in use."""
+    return 'c' if compiled is not None else 'python'
+
+
+def use_backend(name: str) -> str:
+    """
+    Switch to backend name ('c' or 'python'); returns the previous one.
+    Raises ValueError for an unknown name and ImportError if the
+    extension is not built.
+    """
+    global compiled
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend: {name} (choose from {', '.join(BACKENDS)})")
+    if name == 'c' and _cp437_speedups is None:
+        raise ImportError("_cp437_speedups is not built; run: python3 setup.py build_ext --inplace")
+    previous = backend()
+    compiled = _cp437_speedups if name == 'c' else None
+    return previous
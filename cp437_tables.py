@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+CP437 Tables - The one set of CP437 lookup tables shared by every module.
+
+The 256-character decoding tables are frozen literals (Python's cp437 codec
+with the low control bytes and 0x7F replaced by their IBM PC glyphs), so
+importing this module costs almost nothing. Two variants exist:
+
+    CONTROL_PRESERVING_TABLE  BS, TAB, LF and CR (0x08, 0x09, 0x0A, 0x0D)
+                              stay control characters; used for live
+                              terminal output (cp437_telnet)
+    FULL_GLYPH_TABLE          every byte is a glyph, including ◘ ○ ◙ ♪;
+                              used for inspecting raw data (cp437_translator)
+
+The tables plug straight into codecs.charmap_decode. The derived maps are
+read-only (MappingProxyType) so no caller can change them for the others.
+"""
+
+import codecs
+from types import MappingProxyType
+
+import cp437_speedups
+
+CONTROL_PRESERVING_TABLE = (
+    "\x00☺☻♥♦♣♠•\x08\x09\x0a♂♀\x0d►◄"  # 0x00
+    "↕‼¶§▬↨↑↓→←∟↔▲▼⌠⌡"  # 0x10
+    " !\"#$%&'()*+,-./"  # 0x20
+    "0123456789:;<=>?"  # 0x30
+    "@ABCDEFGHIJKLMNO"  # 0x40
+    "PQRSTUVWXYZ[\\]^_"  # 0x50
+    "`abcdefghijklmno"  # 0x60
+    "pqrstuvwxyz{|}~⌂"  # 0x70
+    "ÇüéâäàåçêëèïîìÄÅ"  # 0x80
+    "ÉæÆôöòûùÿÖÜ¢£¥₧ƒ"  # 0x90
+    "áíóúñÑªº¿⌐¬½¼¡«»"  # 0xA0
+    "░▒▓│┤╡╢╖╕╣║╗╝╜╛┐"  # 0xB0
+    "└┴┬├─┼╞╟╚╔╩╦╠═╬╧"  # 0xC0
+    "╨╤╥╙╘╒╓╫╪┘┌█▄▌▐▀"  # 0xD0
+    "αßΓπΣσµτΦΘΩδ∞φε∩"  # 0xE0
+    "≡±≥≤⌠⌡÷≈°∙·√ⁿ²■\xa0"  # 0xF0
+)
+
+FULL_GLYPH_TABLE = (
+    CONTROL_PRESERVING_TABLE[:0x08]
+    + "◘○◙"  # BS, TAB, LF
+    + CONTROL_PRESERVING_TABLE[0x0B:0x0D]
+    + "♪"  # CR
+    + CONTROL_PRESERVING_TABLE[0x0E:]
+)
+
+
+def _inverse(table: str) -> dict:
+    """Unicode -> CP437 byte; the first (lowest) byte wins for duplicates."""
+    inverse = {}
+    for byte, char in enumerate(table):
+        inverse.setdefault(char, byte)
+    return inverse
+
+
+def _encoding_map(table: str) -> dict:
+    """
+    Map for codecs.charmap_encode: every character below U+0100 encodes as
+    itself (the latin-1 fallback) unless the table has a glyph for it, in
+    which case the first matching byte wins.
+    """
+    encoding_map = {i: i for i in range(256)}
+    encoding_map.update({ord(char): byte for char, byte in _inverse(table).items()})
+    return encoding_map
+
+
+CP437_MAP = MappingProxyType(dict(enumerate(CONTROL_PRESERVING_TABLE)))
+UNICODE_TO_CP437 = MappingProxyType(_inverse(CONTROL_PRESERVING_TABLE))
+ENCODING_MAP = MappingProxyType(_encoding_map(CONTROL_PRESERVING_TABLE))
+
+FULL_GLYPH_MAP = MappingProxyType(dict(enumerate(FULL_GLYPH_TABLE)))
+FULL_GLYPH_UNICODE_TO_CP437 = MappingProxyType(_inverse(FULL_GLYPH_TABLE))
+FULL_GLYPH_ENCODING_MAP = MappingProxyType(_encoding_map(FULL_GLYPH_TABLE))
+
+# Encoding map of each decoding table encode_cp437 accepts (the compiled
+# encoder builds its own inverse from the table)
+_ENCODING_MAPS = {
+    CONTROL_PRESERVING_TABLE: ENCODING_MAP,
+    FULL_GLYPH_TABLE: FULL_GLYPH_ENCODING_MAP,
+}
+
+# Closest CP437 rendering for common characters CP437 lacks (heavy, rounded
+# and dashed box drawing, typographic punctuation), used by errors='approximate'
+CP437_APPROXIMATIONS = MappingProxyType({
+    # Heavy lines and corners
+    "━": "─", "┃": "│", "┏": "┌", "┓": "┐", "┗": "└", "┛": "┘",
+    "┣": "├", "┫": "┤", "┳": "┬", "┻": "┴", "╋": "┼",
+    # Rounded corners
+    "╭": "┌", "╮": "┐", "╰": "└", "╯": "┘",
+    # Dashed and half lines
+    "┄": "─", "┅": "─", "┈": "─", "┉": "─", "╌": "─", "╍": "─",
+    "┆": "│", "┇": "│", "┊": "│", "┋": "│", "╎": "│", "╏": "│",
+    "╴": "─", "╶": "─", "╵": "│", "╷": "│",
+    # Eighth blocks
+    "▔": "▀", "▁": "▄", "▏": "▌", "▕": "▐",
+    # Typographic punctuation
+    "‘": "'", "’": "'", "“": '"', "”": '"', "–": "-", "—": "-", "…": "...",
+    "✓": "√", "✔": "√",
+})
+
+
+def _approximate_cp437(error: UnicodeEncodeError) -> tuple:
+    """Codec error handler: replace unencodable text with CP437 look-alikes."""
+    replacement = ''.join(
+        CP437_APPROXIMATIONS.get(char, '?') for char in error.object[error.start:error.end]
+    )
+    return replacement, error.end
+
+
+codecs.register_error('cp437-approximate', _approximate_cp437)
+
+# errors= modes for encode_cp437; any other registered codec error
+# handler name (e.g. 'ignore') is used as-is
+ENCODE_ERRORS = MappingProxyType({
+    'strict': 'strict',
+    'replace': 'replace',
+    'approximate': 'cp437-approximate',
+})
+
+
+def decode_cp437(data: bytes, table: str = CONTROL_PRESERVING_TABLE) -> str:
+    """Map every byte through a decoding table (no escape handling)."""
+    return codecs.charmap_decode(data, 'strict', table)[0]
+
+
+def encode_cp437(text: str, errors: str = "replace", table: str = CONTROL_PRESERVING_TABLE) -> bytes:
+    """
+    Encode text to CP437 bytes in bulk, inverting table
+    (CONTROL_PRESERVING_TABLE or FULL_GLYPH_TABLE).
+
+    Characters with no CP437 byte raise UnicodeEncodeError with
+    errors='strict', become '?' with 'replace', or the nearest CP437
+    look-alike with 'approximate'.
+    """
+    encoding_map = _ENCODING_MAPS.get(table)
+    if encoding_map is None:
+        raise ValueError("table must be CONTROL_PRESERVING_TABLE or FULL_GLYPH_TABLE")
+    if text.isascii():
+        return text.encode('ascii')  # ASCII maps to itself in both variants
+    compiled = cp437_speedups.compiled
+    if compiled is not None:
+        encoded = compiled.encode(text, table)
+        if encoded is not None:
+            return encoded
+        # Unencodable characters: let the codec's error handler deal with them
+    try:
+        return codecs.charmap_encode(text, ENCODE_ERRORS.get(errors, errors), encoding_map)[0]
+    except UnicodeEncodeError as e:
+        raise UnicodeEncodeError('cp437_graphical', text, e.start, e.end, e.reason) from None
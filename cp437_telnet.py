@@ -9,111 +9,137 @@ that are typically lost in standard UTF-8 telnet.
 
 import argparse
 import asyncio
+import atexit
 import codecs
+import gzip
+import json
+import os
+import re
+import shutil
 import sys
+import threading
 import tty
 import termios
 import time
+from concurrent.futures import ThreadPoolExecutor
+from array import array
 from datetime import datetime
 from typing import Optional, Dict
 
 import telnetlib3
+from telnetlib3.telopt import BINARY, NAWS, SGA
+
+import cp437_speedups
+from cp437_tables import (  # noqa: F401 (UNICODE_TO_CP437 is re-exported)
+    CONTROL_PRESERVING_TABLE,
+    CP437_MAP,
+    UNICODE_TO_CP437,
+    encode_cp437,
+)
+from cp437_filters import DEFAULT_FILTERS, FILTERS, FilterChain, build_filters
+from cp437_macros import (
+    ESCAPE_KEY,
+    VIM_KEYS,
+    MacroProgram,
+    MacroTimeout,
+    OutputWatcher,
+    compile_macros,
+    run_macro,
+)
+from cp437_screen import DEFAULT_ATTR, Screen, sgr_sequence
+from cp437_tokens import (  # noqa: F401 (MAX_SEQUENCE_LENGTH is re-exported)
+    MAX_SEQUENCE_LENGTH,
+    tokenize,
+    tokenize_into,
+    tokenize_unterminated,
+    tokens_text,
+)
+from session_recorder import CLIENT, SERVER, SessionRecorder, read_recording
+
+try:
+    import zstandard  # Optional: zstd compression of rotated session logs
+except ImportError:
+    zstandard = None
 
 # Key mapping definitions for different terminal modes
 ANSI_KEY_MAP = {
     # Escape sequence codes as received from terminal
     # Format: escape_code -> sequence_to_send_to_server
-    '2~': '\x1b[2~',   # INS (Insert)
-    '3~': '\x1b[3~',   # DEL (Delete)
-    '5~': '\x1b[5~',   # PAGEUP
-    '6~': '\x1b[6~',   # PAGEDOWN
-    '1~': '\x1b[1~',   # HOME
-    '4~': '\x1b[4~',   # END
-    'H': '\x1b[H',     # HOME (alternate)
-    'F': '\x1b[F',     # END (alternate)
+    "2~": "\x1b[2~",  # INS (Insert)
+    "3~": "\x1b[3~",  # DEL (Delete)
+    "5~": "\x1b[5~",  # PAGEUP
+    "6~": "\x1b[6~",  # PAGEDOWN
+    "1~": "\x1b[1~",  # HOME
+    "4~": "\x1b[4~",  # END
+    "H": "\x1b[H",  # HOME (alternate)
+    "F": "\x1b[F",  # END (alternate)
 }
 
 SYNCTERM_KEY_MAP = {
     # SyncTerm key mappings - different from standard ANSI
     # Format: escape_code -> sequence_to_send_to_server
-    '2~': '\x1b[@',    # INS (Insert) - SyncTerm uses ESC[@
-    '3~': '\x1b[3~',   # DEL (Delete) - same as ANSI
-    '5~': '\x1b[V',    # PAGEUP - SyncTerm uses ESC[V
-    '6~': '\x1b[U',    # PAGEDOWN - SyncTerm uses ESC[U
-    '1~': '\x1b[1~',   # HOME - same as ANSI
-    '4~': '\x1b[4~',   # END - same as ANSI
-    'H': '\x1b[H',     # HOME (alternate)
-    'F': '\x1b[F',     # END (alternate)
+    "2~": "\x1b[@",  # INS (Insert) - SyncTerm uses ESC[@
+    "3~": "\x1b[3~",  # DEL (Delete) - same as ANSI
+    "5~": "\x1b[V",  # PAGEUP - SyncTerm uses ESC[V
+    "6~": "\x1b[U",  # PAGEDOWN - SyncTerm uses ESC[U
+    "1~": "\x1b[1~",  # HOME - same as ANSI
+    "4~": "\x1b[4~",  # END - same as ANSI
+    "H": "\x1b[H",  # HOME (alternate)
+    "F": "\x1b[F",  # END (alternate)
+}
+
+# Local terminal profiles, layered on top of ANSI_KEY_MAP/SYNCTERM_KEY_MAP.
+# Keys are complete sequences as sent by the terminal; values are sent to the
+# server instead. Supporting another terminal only needs another map here.
+XTERM_KEY_MAP = {
+    "\x1bOA": "\x1b[A",  # UP (application cursor mode)
+    "\x1bOB": "\x1b[B",  # DOWN
+    "\x1bOC": "\x1b[C",  # RIGHT
+    "\x1bOD": "\x1b[D",  # LEFT
+    "\x1bOH": "\x1b[H",  # HOME (application mode)
+    "\x1bOF": "\x1b[F",  # END (application mode)
+}
+
+VT220_KEY_MAP = {
+    "\x1bOA": "\x1b[A",  # UP (application cursor mode)
+    "\x1bOB": "\x1b[B",  # DOWN
+    "\x1bOC": "\x1b[C",  # RIGHT
+    "\x1bOD": "\x1b[D",  # LEFT
+}
+
+PUTTY_KEY_MAP = {
+    "\x1bOA": "\x1b[A",  # UP (application cursor mode)
+    "\x1bOB": "\x1b[B",  # DOWN
+    "\x1bOC": "\x1b[C",  # RIGHT
+    "\x1bOD": "\x1b[D",  # LEFT
+    "\x1b[[A": "\x1bOP",  # F1 (Linux console function keys)
+    "\x1b[[B": "\x1bOQ",  # F2
+    "\x1b[[C": "\x1bOR",  # F3
+    "\x1b[[D": "\x1bOS",  # F4
+    "\x1b[[E": "\x1b[15~",  # F5
+}
+
+KEY_PROFILES = {
+    "xterm": XTERM_KEY_MAP,
+    "vt220": VT220_KEY_MAP,
+    "putty": PUTTY_KEY_MAP,
 }
 
 # Patch telnetlib3 TTYPE handler to prevent crashes on problematic servers
 # Some servers send malformed TTYPE subnegotiations that cause AssertionErrors
 try:
     from telnetlib3.stream_writer import StreamWriter
-    
+
     # Replace the problematic TTYPE handler with a no-op
     def _patched_handle_sb_ttype(self, buf):
         """Handle TTYPE subnegotiation safely by doing nothing."""
         # Don't process TTYPE at all - just ignore it
         pass
-    
+
     StreamWriter._handle_sb_ttype = _patched_handle_sb_ttype
 except Exception:
     pass  # If we can't patch, continue anyway
 
-# Dynamically build CP437 graphical map (standard + low symbol overrides)
-raw = bytes(range(256))
-standard_decoded = raw.decode("cp437")
-# Only override printable graphical characters from low ASCII range
-# Include ALL low ASCII characters that have graphical representations in CP437
-graphical_low = {
-    0x01: "\u263a",  # ☺
-    0x02: "\u263b",  # ☻
-    0x03: "\u2665",  # ♥
-    0x04: "\u2666",  # ♦
-    0x05: "\u2663",  # ♣
-    0x06: "\u2660",  # ♠
-    0x07: "\u2022",  # •
-    # 0x08: BS - keep as-is (backspace control)
-    # 0x09: TAB - keep as-is (tab control)
-    # 0x0A: LF - keep as-is (line feed control)
-    0x0B: "\u2642",  # ♂
-    0x0C: "\u2640",  # ♀
-    # 0x0D: CR - keep as-is (carriage return control)
-    0x0E: "\u25ba",  # ►
-    0x0F: "\u25c4",  # ◄
-    0x10: "\u2195",  # ↕
-    0x11: "\u203c",  # ‼
-    0x12: "\u00b6",  # ¶
-    0x13: "\u00a7",  # §
-    0x14: "\u25ac",  # ▬
-    0x15: "\u21a8",  # ↨
-    0x16: "\u2191",  # ↑
-    0x17: "\u2193",  # ↓
-    0x18: "\u2192",  # →
-    0x19: "\u2190",  # ←
-    0x1A: "\u221f",  # ∟
-    0x1B: "\u2194",  # ↔
-    0x1C: "\u25b2",  # ▲
-    0x1D: "\u25bc",  # ▼
-    0x1E: "\u2320",  # ⌠
-    0x1F: "\u2321",  # ⌡
-    0x7F: "\u2302",  # ⌂
-}
-
-CP437_MAP = {}
-for i in range(256):
-    if i in graphical_low:
-        CP437_MAP[i] = graphical_low[i]
-    else:
-        CP437_MAP[i] = standard_decoded[i]
-
-# Inverse map for encoding (Unicode to CP437; first match wins)
-UNICODE_TO_CP437 = {}
-for k, v in CP437_MAP.items():
-    if v not in UNICODE_TO_CP437:
-        UNICODE_TO_CP437[v] = k
-
 
 def decode_cp437_graphical(data: bytes) -> str:
     """Custom decoder: Maps CP437 bytes to graphical Unicode, preserving ANSI codes."""
@@ -121,35 +147,46 @@ def decode_cp437_graphical(data: bytes) -> str:
     return result
 
 
-def decode_cp437_graphical_buffered(data: bytes) -> tuple:
+def decode_cp437_graphical_buffered(data: bytes, engine: Optional[str] = None) -> tuple:
     """
     Custom decoder: Maps CP437 bytes to graphical Unicode, preserving ANSI codes.
     Returns (decoded_string, incomplete_sequence_bytes).
     Incomplete sequences are returned for buffering across read boundaries.
+
+    The work is done by one of the DECODER_ENGINES (DEFAULT_DECODER_ENGINE
+    unless engine is given). All engines produce identical results.
+    """
+    return DECODER_ENGINES[engine or DEFAULT_DECODER_ENGINE](data)
+
+
+def _decode_buffered_bytewise(data: bytes, start: int = 0) -> tuple:
+    """
+    Reference decoder engine: walks the input one byte at a time.
+    Kept so the table engine can be checked and benchmarked against it.
     """
     result = []
-    incomplete = b''
-    i = 0
-    
+    incomplete = b""
+    i = start
+
     while i < len(data):
         byte = data[i]
-        
+
         # Check for ANSI escape sequence FIRST (ESC = 0x1B)
         # This must be checked BEFORE we map 0x1B to a character
         if byte == 0x1B:
             # We found the start of a potential escape sequence
             # Check if we have enough data to complete it
             remaining = data[i:]
-            
+
             if len(remaining) < 2:
                 # Not enough data - buffer this for next read
                 incomplete = remaining
                 break
-            
+
             found_sequence = False
-            
+
             # Check for CSI sequence (ESC [)
-            if remaining[1:2] == b'[':
+            if remaining[1:2] == b"[":
                 # Start of ANSI CSI sequence: ESC [
                 # Find the end (letter in range @-~)
                 j = 2
@@ -159,101 +196,127 @@ def decode_cp437_graphical_buffered(data: bytes) -> tuple:
                         found_terminator = True
                         break
                     j += 1
-                
+
                 if found_terminator:
                     # Complete sequence found
-                    seq = remaining[0:j+1]
-                    result.append(seq.decode('latin-1', errors='replace'))
+                    seq = remaining[0 : j + 1]
+                    result.append(seq.decode("latin-1", errors="replace"))
                     i += j + 1
                     found_sequence = True
                 else:
                     # Incomplete CSI sequence
                     if j >= 100:
                         # Sequence is too long, assume it's malformed and skip ESC
-                        result.append(CP437_MAP.get(byte, '?'))
+                        result.append(CP437_MAP.get(byte, "?"))
                         i += 1
                     else:
                         # Not enough data - buffer it
                         incomplete = remaining
                         break
-            
+
             # Check for OSC sequences: ESC ] ... (terminated by BEL or ESC \)
-            elif len(remaining) > 1 and remaining[1:2] == b']':
+            elif len(remaining) > 1 and remaining[1:2] == b"]":
                 j = 2
                 found_terminator = False
                 while j < len(remaining) and j < 200:
-                    if remaining[j:j+1] == b'\x07':  # BEL terminator
-                        result.append(remaining[0:j+1].decode('latin-1', errors='replace'))
+                    if remaining[j : j + 1] == b"\x07":  # BEL terminator
+                        result.append(
+                            remaining[0 : j + 1].decode("latin-1", errors="replace")
+                        )
                         i += j + 1
                         found_sequence = True
                         found_terminator = True
                         break
-                    elif remaining[j:j+2] == b'\x1b\\':  # ESC \ terminator
-                        result.append(remaining[0:j+2].decode('latin-1', errors='replace'))
+                    elif remaining[j : j + 2] == b"\x1b\\":  # ESC \ terminator
+                        result.append(
+                            remaining[0 : j + 2].decode("latin-1", errors="replace")
+                        )
                         i += j + 2
                         found_sequence = True
                         found_terminator = True
                         break
                     j += 1
-                
+
                 if not found_terminator:
                     if j >= 200:
                         # Sequence too long, skip ESC
-                        result.append(CP437_MAP.get(byte, '?'))
+                        result.append(CP437_MAP.get(byte, "?"))
                         i += 1
                     else:
                         # Not enough data - buffer it
                         incomplete = remaining
                         break
-            
+
             # Check for character set sequences: ESC ( or ESC ) or ESC * or ESC +
-            elif len(remaining) > 2 and remaining[1:2] in (b'(', b')', b'*', b'+'):
-                if remaining[2:3] in b'0ABU':
-                    result.append(remaining[0:3].decode('latin-1', errors='replace'))
+            elif len(remaining) > 2 and remaining[1:2] in (b"(", b")", b"*", b"+"):
+                if remaining[2:3] in b"0ABU":
+                    result.append(remaining[0:3].decode("latin-1", errors="replace"))
                     i += 3
                     found_sequence = True
                 else:
                     # Invalid charset sequence, skip ESC
-                    result.append(CP437_MAP.get(byte, '?'))
+                    result.append(CP437_MAP.get(byte, "?"))
                     i += 1
-            
+
             # If we get here, ESC is not part of a recognized sequence
             if not found_sequence:
                 # Check if we might be at the start of something incomplete
-                if len(remaining) > 1 and remaining[1:2] in b'([)*+':
+                if len(remaining) > 1 and remaining[1:2] in b"([)*+":
                     # Could be a charset sequence but incomplete
                     if len(remaining) < 3:
                         incomplete = remaining
                         break
-                
+
                 # Not a recognized sequence pattern, map ESC as CP437
-                result.append(CP437_MAP.get(byte, '?'))
+                result.append(CP437_MAP.get(byte, "?"))
                 i += 1
-        
+
         elif byte in CP437_MAP:
             # Regular CP437 byte - decode using our map
             result.append(CP437_MAP[byte])
             i += 1
         else:
             # Unknown byte - use ? as fallback
-            result.append('?')
+            result.append("?")
             i += 1
-    
+
     return "".join(result), incomplete
 
 
-def encode_to_cp437(text: str) -> bytes:
-    """Encode UTF-8 input back to CP437 (inverse map; latin-1 fallback)."""
-    result = bytearray()
-    for char in text:
-        if char in UNICODE_TO_CP437:
-            result.append(UNICODE_TO_CP437[char])
-        else:
-            try:
-                result.append(char.encode("latin-1")[0])
-            except Exception:
-                result.append(ord("?"))  # Safe fallback
-    return bytes(result)
+# Table-driven engine: a thin wrapper over cp437_tokens.tokenize, which
+# translates plain text between escapes in one C-level call per run.
+CP437_DECODING_TABLE = CONTROL_PRESERVING_TABLE
+
+
+def _decode_buffered_table(data: bytes, start: int = 0) -> tuple:
+    """Table-driven decoder engine: the text of cp437_tokens.tokenize."""
+    compiled = cp437_speedups.compiled
+    if compiled is not None:
+        # Same text, built in C without the tokens
+        text, index = compiled.decode_text(data, start, len(data), CP437_DECODING_TABLE)
+        return text, data[index:] if index < len(data) else b""
+    tokens, tail = tokenize(data, start, controls=False)
+    return tokens_text(tokens), tail
+
+
+# Available decoder engines for decode_cp437_graphical_buffered.
+# Each takes (data, start=0) and decodes data[start:] without slicing it.
+DECODER_ENGINES = {
+    "table": _decode_buffered_table,
+    "bytewise": _decode_buffered_bytewise,
+}
+DEFAULT_DECODER_ENGINE = "table"
+
+
+def encode_to_cp437(text: str, errors: str = "replace") -> bytes:
+    """
+    Encode UTF-8 input back to CP437 (inverse map; latin-1 fallback).
+
+    Characters with no CP437 byte raise UnicodeEncodeError with
+    errors='strict', become '?' with 'replace', or the nearest CP437
+    look-alike with 'approximate'.
+    """
+    return encode_cp437(text, errors)
 
 
 # Register custom CP437 codec
@@ -261,20 +324,143 @@ class CP437Codec(codecs.Codec):
     """Custom CP437 codec that preserves graphical characters."""
 
     def encode(self, input_str: str, errors: str = "strict") -> tuple:
-        return encode_to_cp437(input_str), len(input_str)
+        return encode_to_cp437(input_str, errors), len(input_str)
 
     def decode(self, input_bytes: bytes, errors: str = "strict") -> tuple:
         return decode_cp437_graphical(input_bytes), len(input_bytes)
 
 
 class CP437IncrementalEncoder(codecs.IncrementalEncoder):
-    def encode(self, input_str: str, final: bool = False) -> str:
-        return encode_to_cp437(input_str).decode("latin-1", errors="replace")
+    def encode(self, input_str: str, final: bool = False) -> bytes:
+        return encode_to_cp437(input_str, self.errors)
 
 
 class CP437IncrementalDecoder(codecs.IncrementalDecoder):
+    """
+    Stateful decoder: an escape sequence split across chunks is held back
+    and completed on the next call instead of being dropped.
+
+    The held-back tail lives in a fixed bytearray that is reused for the
+    whole stream: the next chunk's first MAX_SEQUENCE_LENGTH bytes are
+    copied in after it and tokenized there by index, and the rest of the
+    chunk is tokenized in place, so carrying a sequence over builds no new
+    bytes objects. decode_tokens() returns the cp437_tokens tokens
+    themselves, with offsets counted from the start of the stream.
+    """
+
+    # Room for a held-back tail (under MAX_SEQUENCE_LENGTH) plus a head
+    CARRY_SIZE = 4 * MAX_SEQUENCE_LENGTH
+
+    def __init__(self, errors: str = "strict"):
+        super().__init__(errors)
+        self._carry = bytearray(self.CARRY_SIZE)
+        self._head = 0  # Pending bytes are _carry[_head:_tail]
+        self._tail = 0
+        self.position = 0  # Stream offset of the first pending byte
+
+    @property
+    def pending(self) -> bytes:
+        """The held-back tail (a copy)."""
+        return bytes(self._carry[self._head : self._tail])
+
     def decode(self, input_bytes: bytes, final: bool = False) -> str:
-        return decode_cp437_graphical(input_bytes)
+        compiled = cp437_speedups.compiled
+        if compiled is not None and self._tail == self._head and not final:
+            # Nothing held back: the compiled decoder builds the text directly
+            text, index = compiled.decode_text(
+                input_bytes, 0, len(input_bytes), CP437_DECODING_TABLE
+            )
+            self._hold(input_bytes, index, self.position)
+            return text
+        return tokens_text(self.decode_tokens(input_bytes, final, controls=False))
+
+    def decode_tokens(
+        self, input_bytes: bytes, final: bool = False, controls: bool = True
+    ) -> list:
+        """Tokenize the next chunk; see cp437_tokens.tokenize."""
+        tokens = []
+        start = 0
+        length = len(input_bytes)
+        carry = self._carry
+        # Stream offset of input_bytes[0]
+        base = self.position + self._tail - self._head
+
+        # Finish the carried-over sequence using a bounded head of this chunk
+        while self._tail > self._head and start < length:
+            head_end = min(length, start + MAX_SEQUENCE_LENGTH)
+            taken = head_end - start
+            if self._tail + taken > len(carry):
+                # Wrap: move the pending bytes back to the front
+                size = self._tail - self._head
+                carry[:size] = carry[self._head : self._tail]
+                self._head, self._tail = 0, size
+            carry[self._tail : self._tail + taken] = input_bytes[start:head_end]
+            self._tail += taken
+            i = tokenize_into(
+                tokens,
+                carry,
+                self._head,
+                self._tail,
+                controls,
+                self.position - self._head,
+            )
+            left = self._tail - i
+            if left > taken:
+                # A new sequence started inside the old tail; keep waiting
+                self.position += i - self._head
+                self._head = i
+                start = head_end
+            else:
+                self._head = self._tail = 0
+                start = head_end - left
+                self.position = base + start
+
+        if self._tail == self._head and start < length:
+            self._hold(
+                input_bytes,
+                tokenize_into(tokens, input_bytes, start, length, controls, base),
+                base,
+            )
+
+        if final and self._tail > self._head:
+            tokens.extend(tokenize_unterminated(self.pending, controls, self.position))
+            self.position += self._tail - self._head
+            self._head = self._tail = 0
+
+        return tokens
+
+    def _hold(self, input_bytes: bytes, index: int, base: int):
+        """Keep input_bytes[index:] (an unfinished sequence) for the next call."""
+        length = len(input_bytes)
+        self._head = 0
+        self._tail = length - index
+        if index < length:
+            self._carry[: self._tail] = input_bytes[index:]
+        self.position = base + index
+
+    def reset(self):
+        self._head = self._tail = 0
+        self.position = 0
+
+    def getstate(self) -> tuple:
+        return self.pending, 0
+
+    def setstate(self, state: tuple):
+        pending = bytes(state[0])
+        self._carry[: len(pending)] = pending
+        self._head, self._tail = 0, len(pending)
+
+
+class CP437StreamReader(codecs.StreamReader):
+    def decode(self, input_bytes: bytes, errors: str = "strict") -> tuple:
+        # Leave an incomplete trailing sequence in the stream's byte buffer
+        text, tail = decode_cp437_graphical_buffered(input_bytes)
+        return text, len(input_bytes) - len(tail)
+
+
+class CP437StreamWriter(codecs.StreamWriter):
+    def encode(self, input_str: str, errors: str = "strict") -> tuple:
+        return encode_to_cp437(input_str, errors), len(input_str)
 
 
 def cp437_codec_info(name: str) -> codecs.CodecInfo:
@@ -284,35 +470,750 @@ def cp437_codec_info(name: str) -> codecs.CodecInfo:
         decode=CP437Codec().decode,
         incrementalencoder=CP437IncrementalEncoder,
         incrementaldecoder=CP437IncrementalDecoder,
+        streamreader=CP437StreamReader,
+        streamwriter=CP437StreamWriter,
     )
 
 
 # Register the codec
-codecs.register(lambda name: cp437_codec_info(name) if name == "cp437_graphical" else None)
+codecs.register(
+    lambda name: cp437_codec_info(name) if name == "cp437_graphical" else None
+)
+
+
+class FrameRenderer:
+    """
+    Coalesces decoded server output into frames for the local terminal.
+
+    Text written while a frame is pending is accumulated and written once,
+    pre-encoded as UTF-8, straight to the binary stdout buffer. Output that
+    arrives after the terminal has been idle for a full interval (such as a
+    keystroke echo) is written immediately, so typing latency is unchanged.
+    An interval of 0 writes on every call.
+
+    With background=True frames are handed to a writer thread, so a
+    terminal that stops reading (a slow SSH link, XOFF) never blocks the
+    event loop; drain() then waits until no more than output_limit bytes
+    are still waiting to be written.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.01,
+        stream=None,
+        background: bool = False,
+        output_limit: int = 256 * 1024,
+    ):
+        self.interval = interval
+        stream = stream if stream is not None else sys.stdout
+        # Anything already written through the text layer must go out first
+        stream.flush()
+        self.output = getattr(stream, "buffer", stream)
+        self.output_limit = output_limit
+        self.pending = []
+        self.last_flush = 0.0
+        self.timer = None
+        self.frames = 0
+        self.bytes_written = 0
+        # Bytes handed to the writer thread but not written yet
+        self.output_pending = 0
+
+        self._frames = []
+        self._stopping = False
+        self._condition = threading.Condition()
+        self._written = None
+        self._loop = None
+        self._thread = None
+        if background:
+            self._thread = threading.Thread(
+                target=self._writer, name="FrameRenderer", daemon=True
+            )
+            self._thread.start()
+
+    def write(self, text: str):
+        """Queue text for the next frame."""
+        self.pending.append(text)
+        if self.timer is not None:
+            return  # Frame already scheduled
+
+        delay = self.last_flush + self.interval - time.monotonic()
+        if delay <= 0:
+            self.flush()
+        else:
+            self.timer = asyncio.get_running_loop().call_later(delay, self.flush)
+
+    def flush(self):
+        """Write all pending text to the terminal now."""
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.pending:
+            data = self.render("".join(self.pending))
+            self.pending.clear()
+            if data:
+                self._output(data)
+                self.bytes_written += len(data)
+            self.frames += 1
+        self.last_flush = time.monotonic()
+
+    async def drain(self):
+        """Wait until the writer thread is at most output_limit bytes behind."""
+        if self._thread is None:
+            return
+        if self._written is None:
+            self._loop = asyncio.get_running_loop()
+            self._written = asyncio.Event()
+        while self.output_pending > self.output_limit:
+            self._written.clear()
+            await self._written.wait()
+
+    def render(self, text: str) -> bytes:
+        """Bytes to write for one frame of server output."""
+        return text.encode("utf-8", errors="replace")
+
+    def close(self):
+        """Flush any remaining output (and wait for the writer thread)."""
+        self.flush()
+        if self._thread is not None:
+            with self._condition:
+                self._stopping = True
+                self._condition.notify()
+            self._thread.join()
+            self._thread = None
+
+    def _output(self, data: bytes):
+        if self._thread is None:
+            self.output.write(data)
+            self.output.flush()
+            return
+        with self._condition:
+            self._frames.append(data)
+            self.output_pending += len(data)
+            self._condition.notify()
+
+    def _writer(self):
+        """Writer thread: write queued frames in batches until stopped."""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._frames or self._stopping)
+                batch = self._frames
+                self._frames = []
+                stopping = self._stopping
+            if batch:
+                data = b"".join(batch)
+                try:
+                    self.output.write(data)
+                    self.output.flush()
+                except (OSError, ValueError):
+                    pass  # Terminal gone; keep draining so drain() returns
+                with self._condition:
+                    self.output_pending -= len(data)
+                if self._written is not None:
+                    try:
+                        self._loop.call_soon_threadsafe(self._written.set)
+                    except RuntimeError:
+                        pass  # Event loop already closed
+            elif stopping:
+                return
+
+
+class DiffRenderer(FrameRenderer):
+    """
+    FrameRenderer that applies server output to an in-process Screen and
+    writes only the cells that changed since the last frame.
+
+    Servers that repaint a whole menu on every keypress then cost a few
+    bytes per frame instead of the full repaint. Whole-screen scrolls are
+    passed on as linefeeds so scrolling text is not redrawn. BEL is passed
+    through; window titles and other OSC strings are dropped.
+    """
+
+    # Rewrite up to this many unchanged cells rather than move the cursor
+    # over them (a CUP costs 6-8 bytes)
+    MAX_GAP = 4
+
+    def __init__(
+        self,
+        interval: float = 0.01,
+        stream=None,
+        cols: int = 80,
+        rows: int = 24,
+        background: bool = False,
+    ):
+        super().__init__(interval, stream, background)
+        self.screen = Screen(cols, rows)
+        # What the local terminal shows; None until the first frame clears it
+        self.shown_chars = None
+        self.shown_attrs = None
+        self.shown_attr = DEFAULT_ATTR
+        self.shown_cursor = None
+        self.shown_cursor_visible = True
+        self.scrolled = 0
+
+    def render(self, text: str) -> bytes:
+        screen = self.screen
+        screen.feed(text)
+        cols, rows = screen.cols, screen.rows
+        out = []
+
+        if self.shown_chars is None:
+            out.append("\x1b[0m\x1b[H\x1b[2J")
+            self.shown_chars = [[" "] * cols for _ in range(rows)]
+            self.shown_attrs = [array("I", [DEFAULT_ATTR]) * cols for _ in range(rows)]
+            self.shown_attr = DEFAULT_ATTR
+            self.shown_cursor = (0, 0)
+            self.scrolled = screen.scrolled
+
+        scrolled = screen.scrolled - self.scrolled
+        self.scrolled = screen.scrolled
+        if 0 < scrolled < rows:
+            # Let the terminal scroll too; the diff below repairs the new lines
+            out.append(f"\x1b[0m\x1b[{rows};1H" + "\n" * scrolled)
+            self.shown_attr = DEFAULT_ATTR
+            self.shown_cursor = (0, rows - 1)
+            del self.shown_chars[:scrolled]
+            del self.shown_attrs[:scrolled]
+            for _ in range(scrolled):
+                self.shown_chars.append([" "] * cols)
+                self.shown_attrs.append(array("I", [DEFAULT_ATTR]) * cols)
+
+        for y in range(rows):
+            chars, attrs = screen.chars[y], screen.attrs[y]
+            if chars != self.shown_chars[y] or attrs != self.shown_attrs[y]:
+                self._diff_row(out, y, chars, attrs)
+
+        if screen.cursor != self.shown_cursor:
+            x, y = screen.cursor
+            out.append(f"\x1b[{y + 1};{x + 1}H")
+            self.shown_cursor = screen.cursor
+        if screen.cursor_visible != self.shown_cursor_visible:
+            out.append("\x1b[?25h" if screen.cursor_visible else "\x1b[?25l")
+            self.shown_cursor_visible = screen.cursor_visible
+        if "\x07" in text:
+            out.append("\x07")
+        return "".join(out).encode("utf-8", errors="replace")
+
+    def _diff_row(self, out: list, y: int, chars: list, attrs):
+        """Append the output that updates row y of the terminal."""
+        old_chars, old_attrs = self.shown_chars[y], self.shown_attrs[y]
+        attr = self.shown_attr
+        # Local cursor column on this row, or None if it is elsewhere
+        cursor_x = self.shown_cursor[0] if self.shown_cursor[1] == y else None
+        for x in range(len(chars)):
+            if chars[x] == old_chars[x] and attrs[x] == old_attrs[x]:
+                continue
+            if (
+                cursor_x is not None
+                and 0 < x - cursor_x <= self.MAX_GAP
+                and all(a == attr for a in attrs[cursor_x:x])
+            ):
+                out.append("".join(chars[cursor_x:x]))
+            elif x != cursor_x:
+                out.append(f"\x1b[{y + 1};{x + 1}H")
+            if attrs[x] != attr:
+                attr = attrs[x]
+                out.append(sgr_sequence(attr))
+            out.append(chars[x])
+            # After the last column the terminal's cursor position is unreliable
+            cursor_x = x + 1 if x + 1 < len(chars) else None
+        self.shown_chars[y] = chars[:]
+        self.shown_attrs[y] = attrs[:]
+        self.shown_attr = attr
+        self.shown_cursor = (cursor_x, y) if cursor_x is not None else (None, None)
+
+
+RENDER_MODES = ("passthrough", "diff")
+
+
+def create_renderer(
+    mode: str = "passthrough",
+    interval: float = 0.01,
+    cols: int = 80,
+    rows: int = 24,
+    stream=None,
+    background: bool = False,
+) -> FrameRenderer:
+    """Renderer for a --render-mode: server output as-is, or screen diffs."""
+    if mode == "diff":
+        return DiffRenderer(interval, stream, cols, rows, background)
+    if mode != "passthrough":
+        raise ValueError(f"Unknown render mode: {mode}")
+    return FrameRenderer(interval, stream, background)
+
+
+class ReadSizer:
+    """
+    Size of the next network read. It doubles (up to maximum) while reads
+    come back full, so a BBS blasting a large ANSI screen is decoded and
+    rendered in a few big steps, and halves (down to minimum) when a read
+    returns under a quarter of it, so typing goes back to small frames.
+    """
+
+    def __init__(self, minimum: int = 4096, maximum: int = 256 * 1024):
+        if not 0 < minimum <= maximum:
+            raise ValueError(f"Bad read size range: {minimum}-{maximum}")
+        self.minimum = minimum
+        self.maximum = maximum
+        self.size = minimum
+
+    def update(self, received: int) -> int:
+        """Account for a read of received bytes; return the next read size."""
+        if received >= self.size:
+            self.size = min(self.size * 2, self.maximum)
+        elif received < self.size // 4:
+            self.size = max(self.size // 2, self.minimum)
+        return self.size
+
+
+class ReadPipeline:
+    """
+    Bounded pipeline between the network and the terminal.
+
+    A reader task reads server output (sized by a ReadSizer) into a queue;
+    a consumer task takes everything queued at once, hands it to handle()
+    (decode, render, log) and then awaits drain(), e.g. the renderer's.
+    Once more than max_bytes are queued the reader stops reading, so
+    telnetlib3's buffer fills past its limit and it pauses the transport:
+    a terminal that falls behind throttles the server through TCP instead
+    of growing memory without bound.
+    """
+
+    def __init__(
+        self,
+        reader,
+        handle,
+        drain=None,
+        on_read=None,
+        sizer: Optional[ReadSizer] = None,
+        max_bytes: int = 1024 * 1024,
+    ):
+        self.reader = reader
+        self.handle = handle
+        self.drain = drain
+        self.on_read = on_read
+        self.sizer = sizer or ReadSizer()
+        self.max_bytes = max_bytes
+
+        # Metrics
+        self.reads = 0
+        self.bytes_read = 0
+        self.batches = 0
+        self.max_read = 0
+        self.queue_depth = 0
+        self.queue_bytes = 0
+        self.max_queue_depth = 0
+        self.max_queue_bytes = 0
+        self.stalls = 0
+        self.stall_seconds = 0.0
+
+        self._queue = []
+        self._eof = False
+        self._changed = asyncio.Event()
+
+    async def run(self):
+        """Pump server output until the connection closes."""
+        producer = asyncio.create_task(self._produce())
+        try:
+            await self._consume()
+            await producer  # Re-raises a failed read
+        finally:
+            if not producer.done():
+                producer.cancel()
+                try:
+                    await producer
+                except asyncio.CancelledError:
+                    pass
+
+    def stats(self) -> dict:
+        """Return pipeline counters."""
+        return {
+            "reads": self.reads,
+            "bytes_read": self.bytes_read,
+            "batches": self.batches,
+            "read_size": self.sizer.size,
+            "max_read": self.max_read,
+            "queue_depth": self.queue_depth,
+            "queue_bytes": self.queue_bytes,
+            "max_queue_depth": self.max_queue_depth,
+            "max_queue_bytes": self.max_queue_bytes,
+            "stalls": self.stalls,
+            "stall_seconds": self.stall_seconds,
+        }
+
+    async def _produce(self):
+        try:
+            await self._read_loop()
+        finally:
+            # EOF or a failed read: let the consumer finish what is queued
+            self._eof = True
+            self._changed.set()
+
+    async def _read_loop(self):
+        while True:
+            if self.queue_bytes >= self.max_bytes:
+                # Output is behind: stop reading until the consumer catches up
+                self.stalls += 1
+                started = time.monotonic()
+                while self.queue_bytes >= self.max_bytes:
+                    self._changed.clear()
+                    await self._changed.wait()
+                self.stall_seconds += time.monotonic() - started
+
+            data = await self.reader.read(self.sizer.size)
+            if not data:
+                return
+            self.sizer.update(len(data))
+            if self.on_read:
+                self.on_read(data)
+            self.reads += 1
+            self.bytes_read += len(data)
+            self.max_read = max(self.max_read, len(data))
+            self._queue.append(data)
+            self.queue_depth += 1
+            self.queue_bytes += len(data)
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            self.max_queue_bytes = max(self.max_queue_bytes, self.queue_bytes)
+            self._changed.set()
+
+    async def _consume(self):
+        while True:
+            while not self._queue and not self._eof:
+                self._changed.clear()
+                await self._changed.wait()
+            if not self._queue:
+                return
+            batch = self._queue
+            self._queue = []
+            self.queue_depth = 0
+            self.queue_bytes = 0
+            self._changed.set()
+            self.batches += 1
+            self.handle(batch[0] if len(batch) == 1 else b"".join(batch))
+            if self.drain:
+                await self.drain()
 
 
 class SessionLogger:
-    """Logs telnet session to file."""
-    
-    def __init__(self, log_file: Optional[str] = None):
+    """
+    Logs telnet session to file.
+
+    By default each chunk is written and flushed as it arrives. With
+    background=True chunks are queued (up to queue_limit bytes; anything
+    beyond that is dropped and counted) and written in large batches by a
+    writer thread, so a slow disk never stalls screen output.
+
+    fsync is one of FSYNC_POLICIES: 'never', 'batch' (after every write or
+    batch) or 'close'. rotate_size/rotate_interval start a new segment once
+    the current one reaches that many bytes/seconds; closed segments are
+    renamed to <log_file>.<n> and optionally compressed ('gzip' or 'zstd')
+    on a worker thread, so compressing a large segment never holds up the
+    event loop; close() waits for it to finish.
+    """
+
+    FSYNC_POLICIES = ("never", "batch", "close")
+    COMPRESSIONS = ("gzip", "zstd")
+
+    def __init__(
+        self,
+        log_file: Optional[str] = None,
+        background: bool = False,
+        queue_limit: int = 4 * 1024 * 1024,
+        fsync: str = "never",
+        rotate_size: Optional[int] = None,
+        rotate_interval: Optional[float] = None,
+        compress: Optional[str] = None,
+        batch_interval: float = 0.1,
+    ):
+        if fsync not in self.FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        if compress is not None and compress not in self.COMPRESSIONS:
+            raise ValueError(f"Unknown log compression: {compress}")
+        if compress == "zstd" and zstandard is None:
+            raise ValueError("zstd log compression requires the zstandard package")
+
         self.log_file = log_file
         self.file_handle = None
-        
+        self.fsync = fsync
+        self.rotate_size = rotate_size
+        self.rotate_interval = rotate_interval
+        self.compress = compress
+        self.queue_limit = queue_limit
+        self.batch_interval = batch_interval
+
+        # Counters (bytes are UTF-8 encoded sizes)
+        self.bytes_queued = 0
+        self.bytes_written = 0
+        self.bytes_dropped = 0
+        self.chunks_dropped = 0
+        self.segments = 0
+
+        self._segment_size = 0
+        self._segment_started = 0.0
+        self._pending = []
+        self._pending_size = 0
+        self._closed = False
+        self._stopping = False
+        self._condition = threading.Condition()
+        self._thread = None
+        self._compressor = None
+
         if log_file:
-            self.file_handle = open(log_file, 'w', encoding='utf-8')
+            self._open_segment()
+            if background:
+                self._thread = threading.Thread(
+                    target=self._writer, name="SessionLogger", daemon=True
+                )
+                self._thread.start()
+                atexit.register(self.close)
             self.log(f"=== Session started at {datetime.now().isoformat()} ===\n")
-    
+
     def log(self, data: str):
-        """Write data to log file."""
-        if self.file_handle:
-            self.file_handle.write(data)
-            self.file_handle.flush()
-    
+        """Write data to log file (or queue it for the writer thread)."""
+        if not self.file_handle or self._closed:
+            return
+        self._submit(data.encode("utf-8", errors="replace"))
+
+    def stats(self) -> dict:
+        """Return logger counters."""
+        return {
+            "bytes_queued": self.bytes_queued,
+            "bytes_written": self.bytes_written,
+            "bytes_dropped": self.bytes_dropped,
+            "chunks_dropped": self.chunks_dropped,
+            "segments": self.segments,
+        }
+
     def close(self):
-        """Close the log file."""
-        if self.file_handle:
-            self.log(f"\n=== Session ended at {datetime.now().isoformat()} ===\n")
-            self.file_handle.close()
+        """Close the log file, writing the session-ended footer first."""
+        if not self.file_handle or self._closed:
+            return
+        self._closed = True
+        self._submit(
+            f"\n=== Session ended at {datetime.now().isoformat()} ===\n".encode(
+                "utf-8"
+            ),
+            force=True,
+        )
+        if self._thread:
+            with self._condition:
+                self._stopping = True
+                self._condition.notify()
+            self._thread.join()
+            atexit.unregister(self.close)
+        if self.fsync != "never":
+            os.fsync(self.file_handle.fileno())
+        self.file_handle.close()
+        if self._compressor:
+            self._compressor.shutdown(wait=True)
+
+    def _submit(self, data: bytes, force: bool = False):
+        if not self._thread:
+            self._write(data)
+            return
+        with self._condition:
+            if not force and self._pending_size + len(data) > self.queue_limit:
+                self.bytes_dropped += len(data)
+                self.chunks_dropped += 1
+                return
+            self._pending.append(data)
+            self._pending_size += len(data)
+            self.bytes_queued += len(data)
+            self._condition.notify()
+
+    def _writer(self):
+        """Writer thread: drain the queue in batches until stopped."""
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._stopping)
+                batch = self._pending
+                self._pending = []
+                self._pending_size = 0
+                stopping = self._stopping
+            if batch:
+                self._write(b"".join(batch))
+            if stopping:
+                return
+            # Let chunks accumulate into the next batch
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._stopping, timeout=self.batch_interval
+                )
+
+    def _write(self, data: bytes):
+        # Rotate before writing, so the last segment is never left empty
+        if self._segment_size and (
+            (self.rotate_size and self._segment_size >= self.rotate_size)
+            or (
+                self.rotate_interval
+                and time.monotonic() - self._segment_started >= self.rotate_interval
+            )
+        ):
+            self._rotate()
+        self.file_handle.write(data)
+        self.file_handle.flush()
+        if self.fsync == "batch":
+            os.fsync(self.file_handle.fileno())
+        self.bytes_written += len(data)
+        self._segment_size += len(data)
+
+    def _open_segment(self):
+        self.file_handle = open(self.log_file, "wb")
+        self._segment_size = 0
+        self._segment_started = time.monotonic()
+
+    def _rotate(self):
+        """Close the current segment, move it aside and start a new one."""
+        if self.fsync != "never":
+            os.fsync(self.file_handle.fileno())
+        self.file_handle.close()
+        self.segments += 1
+        segment = f"{self.log_file}.{self.segments}"
+        os.replace(self.log_file, segment)
+        if self.compress:
+            if self._compressor is None:
+                self._compressor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="SessionLogger-compress"
+                )
+            self._compressor.submit(_compress_file, segment, self.compress)
+        self._open_segment()
+
+
+def _compress_file(path: str, method: str):
+    """Compress a closed log segment in place (path -> path.gz / path.zst)."""
+    if method == "gzip":
+        target = path + ".gz"
+        with open(path, "rb") as src, gzip.open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+    else:
+        target = path + ".zst"
+        with open(path, "rb") as src, open(target, "wb") as dst:
+            zstandard.ZstdCompressor().copy_stream(src, dst)
+    os.remove(path)
+
+
+def _input_triggers(macros: Dict[str, MacroProgram]):
+    """Pattern splitting out input characters the shell handles itself."""
+    return re.compile("([%s])" % re.escape(ESCAPE_KEY + "".join(macros)))
+
+
+class KeySequenceParser:
+    """
+    Incremental parser for keyboard input.
+
+    Plain text passes through untouched; escape sequences sent by the
+    terminal (arrow keys, function keys, etc.) are remapped through the
+    given key maps, later maps overriding earlier ones. Map keys are either
+    complete sequences ('\x1bOH') or, as in ANSI_KEY_MAP, the part after
+    ESC [ ('2~'). The maps are compiled into a prefix trie, so a sequence is
+    resolved in one pass over its characters as they arrive.
+
+    Unmapped sequences are passed through whole (CSI up to 10 chars, SS3 one
+    char). A sequence cut off at the end of the input is held in pending
+    until more input arrives, or until flush() resolves it with what is
+    there (call it after escape_timeout of silence, e.g. for a lone ESC).
+    """
+
+    def __init__(self, *key_maps: Dict[str, str], escape_timeout: float = 0.05):
+        self.key_map = {}
+        for key_map in key_maps:
+            self.key_map.update(key_map)
+        self.escape_timeout = escape_timeout
+        self.pending = ""
+        self._trie = {}
+        for key, value in self.key_map.items():
+            for seq in _key_sequences(key):
+                node = self._trie
+                for char in seq:
+                    node = node.setdefault(char, {})
+                node[_TRIE_VALUE] = value
+
+    def feed(self, text: str) -> str:
+        """Parse input text, returning what should be sent to the server."""
+        if self.pending:
+            text = self.pending + text
+            self.pending = ""
+        return self._parse(text, final=False)
+
+    def flush(self) -> str:
+        """Stop waiting for the rest of a pending sequence and resolve it."""
+        pending, self.pending = self.pending, ""
+        return self._parse(pending, final=True)
+
+    def _parse(self, text: str, final: bool) -> str:
+        out = []
+        i = 0
+        length = len(text)
+        while i < length:
+            esc = text.find("\x1b", i)
+            if esc < 0:
+                out.append(text[i:])
+                break
+            out.append(text[i:esc])
+
+            # Longest mapped sequence starting here
+            node = self._trie
+            match = None
+            j = esc
+            while j < length:
+                node = node.get(text[j])
+                if node is None:
+                    break
+                j += 1
+                if _TRIE_VALUE in node:
+                    match = (j, node[_TRIE_VALUE])
+            else:
+                if not final and len(node) > (_TRIE_VALUE in node):
+                    # Input ends inside a longer mapped sequence: wait
+                    self.pending = text[esc:]
+                    break
+
+            if match:
+                i, value = match
+                out.append(value)
+                continue
+            end = _sequence_end(text, esc)
+            if end is None:
+                if not final:
+                    self.pending = text[esc:]
+                    break
+                end = length
+            out.append(text[esc:end])
+            i = end
+        return "".join(out)
+
+
+# Marks the end of a mapped sequence in a KeySequenceParser trie
+_TRIE_VALUE = None
+
+
+def _key_sequences(key: str) -> list:
+    """Full input sequences a key map entry applies to."""
+    if key.startswith("\x1b"):
+        return [key]
+    # Legacy entries name what follows ESC [ (and, for single characters or
+    # SS3 codes, what follows a bare ESC)
+    sequences = ["\x1b[" + key]
+    if (len(key) == 1 and key not in "[O") or (len(key) == 2 and key[0] == "O"):
+        sequences.append("\x1b" + key)
+    return sequences
+
+
+def _sequence_end(text: str, i: int) -> Optional[int]:
+    """End index of the unmapped sequence at text[i], None if incomplete."""
+    length = len(text)
+    if i + 1 >= length:
+        return None
+    if text[i + 1] == "[":
+        # CSI: up to 10 chars, ending with a letter or tilde (@-~)
+        for j in range(i + 2, min(length, i + 12)):
+            if "\x40" <= text[j] <= "\x7e":
+                return j + 1
+        return i + 12 if length >= i + 12 else None
+    if text[i + 1] == "O":
+        # SS3: one more char
+        return i + 3 if i + 2 < length else None
+    # Other escape sequences (ESC (, ESC ), etc.)
+    return i + 2
 
 
 def parse_macro_keys(macro_text: str) -> list:
@@ -323,230 +1224,259 @@ def parse_macro_keys(macro_text: str) -> list:
     - k -> up arrow (ESC[A)
     - l -> right arrow (ESC[C)
     All other characters passed through as-is.
-    
-    Returns list of strings/characters to send.
+
+    Returns list of strings/characters to send. (The shell itself runs
+    macros compiled with cp437_macros.compile_macro.)
     """
-    key_map = {
-        'h': '\x1b[D',  # left arrow
-        'j': '\x1b[B',  # down arrow
-        'k': '\x1b[A',  # up arrow
-        'l': '\x1b[C',  # right arrow
-    }
-    
-    result = []
-    for char in macro_text:
-        if char in key_map:
-            result.append(key_map[char])
-        else:
-            result.append(char)
-    
-    return result
+    return [VIM_KEYS.get(char, char) for char in macro_text]
+
+
+def decode_filtered(
+    decoder: CP437IncrementalDecoder,
+    data: bytes,
+    filters: Optional[FilterChain] = None,
+    final: bool = False,
+) -> str:
+    """
+    Decode one read and pass it through the output filters. Without
+    filters this is a plain decode; no tokens are looked at.
+    """
+    if not filters:
+        return decoder.decode(data, final)
+    tokens = decoder.decode_tokens(data, final, controls=filters.needs_controls)
+    return tokens_text(filters.filter(tokens))
 
 
-async def graphical_shell(reader, writer, logger: Optional[SessionLogger] = None, bell_macro: Optional[str] = None, key_map: Optional[Dict[str, str]] = None):
+def _output_filters() -> FilterChain:
+    """Output filters chosen with --filter (set on graphical_shell)."""
+    return build_filters(getattr(graphical_shell, "output_filters", DEFAULT_FILTERS))
+
+
+async def graphical_shell(
+    reader,
+    writer,
+    logger: Optional[SessionLogger] = None,
+    bell_macro: Optional[str] = None,
+    key_map: Optional[Dict[str, str]] = None,
+    recorder: Optional[SessionRecorder] = None,
+    macros: Optional[Dict[str, MacroProgram]] = None,
+):
     """Interactive shell with CP437 character support."""
     # Don't print anything - let the server's display be first
     # print("Connected! Type Ctrl+] to quit.\n")
     # if bell_macro:
     #     print("Bell macro available: Press Ctrl+G\n")
-    
+
     # Save original terminal settings
     if sys.stdin.isatty():
         old_settings = termios.tcgetattr(sys.stdin.fileno())
     else:
         old_settings = None
-    
-    # Buffer for incomplete ANSI sequences between reads
-    incomplete_seq = b''
-    
-    # Macro delay (configurable via global or args)
-    macro_delay = getattr(graphical_shell, 'macro_delay', 0.01)
-    
+
+    # Stateful decoder buffers incomplete ANSI sequences between reads
+    decoder = CP437IncrementalDecoder()
+    filters = _output_filters()
+
+    # Macros by trigger key, compiled once (main() compiles --macro/--bell)
+    if macros is None:
+        macros = compile_macros(
+            {},
+            getattr(graphical_shell, "macro_delay", 0.01),
+            bell_macro,
+            getattr(graphical_shell, "macro_burst", False),
+        )
+    input_triggers = _input_triggers(macros)
+    # Server output for macros that wait for a prompt
+    watcher = (
+        OutputWatcher() if any(program.expects for program in macros.values()) else None
+    )
+    macro_tasks = {}
+
     # Get terminal size info if available
-    term_cols = getattr(graphical_shell, 'term_cols', 80)
-    term_rows = getattr(graphical_shell, 'term_rows', 24)
-    
+    term_cols = getattr(graphical_shell, "term_cols", 80)
+    term_rows = getattr(graphical_shell, "term_rows", 24)
+
+    # Server output is written in frames rather than once per read
+    renderer = create_renderer(
+        getattr(graphical_shell, "render_mode", "passthrough"),
+        getattr(graphical_shell, "render_interval", 0.0),
+        term_cols,
+        term_rows,
+        background=True,
+    )
+
+    def send(text: str):
+        """Send text to the server (the connection is binary, so encode it)."""
+        if not text:
+            return
+        data = encode_to_cp437(text)
+        writer.write(data)
+        if recorder:
+            recorder.record(CLIENT, data)
+
     try:
         # Set terminal to raw mode for character-by-character input
         if old_settings:
             tty.setraw(sys.stdin.fileno())
-        
+
+        def show(data: bytes):
+            """Decode, display and log one batch of server output."""
+            # Decode CP437 - a sequence split across reads is held by the
+            # decoder and completed on the next read - and apply the output
+            # filters (by default: home the cursor after a bare clear screen)
+            decoded = decode_filtered(decoder, data, filters)
+
+            renderer.write(decoded)
+
+            if watcher:
+                watcher.feed(decoded)
+
+            # Log to file if logger is active
+            if logger:
+                logger.log(decoded)
+
+        async def play(program: MacroProgram):
+            """Run a macro; typing carries on while it waits or pauses."""
+            label = "BELL MACRO" if program.name == "BELL" else f"MACRO {program.name}"
+            if logger:
+                logger.log(f"[{label}]: {program.source}\n")
+            try:
+                await run_macro(program, send, watcher)
+            except MacroTimeout as e:
+                if logger:
+                    logger.log(f"[{label}]: {e}\n")
+
+        def record(data: bytes):
+            # Record the raw bytes of each read before anything touches them
+            if recorder:
+                recorder.record(SERVER, data)
+
+        # The connection is binary: raw server bytes go straight to the
+        # CP437 decoder. Reads grow while the server is sending a lot and
+        # reading stops while the terminal is behind.
+        pipeline = ReadPipeline(
+            reader,
+            show,
+            drain=renderer.drain,
+            on_read=record,
+            sizer=ReadSizer(
+                maximum=getattr(graphical_shell, "max_read_size", 256 * 1024)
+            ),
+        )
+        graphical_shell.pipeline = pipeline
+
         async def server_reader():
             """Continuously read and display server output."""
-            nonlocal incomplete_seq
             try:
-                while True:
-                    data = await reader.read(4096)
-                    if not data:
-                        return
-                    
-                    # Data comes as string (latin-1 decoded by telnetlib3)
-                    # Convert back to bytes to decode as CP437
-                    if isinstance(data, str):
-                        data_bytes = data.encode('latin-1', errors='replace')
-                    else:
-                        data_bytes = data
-                    
-                    # Prepend any incomplete sequence from previous read
-                    if incomplete_seq:
-                        data_bytes = incomplete_seq + data_bytes
-                        incomplete_seq = b''
-                    
-                    # Decode CP437 - will return incomplete_seq if needed
-                    decoded, incomplete_seq = decode_cp437_graphical_buffered(data_bytes)
-                    
-                    # CRITICAL FIX: When server sends ESC[2J (clear screen) without following
-                    # with ESC[H (home cursor), the cursor stays where it was.
-                    # Many BBS systems don't send the home cursor after clear, causing first
-                    # line to print on wrong line. We fix this by detecting ESC[2J and
-                    # ensuring cursor is moved to home.
-                    if '\x1b[2J' in decoded and '\x1b[H' not in decoded:
-                        # Server cleared screen but didn't move cursor to home
-                        # Add home cursor after clear
-                        decoded = decoded.replace('\x1b[2J', '\x1b[2J\x1b[H', 1)
-                    
-                    sys.stdout.write(decoded)
-                    # Force immediate flush after every write to prevent buffering issues
-                    sys.stdout.flush()
-                    
-                    # Log to file if logger is active
-                    if logger:
-                        logger.log(decoded)
+                await pipeline.run()
             except asyncio.CancelledError:
                 pass
-        
+
         async def stdin_reader():
-            """Continuously read user input from stdin (character-by-character)."""
+            """Continuously read user input from stdin as it becomes available."""
+            loop = asyncio.get_running_loop()
+            stdin_fd = sys.stdin.fileno()
+            chunks = asyncio.Queue()
+
+            def on_stdin_readable():
+                # Readable, so this returns whatever is there without blocking
+                try:
+                    data = os.read(stdin_fd, 4096)
+                except (BlockingIOError, InterruptedError):
+                    return
+                except OSError:
+                    data = b""
+                if not data:
+                    loop.remove_reader(stdin_fd)
+                chunks.put_nowait(data)
+
+            try:
+                loop.add_reader(stdin_fd, on_stdin_readable)
+            except (OSError, ValueError, NotImplementedError):
+                chunks = None
+
             try:
-                loop = asyncio.get_event_loop()
-                escape_char = "\x1d"  # Ctrl+]
-                bell_char = "\x07"    # Ctrl+G (BEL)
-                
                 # Use provided key_map or default function keys
                 if key_map is None:
                     # Common function key escape sequences
                     # Terminal sends ESC [ followed by a code or ESC O followed by a code
                     function_keys = {
-                        '2~': '\x1b[2~',   # INS (Insert)
-                        '3~': '\x1b[3~',   # DEL (Delete)
-                        '5~': '\x1b[5~',   # PAGEUP
-                        '6~': '\x1b[6~',   # PAGEDOWN
-                        '1~': '\x1b[1~',   # HOME
-                        '4~': '\x1b[4~',   # END
-                        'H': '\x1b[H',     # HOME (alternate)
-                        'F': '\x1b[F',     # END (alternate)
+                        "2~": "\x1b[2~",  # INS (Insert)
+                        "3~": "\x1b[3~",  # DEL (Delete)
+                        "5~": "\x1b[5~",  # PAGEUP
+                        "6~": "\x1b[6~",  # PAGEDOWN
+                        "1~": "\x1b[1~",  # HOME
+                        "4~": "\x1b[4~",  # END
+                        "H": "\x1b[H",  # HOME (alternate)
+                        "F": "\x1b[F",  # END (alternate)
                     }
                 else:
                     function_keys = key_map
-                
+
+                parser = KeySequenceParser(function_keys)
+                text_decoder = codecs.getincrementaldecoder(
+                    sys.stdin.encoding or "utf-8"
+                )(errors="replace")
+
                 while True:
-                    # Read one character at a time
-                    char = await loop.run_in_executor(None, sys.stdin.read, 1)
-                    if not char:
-                        return
-                    
-                    # Check for escape character (Ctrl+])
-                    if char == escape_char:
-                        return
-                    
-                    # Check for bell macro trigger (Ctrl+G)
-                    if char == bell_char and bell_macro:
-                        # Parse macro to handle arrow keys (hjkl -> arrow sequences)
-                        macro_keys = parse_macro_keys(bell_macro)
-                        
-                        # Send Ctrl+G first, then macro text with delays
-                        writer.write(bell_char)
-                        for key in macro_keys:
-                            writer.write(key)
-                            await asyncio.sleep(macro_delay)
-                        if logger:
-                            logger.log(f"[BELL MACRO]: {bell_macro}\n")
-                    # Handle escape sequences from terminal (arrow keys, function keys, etc.)
-                    elif char == '\x1b':  # ESC - start of escape sequence
-                        # Read the next characters of the sequence with a short timeout
-                        seq = char
-                        is_escape_sequence = False
-                        
-                        # Try to read the next character with a timeout
+                    if chunks is None:
+                        # stdin can't be watched (e.g. a regular file)
+                        data = await loop.run_in_executor(None, os.read, stdin_fd, 4096)
+                    elif parser.pending:
+                        # A lone ESC (or partial sequence) is only sent as-is
+                        # if nothing follows it within the escape timeout
                         try:
-                            next_char = await asyncio.wait_for(
-                                loop.run_in_executor(None, sys.stdin.read, 1),
-                                timeout=0.05
+                            data = await asyncio.wait_for(
+                                chunks.get(), parser.escape_timeout
                             )
-                            
-                            if next_char:
-                                seq += next_char
-                                # If it's CSI sequence (ESC[), read until terminator
-                                if next_char == '[':
-                                    is_escape_sequence = True
-                                    # Read up to 10 more chars to handle sequences like ESC[24~
-                                    for _ in range(10):
-                                        term_char = await asyncio.wait_for(
-                                            loop.run_in_executor(None, sys.stdin.read, 1),
-                                            timeout=0.05
-                                        )
-                                        if not term_char:
-                                            break
-                                        seq += term_char
-                                        # Check if this completes the sequence
-                                        # Terminators: letters (A-Z, a-z) or tilde (~) for function keys
-                                        if (0x40 <= ord(term_char) <= 0x7E) or term_char == '~':
-                                            break
-                                # If it's SS3 sequence (ESC O), read one more char
-                                elif next_char == 'O':
-                                    is_escape_sequence = True
-                                    term_char = await asyncio.wait_for(
-                                        loop.run_in_executor(None, sys.stdin.read, 1),
-                                        timeout=0.05
-                                    )
-                                    if term_char:
-                                        seq += term_char
-                                else:
-                                    # Other escape sequences (ESC (, ESC ), etc.)
-                                    is_escape_sequence = True
                         except asyncio.TimeoutError:
-                            # Standalone ESC
-                            is_escape_sequence = False
-                        
-                        # Try to remap the sequence using function_keys map
-                        # Extract the key code part of the sequence for lookup
-                        remapped_seq = seq
-                        if is_escape_sequence and seq.startswith('\x1b['):
-                            # CSI sequence - extract the key code (last char or number+char)
-                            # Format: ESC [ ... code (e.g., ESC [ 2 ~ for INSERT)
-                            if len(seq) > 2:
-                                # Get the ending of the sequence for lookup
-                                key_code = seq[2:]  # Everything after ESC[
-                                if key_code in function_keys:
-                                    remapped_seq = function_keys[key_code]
-                        elif is_escape_sequence and seq.startswith('\x1b'):
-                            # Other escape sequences
-                            key_code = seq[1:]  # Everything after ESC
-                            if key_code in function_keys:
-                                remapped_seq = function_keys[key_code]
-                        
-                        # Send the (possibly remapped) sequence to the server
-                        writer.write(remapped_seq)
+                            send(parser.flush())
+                            continue
                     else:
-                        # Regular character - send to telnet server
-                        writer.write(char)
-                        # DON'T log or display what we send - let server echo handle it
-                        # if logger:
-                        #     logger.log(char)
+                        data = await chunks.get()
+                    if not data:
+                        return
+
+                    # Everything read at once (e.g. a paste) goes out in one write
+                    out = []
+                    for piece in input_triggers.split(text_decoder.decode(data)):
+                        # Check for escape character (Ctrl+])
+                        if piece == ESCAPE_KEY:
+                            send("".join(out))
+                            return
+
+                        # Check for macro keys (--macro, and Ctrl+G for --bell)
+                        if piece in macros:
+                            send("".join(out))
+                            out = []
+                            # Pressing the key again while it runs does nothing
+                            task = macro_tasks.get(piece)
+                            if task is None or task.done():
+                                macro_tasks[piece] = asyncio.create_task(
+                                    play(macros[piece])
+                                )
+                        elif piece:
+                            # Regular input; escape sequences from the terminal
+                            # (arrow keys, function keys, etc.) are remapped.
+                            # DON'T log or display what we send - let server echo handle it
+                            out.append(parser.feed(piece))
+                    send("".join(out))
             except (EOFError, asyncio.CancelledError):
                 pass
-        
+            finally:
+                if chunks is not None:
+                    loop.remove_reader(stdin_fd)
+
         # Create and run both tasks concurrently
         server_task = asyncio.create_task(server_reader())
         stdin_task = asyncio.create_task(stdin_reader())
-        
+
         try:
             # Wait for either task to complete
             done, pending = await asyncio.wait(
-                [server_task, stdin_task],
-                return_when=asyncio.FIRST_COMPLETED
+                [server_task, stdin_task], return_when=asyncio.FIRST_COMPLETED
             )
-            
+
             # Cancel pending tasks
             for task in pending:
                 task.cancel()
@@ -556,150 +1486,469 @@ async def graphical_shell(reader, writer, logger: Optional[SessionLogger] = None
                     pass
         except Exception:
             pass
-        
+
+        for task in macro_tasks.values():
+            task.cancel()
+
+        renderer.close()
         print("\nDisconnected.")
-    
+
     finally:
         # Close logger
         if logger:
             logger.close()
-        
+
         # Restore original terminal settings
         if old_settings:
             termios.tcsetattr(sys.stdin.fileno(), termios.TCSADRAIN, old_settings)
 
 
-async def main(host: str, port: Optional[int] = 23, log_file: Optional[str] = None, bell_macro: Optional[str] = None, macro_delay: float = 0.01, cols: int = 80, rows: int = 24, key_map: Optional[Dict] = None):
+async def replay_session(
+    path: str,
+    speed: float = 1.0,
+    logger: Optional[SessionLogger] = None,
+    renderer: Optional[FrameRenderer] = None,
+) -> dict:
+    """
+    Replay the server side of a session recording to the terminal.
+
+    Frames go through the same decode path as a live session. speed scales
+    the recorded timing (1.0 = original, 4.0 = four times faster); 0 replays
+    unthrottled, which makes the run a repeatable decoder/renderer benchmark.
+    Returns replay statistics.
+    """
+    decoder = CP437IncrementalDecoder()
+    filters = _output_filters()
+    if renderer is None:
+        renderer = create_renderer(
+            getattr(graphical_shell, "render_mode", "passthrough"),
+            getattr(graphical_shell, "render_interval", 0.0),
+            getattr(graphical_shell, "term_cols", 80),
+            getattr(graphical_shell, "term_rows", 24),
+        )
+
+    frames = 0
+    total = 0
+    start = time.perf_counter()
+    for frame in read_recording(path):
+        if frame.direction != SERVER:
+            continue
+        delay = 0.0
+        if speed > 0:
+            delay = start + frame.timestamp / speed - time.perf_counter()
+        # Always yield so pending frames get rendered
+        await asyncio.sleep(max(delay, 0.0))
+
+        decoded = decode_filtered(decoder, frame.data, filters)
+        renderer.write(decoded)
+        if logger:
+            logger.log(decoded)
+        frames += 1
+        total += len(frame.data)
+
+    renderer.write(decode_filtered(decoder, b"", filters, final=True))
+    renderer.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "frames": frames,
+        "bytes": total,
+        "seconds": elapsed,
+        "mb_per_s": total / elapsed / 1e6 if elapsed else 0.0,
+        "bytes_written": renderer.bytes_written,
+    }
+
+
+# Options a BBS settles on connect; the session starts once none of them is
+# still being negotiated
+SETTLE_OPTIONS = (BINARY, SGA, NAWS)
+
+
+class TimedReader(telnetlib3.TelnetReader):
+    """TelnetReader that notes when the first server data (not telnet commands) arrives."""
+
+    first_data_at = None
+    on_first_data = None
+
+    def feed_data(self, data: bytes):
+        if data and self.first_data_at is None:
+            self.first_data_at = time.monotonic()
+            if self.on_first_data:
+                self.on_first_data()
+        super().feed_data(data)
+
+
+class FastConnectClient(telnetlib3.TelnetClient):
+    """
+    Telnet client that is connected as soon as negotiation settles.
+
+    telnetlib3 asks check_negotiation() on every batch of telnet commands
+    from the server; this one answers yes once nothing is pending and the
+    server has settled each of SETTLE_OPTIONS (accepted or refused it), or
+    as soon as the server starts sending data. connect_maxwait is the
+    deadline for a server that does neither. The NAWS reply uses the cols
+    and rows given to open_connection.
+
+    The early re-check and the timings reach into telnetlib3 internals
+    (_reader_factory, _waiter_connected, _check_later and
+    _check_negotiation_timer, as of telnetlib3 5.x). Each is looked up with
+    getattr, so if a release renames one the client falls back to waiting
+    for connect_maxwait (--negotiate-timeout) instead of failing.
+    """
+
+    _reader_factory = TimedReader
+
+    def connection_made(self, transport):
+        self.started_at = time.monotonic()
+        self.negotiated_at = None
+        super().connection_made(transport)
+        if isinstance(self.reader, TimedReader):
+            self.reader.on_first_data = self._on_first_data
+        waiter = getattr(self, "_waiter_connected", None)
+        if waiter is not None:
+            waiter.add_done_callback(self._on_negotiated)
+
+    def check_negotiation(self, final: bool = False) -> bool:
+        writer = self.writer
+        if any(writer.pending_option.values()):
+            return False
+        if getattr(self.reader, "first_data_at", None) is not None:
+            return True
+        return all(
+            option in writer.local_option or option in writer.remote_option
+            for option in SETTLE_OPTIONS
+        )
+
+    def timings(self) -> dict:
+        """Seconds from TCP connect to negotiation done and to the first data byte."""
+        first_data_at = getattr(self.reader, "first_data_at", None)
+        return {
+            "negotiation_seconds": (
+                self.negotiated_at - self.started_at
+                if self.negotiated_at is not None
+                else None
+            ),
+            "first_byte_seconds": (
+                first_data_at - self.started_at if first_data_at is not None else None
+            ),
+        }
+
+    def _on_first_data(self):
+        # The server has moved on to output: re-check now rather than at the deadline
+        waiter = getattr(self, "_waiter_connected", None)
+        recheck = getattr(self, "_check_negotiation_timer", None)
+        if (
+            waiter is not None
+            and recheck is not None
+            and not waiter.done()
+            and getattr(self, "_check_later", None) is not None
+        ):
+            recheck()
+
+    def _on_negotiated(self, future):
+        self.negotiated_at = time.monotonic()
+
+
+def format_timings(timings: dict) -> str:
+    """--stats line for FastConnectClient.timings(); either time may be None."""
+
+    def seconds(value):
+        return f"{value:.3f}s" if value is not None else "(none)"
+
+    return (
+        f"Negotiation took {seconds(timings['negotiation_seconds'])}, "
+        f"first byte after {seconds(timings['first_byte_seconds'])}"
+    )
+
+
+async def main(
+    host: str,
+    port: Optional[int] = 23,
+    log_file: Optional[str] = None,
+    bell_macro: Optional[str] = None,
+    macro_delay: float = 0.01,
+    cols: int = 80,
+    rows: int = 24,
+    key_map: Optional[Dict] = None,
+    render_interval: float = 0.01,
+    log_options: Optional[Dict] = None,
+    record_file: Optional[str] = None,
+    render_mode: str = "passthrough",
+    output_filters: tuple = DEFAULT_FILTERS,
+    max_read_size: int = 256 * 1024,
+    show_stats: bool = False,
+    negotiate_timeout: float = 1.0,
+    macros: Optional[Dict[str, str]] = None,
+    macro_burst: bool = False,
+):
     """Connect to telnet host and run graphical shell."""
+    # Compile --macro bindings and the --bell macro once, before connecting
+    programs = compile_macros(macros or {}, macro_delay, bell_macro, macro_burst)
+
     # Store macro_delay as a class attribute for use in graphical_shell
     graphical_shell.macro_delay = macro_delay
+    graphical_shell.macro_burst = macro_burst
+    graphical_shell.render_interval = render_interval
+    graphical_shell.render_mode = render_mode
+    graphical_shell.output_filters = output_filters
+    graphical_shell.max_read_size = max_read_size
     graphical_shell.term_cols = cols
     graphical_shell.term_rows = rows
-    
+
     # Create logger if requested
-    logger = SessionLogger(log_file) if log_file else None
-    
+    logger = SessionLogger(log_file, **(log_options or {})) if log_file else None
+
+    # Create raw recorder if requested
+    recorder = SessionRecorder(record_file) if record_file else None
+
     try:
         # Get actual terminal size only if defaults were used (not explicitly specified)
         # If user specified --cols or --rows, respect those values
         import sys
-        if '--cols' not in sys.argv and '--rows' not in sys.argv:
+
+        if "--cols" not in sys.argv and "--rows" not in sys.argv:
             try:
                 import shutil
+
                 term_size = shutil.get_terminal_size((cols, rows))
                 cols, rows = term_size.columns, term_size.lines
             except Exception:
                 pass
-        
+
         graphical_shell.term_cols = cols
         graphical_shell.term_rows = rows
-        
+
         # Disable TTYPE negotiation to avoid crashes on some servers
+        # encoding=False gives a binary reader/writer: server bytes reach the
+        # CP437 decoder untouched instead of via a latin-1 str round trip.
+        # The connection is ready as soon as negotiation settles (or the
+        # server starts sending); negotiate_timeout is the deadline.
         reader, writer = await telnetlib3.open_connection(
             host,
             port,
-            encoding='latin-1',  # 8-bit encoding
+            client_factory=FastConnectClient,
+            encoding=False,
             force_binary=True,
-            connect_minwait=0.0,  # Don't wait for telnet negotiation
+            cols=cols,
+            rows=rows,
+            connect_minwait=0.0,
+            connect_maxwait=negotiate_timeout,
         )
-        
-        # Send terminal size FIRST thing
-        try:
-            if hasattr(writer.protocol, 'request_naws'):
-                await writer.protocol.request_naws(cols, rows)
-        except Exception:
-            pass
-        
-        # Wait longer for server to process size and settle before we start displaying
-        await asyncio.sleep(0.8)
-        
-        # Clear telnetlib3's internal buffers to prevent negotiation data from appearing
-        try:
-            # telnetlib3 buffers data in the protocol object
-            if hasattr(writer.protocol, '_stream'):
-                # Try to clear the internal stream buffer
-                writer.protocol._stream._buffer.clear()
-        except Exception:
-            pass
-        
-        # Drain any remaining buffered data
-        drained_count = 0
-        try:
-            while drained_count < 10:  # Max 10 reads to prevent infinite loop
-                data = await asyncio.wait_for(reader.read(4096), timeout=0.05)
-                if not data:
-                    break
-                drained_count += 1
-        except asyncio.TimeoutError:
-            pass  # Expected - no more data
-        
-        # Clear the screen to wipe any negotiation artifacts before starting the shell
+
+        # Clear the screen before the server's output is displayed
         try:
-            sys.stdout.write('\x1b[2J')  # Clear screen
-            sys.stdout.write('\x1b[H')   # Home cursor
+            sys.stdout.write("\x1b[2J")  # Clear screen
+            sys.stdout.write("\x1b[H")  # Home cursor
             sys.stdout.flush()
         except Exception:
             pass
-        
+
         # Use default key map if none provided
         if key_map is None:
             key_map = ANSI_KEY_MAP
-        
+
         # Run the graphical shell after connection is established
-        await graphical_shell(reader, writer, logger=logger, bell_macro=bell_macro, key_map=key_map)
+        await graphical_shell(
+            reader,
+            writer,
+            logger=logger,
+            key_map=key_map,
+            recorder=recorder,
+            macros=programs,
+        )
+        if show_stats:
+            print(format_timings(writer.protocol.timings()), file=sys.stderr)
+            stats = graphical_shell.pipeline.stats()
+            print(
+                f"Read {stats['bytes_read']} bytes in {stats['reads']} reads "
+                f"(largest {stats['max_read']}), {stats['batches']} batches; "
+                f"queue peaked at {stats['max_queue_depth']} reads/{stats['max_queue_bytes']} bytes, "
+                f"reading paused {stats['stalls']} times ({stats['stall_seconds']:.3f}s)",
+                file=sys.stderr,
+            )
         await writer.protocol.waiter_closed
     finally:
         if logger:
             logger.close()
+        if recorder:
+            recorder.close()
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="CP437 Telnet Client with full graphical character support"
     )
-    parser.add_argument("host", help="Telnet host to connect to")
-    parser.add_argument("port", type=int, nargs="?", default=23, help="Telnet port (default: 23)")
+    parser.add_argument("host", nargs="?", help="Telnet host to connect to")
     parser.add_argument(
-        "-l", "--log",
+        "port", type=int, nargs="?", default=23, help="Telnet port (default: 23)"
+    )
+    parser.add_argument(
+        "-l",
+        "--log",
         dest="log_file",
-        help="Log session to file (use timestamp if not specified)"
+        help="Log session to file (use timestamp if not specified)",
+    )
+    parser.add_argument(
+        "--log-background",
+        action="store_true",
+        help="Write the session log from a background thread in batches",
+    )
+    parser.add_argument(
+        "--log-fsync",
+        choices=SessionLogger.FSYNC_POLICIES,
+        default="never",
+        help="When to fsync the session log (default: never)",
+    )
+    parser.add_argument(
+        "--log-rotate-size",
+        type=int,
+        help="Start a new log segment after this many bytes",
+    )
+    parser.add_argument(
+        "--log-rotate-interval",
+        type=float,
+        help="Start a new log segment after this many seconds",
+    )
+    parser.add_argument(
+        "--log-compress",
+        choices=SessionLogger.COMPRESSIONS,
+        help="Compress rotated log segments",
+    )
+    parser.add_argument(
+        "--record",
+        dest="record_file",
+        help="Record raw session bytes with timing to FILE (for --replay)",
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="FILE",
+        help="Replay a --record recording instead of connecting",
+    )
+    parser.add_argument(
+        "--replay-speed",
+        type=float,
+        default=1.0,
+        help="Replay speed multiplier (default: 1.0, 0 = as fast as possible)",
     )
     parser.add_argument(
         "--bell",
         dest="bell_macro",
-        help="Macro text to send when Ctrl+G is pressed (sends Ctrl+G first, then text). Use h/j/k/l for left/down/up/right arrows"
+        help="Macro text to send when Ctrl+G is pressed (sends Ctrl+G first, then text). Use h/j/k/l for left/down/up/right arrows",
+    )
+    parser.add_argument(
+        "--macro",
+        dest="macros",
+        action="append",
+        default=[],
+        metavar="KEY=TEXT",
+        help="Bind a macro to a control key other than ^], Esc (^[), Enter (^M/^J), Backspace (^H) and Tab (^I), e.g. ^B='{expect Name:}sysop{enter}' (repeatable; see cp437_macros for {up}, {wait N}, {expect TEXT}, ...)",
     )
     parser.add_argument(
         "--delay",
         type=float,
         default=0.01,
-        help="Delay between macro keystrokes in seconds (default: 0.01)"
+        help="Delay after each key a macro sends, in seconds (default: 0.01, 0 = send the whole macro at once)",
+    )
+    parser.add_argument(
+        "--macro-burst",
+        action="store_true",
+        help="Send runs of plain text in a macro in one write; --delay then applies only after arrow/named keys",
     )
     parser.add_argument(
         "--cols",
         type=int,
         default=80,
-        help="Terminal width to send to server (default: 80)"
+        help="Terminal width to send to server (default: 80)",
     )
     parser.add_argument(
         "--rows",
         type=int,
         default=24,
-        help="Terminal height to send to server (default: 24)"
+        help="Terminal height to send to server (default: 24)",
+    )
+    parser.add_argument(
+        "--render-interval",
+        type=float,
+        default=0.01,
+        help="Seconds between screen updates while the server is streaming output (default: 0.01, 0 = update on every read)",
+    )
+    parser.add_argument(
+        "--render-mode",
+        choices=RENDER_MODES,
+        default="passthrough",
+        help="passthrough: forward server output as-is; diff: keep a screen buffer and write only changed cells each frame (default: passthrough)",
+    )
+    parser.add_argument(
+        "--filter",
+        dest="filters",
+        action="append",
+        choices=sorted(FILTERS),
+        default=[],
+        metavar="NAME",
+        help=f"Add an output filter, applied in order after the defaults (repeatable; one of: {', '.join(sorted(FILTERS))})",
+    )
+    parser.add_argument(
+        "--no-default-filters",
+        action="store_true",
+        help=f"Do not apply the default output filters ({', '.join(DEFAULT_FILTERS)})",
+    )
+    parser.add_argument(
+        "--max-read-size",
+        type=int,
+        default=256 * 1024,
+        metavar="BYTES",
+        help="Largest network read while the server is streaming output (default: 262144)",
+    )
+    parser.add_argument(
+        "--negotiate-timeout",
+        type=float,
+        default=1.0,
+        metavar="SECONDS",
+        help="Longest wait for telnet negotiation to settle before the session starts (default: 1.0)",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Print negotiation time, time to first byte and read/queue statistics on exit",
     )
     parser.add_argument(
         "--ansi",
         action="store_true",
-        help="Use standard ANSI key mappings (default is SyncTerm)"
+        help="Use standard ANSI key mappings (default is SyncTerm)",
     )
     parser.add_argument(
         "--syncterm",
         action="store_true",
-        help="Use SyncTerm key mappings (default - PAGEUP/PAGEDOWN use ESC[V/U, INSERT uses ESC[@)"
+        help="Use SyncTerm key mappings (default - PAGEUP/PAGEDOWN use ESC[V/U, INSERT uses ESC[@)",
+    )
+    parser.add_argument(
+        "--keys",
+        dest="key_profiles",
+        action="append",
+        choices=sorted(KEY_PROFILES),
+        default=[],
+        help="Also translate keys sent by this local terminal (repeatable)",
     )
-    
+    parser.add_argument(
+        "--key-map",
+        dest="key_map_files",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="JSON object of extra key mappings, input sequence -> sequence to send (repeatable)",
+    )
+
     args = parser.parse_args()
-    
+    if not args.host and not args.replay:
+        parser.error("host is required unless --replay is given")
+    macros = {}
+    for binding in args.macros:
+        key, sep, text = binding.partition("=")
+        if not sep or not key:
+            parser.error(f"--macro needs KEY=TEXT, got {binding!r}")
+        macros[key] = text
+    if args.max_read_size < 4096:
+        parser.error("--max-read-size must be at least 4096")
+
     # Determine key map based on arguments
     # Default to SYNCTERM (SyncTerm is the most compatible)
     # Use --ansi flag to explicitly select ANSI mappings
@@ -708,16 +1957,86 @@ if __name__ == "__main__":
     else:
         # Default to SYNCTERM (--syncterm is optional since it's the default)
         key_map = SYNCTERM_KEY_MAP
-    
+
+    # Layer terminal profiles and user maps on top (later entries win)
+    if args.key_profiles or args.key_map_files:
+        key_map = dict(key_map)
+        for profile in args.key_profiles:
+            key_map.update(KEY_PROFILES[profile])
+        for path in args.key_map_files:
+            try:
+                with open(path, encoding="utf-8") as f:
+                    key_map.update(json.load(f))
+            except (OSError, ValueError) as e:
+                parser.error(f"cannot load key map {path}: {e}")
+
     # Generate log filename if --log specified without value
     log_file = args.log_file
     if args.log_file == "":
         # Create timestamped log file
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         log_file = f"session_{timestamp}.log"
-    
+
+    log_options = {
+        "background": args.log_background,
+        "fsync": args.log_fsync,
+        "rotate_size": args.log_rotate_size,
+        "rotate_interval": args.log_rotate_interval,
+        "compress": args.log_compress,
+    }
+
+    output_filters = tuple(() if args.no_default_filters else DEFAULT_FILTERS) + tuple(
+        args.filters
+    )
+
+    if args.replay:
+        graphical_shell.render_interval = args.render_interval
+        graphical_shell.output_filters = output_filters
+        graphical_shell.render_mode = args.render_mode
+        graphical_shell.term_cols = args.cols
+        graphical_shell.term_rows = args.rows
+        logger = SessionLogger(log_file, **log_options) if log_file else None
+        try:
+            stats = asyncio.run(
+                replay_session(args.replay, speed=args.replay_speed, logger=logger)
+            )
+        except KeyboardInterrupt:
+            print("\nInterrupted by user.")
+            sys.exit(0)
+        finally:
+            if logger:
+                logger.close()
+        print(
+            f"\nReplayed {stats['frames']} frames, {stats['bytes']} bytes in "
+            f"{stats['seconds']:.3f}s ({stats['mb_per_s']:.1f} MB/s), "
+            f"wrote {stats['bytes_written']} bytes to the terminal",
+            file=sys.stderr,
+        )
+        sys.exit(0)
+
     try:
-        asyncio.run(main(args.host, args.port, log_file=log_file, bell_macro=args.bell_macro, macro_delay=args.delay, cols=args.cols, rows=args.rows, key_map=key_map))
+        asyncio.run(
+            main(
+                args.host,
+                args.port,
+                log_file=log_file,
+                bell_macro=args.bell_macro,
+                macro_delay=args.delay,
+                cols=args.cols,
+                rows=args.rows,
+                key_map=key_map,
+                render_interval=args.render_interval,
+                log_options=log_options,
+                record_file=args.record_file,
+                render_mode=args.render_mode,
+                output_filters=output_filters,
+                max_read_size=args.max_read_size,
+                show_stats=args.stats,
+                negotiate_timeout=args.negotiate_timeout,
+                macros=macros,
+                macro_burst=args.macro_burst,
+            )
+        )
     except KeyboardInterrupt:
         print("\nInterrupted by user.")
         sys.exit(0)
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+CP437 Tokens - Split raw CP437 server output into typed ANSI tokens.
+
+tokenize() walks the bytes once and returns a list of (kind, text, start,
+end) tuples, kind being one of:
+
+    TEXT     a run of glyphs, decoded through the CP437 table
+    CSI      ESC [ params intermediates final
+    OSC      ESC ] ... BEL  or  ESC ] ... ESC \\
+    CHARSET  ESC ( ) * + followed by 0, A, B or U
+    CONTROL  one C0 control the terminal acts on (NUL, BS, TAB, LF, CR)
+
+text is the decoded text (escape sequences as latin-1) and [start, end)
+the byte offsets it came from, so callers can slice the original buffer (or
+a memoryview of it) without copying. Tokens are plain tuples because a
+NamedTuple doubles the cost of dense ANSI art; CSI parameters are parsed
+only when asked for, with csi_params().
+
+tokenize_into() is the same walk over data[start:stop] of a reusable
+buffer; it returns where the unfinished tail starts instead of copying it.
+It runs in C when the cp437_speedups extension is built.
+
+With controls=False, controls stay inside TEXT runs; that is what the
+string decoders use, since the terminal gets the same characters either
+way and plain text then costs one table lookup per run.
+"""
+
+import codecs
+import re
+from typing import List, Optional, Tuple
+
+import cp437_speedups
+from cp437_tables import CONTROL_PRESERVING_TABLE
+
+TEXT = 'text'
+CSI = 'csi'
+OSC = 'osc'
+CHARSET = 'charset'
+CONTROL = 'control'
+
+# Longest escape sequence the tokenizer will wait for (an OSC is abandoned
+# after 200 bytes), so a held-back tail never needs more lookahead than this
+MAX_SEQUENCE_LENGTH = 201
+
+
+# A token: (kind, text, start, end)
+Token = Tuple[str, str, int, int]
+
+_CSI_PARAMS = re.compile(r'\x1b\[([<=>?]?)([0-9;:]*)')
+
+
+def csi_params(text: str) -> Tuple[Optional[int], ...]:
+    """
+    Numeric parameters of a CSI token's text; omitted ones are None
+    (ESC[;5H -> (None, 5)) and sub-parameters after ':' are dropped.
+    """
+    body = _CSI_PARAMS.match(text).group(2)
+    if not body:
+        return ()
+    return tuple(int(part.split(':')[0]) if part[:1].isdigit() else None for part in body.split(';'))
+
+
+def csi_private(text: str) -> str:
+    """Private marker of a CSI token's text ('?', '>', ... or '')."""
+    return _CSI_PARAMS.match(text).group(1)
+
+
+_ESC_GLYPH = CONTROL_PRESERVING_TABLE[0x1B]
+_CSI_SEQUENCE = re.compile(rb'\x1b\[[^\x40-\x7e]{0,97}[\x40-\x7e]')
+_CHARSET_INTRODUCERS = b'()*+'
+_CHARSET_FINALS = b'0ABU'
+
+# Bytes the decoding table leaves as control characters
+_CONTROL_BYTES = bytes(b for b in range(0x20) if CONTROL_PRESERVING_TABLE[b] == chr(b))
+_TEXT_OR_CONTROL = re.compile(
+    b'([^%s]+)|[%s]' % (re.escape(_CONTROL_BYTES), re.escape(_CONTROL_BYTES))
+)
+
+
+def tokenize(data: bytes, start: int = 0, controls: bool = True, offset: int = 0,
+             table: str = CONTROL_PRESERVING_TABLE) -> Tuple[List[Token], bytes]:
+    """
+    Tokenize data[start:]. Returns (tokens, tail): tail is an escape
+    sequence at the end of data that is not complete yet, to be prepended
+    to the next read. offset is added to every token's start and end (the
+    stream position of data[0]).
+    """
+    tokens = []
+    length = len(data)
+    i = tokenize_into(tokens, data, start, length, controls, offset, table)
+    return tokens, data[i:] if i < length else b''
+
+
+def tokenize_into(tokens: List[Token], data, start: int, stop: int, controls: bool = True,
+                  offset: int = 0, table: str = CONTROL_PRESERVING_TABLE) -> int:
+    """
+    Append the tokens of data[start:stop] to tokens, without slicing off
+    the unfinished tail: returns the index it starts at (stop if there is
+    none). data may be bytes or a bytearray used as a reusable buffer.
+    """
+    compiled = cp437_speedups.compiled
+    if compiled is not None:
+        return compiled.tokenize_into(tokens, data, start, stop, controls, offset, table)
+    append = tokens.append
+    charmap_decode = codecs.charmap_decode
+    length = stop
+    i = start
+
+    while i < length:
+        esc = data.find(b'\x1b', i, length)
+        text_end = length if esc < 0 else esc
+        if text_end > i:
+            if controls:
+                for match in _TEXT_OR_CONTROL.finditer(data, i, text_end):
+                    s, e = match.span()
+                    if match.lastindex:
+                        append((TEXT, charmap_decode(data[s:e], 'strict', table)[0], s + offset, e + offset))
+                    else:
+                        append((CONTROL, table[data[s]], s + offset, e + offset))
+            else:
+                append((TEXT, charmap_decode(data[i:text_end], 'strict', table)[0], i + offset, text_end + offset))
+        if esc < 0:
+            break
+        i = esc
+
+        available = length - i
+        if available < 2:
+            return i
+
+        introducer = data[i + 1]
+        if introducer == 0x5B:  # ESC [ - CSI
+            match = _CSI_SEQUENCE.match(data, i, length)
+            if match:
+                end = match.end()
+                append((CSI, data[i:end].decode('latin-1'), i + offset, end + offset))
+                i = end
+            elif available >= 100:
+                # Malformed (overlong) CSI: ESC and '[' both shown as glyphs
+                append((TEXT, _ESC_GLYPH + _ESC_GLYPH, i + offset, i + 2 + offset))
+                i += 2
+            else:
+                return i
+
+        elif introducer == 0x5D:  # ESC ] - OSC, ends with BEL or ESC \
+            bel = data.find(b'\x07', i + 2, min(i + 200, length))
+            st = data.find(b'\x1b\\', i + 2, min(i + 201, length))
+            if bel >= 0 and (st < 0 or bel < st):
+                end = bel + 1
+            elif st >= 0:
+                end = st + 2
+            else:
+                end = 0
+            if end:
+                append((OSC, data[i:end].decode('latin-1'), i + offset, end + offset))
+                i = end
+            elif available >= 200:
+                # Malformed (overlong) OSC: ESC and ']' both shown as glyphs
+                append((TEXT, _ESC_GLYPH + _ESC_GLYPH, i + offset, i + 2 + offset))
+                i += 2
+            else:
+                return i
+
+        elif introducer in _CHARSET_INTRODUCERS:  # ESC ( ) * + - charset
+            if available < 3:
+                return i
+            if data[i + 2] in _CHARSET_FINALS:
+                append((CHARSET, data[i:i + 3].decode('latin-1'), i + offset, i + 3 + offset))
+                i += 3
+            else:
+                append((TEXT, _ESC_GLYPH + _ESC_GLYPH, i + offset, i + 2 + offset))
+                i += 2
+
+        else:
+            # Not a recognized sequence, map ESC as CP437
+            append((TEXT, _ESC_GLYPH, i + offset, i + 1 + offset))
+            i += 1
+
+    return length
+
+
+def tokenize_unterminated(tail: bytes, controls: bool = True, offset: int = 0) -> List[Token]:
+    """Tokenize a tail that will never be completed (end of stream)."""
+    tokens = []
+    position = 0
+    length = len(tail)
+    while position < length:
+        # The leading ESC cannot start a sequence any more; show it as a glyph
+        tokens.append((TEXT, _ESC_GLYPH, position + offset, position + 1 + offset))
+        position = tokenize_into(tokens, tail, position + 1, length, controls, offset)
+    return tokens
+
+
+def tokens_text(tokens: List[Token]) -> str:
+    """Concatenated text of tokens (what a terminal would be sent)."""
+    return "".join([token[1] for token in tokens])
@@ -13,79 +13,25 @@ Usage:
 import asyncio
 import sys
 
-# Dynamically build CP437 graphical map (standard + low symbol overrides)
-raw = bytes(range(256))
-standard_decoded = raw.decode("cp437")
-graphical_low = {
-    0x01: "\u263a",  # ☺
-    0x02: "\u263b",  # ☻
-    0x03: "\u2665",  # ♥
-    0x04: "\u2666",  # ♦
-    0x05: "\u2663",  # ♣
-    0x06: "\u2660",  # ♠
-    0x07: "\u2022",  # •
-    0x08: "\u25d8",  # ◘
-    0x09: "\u25cb",  # ○ (TAB)
-    0x0A: "\u25d9",  # ▹ (LF)
-    0x0B: "\u2642",  # ♂
-    0x0C: "\u2640",  # ♀
-    0x0D: "\u266a",  # ♪ (CR)
-    0x0E: "\u25ba",  # ►
-    0x0F: "\u25c4",  # ◄
-    0x10: "\u2195",  # ↕
-    0x11: "\u203c",  # ‼
-    0x12: "\u00b6",  # ¶
-    0x13: "\u00a7",  # §
-    0x14: "\u25ac",  # ▬
-    0x15: "\u21a8",  # ↨
-    0x16: "\u2191",  # ↑
-    0x17: "\u2193",  # ↓
-    0x18: "\u2192",  # →
-    0x19: "\u2190",  # ←
-    0x1A: "\u221f",  # ∟
-    0x1B: "\u2194",  # ↔
-    0x1C: "\u25b2",  # ▲
-    0x1D: "\u25bc",  # ▼
-    0x1E: "\u2320",  # ⌠
-    0x1F: "\u2321",  # ⌡
-    0x7F: "\u2302",  # ⌂
-}
-
-CP437_MAP = {}
-for i in range(256):
-    if i in graphical_low:
-        CP437_MAP[i] = graphical_low[i]
-    else:
-        CP437_MAP[i] = standard_decoded[i]
-
-# Inverse map for encoding (Unicode to CP437; first match wins)
-UNICODE_TO_CP437 = {}
-for k, v in CP437_MAP.items():
-    if v not in UNICODE_TO_CP437:
-        UNICODE_TO_CP437[v] = k
+import cp437_tables
+
+# Every byte is shown as its glyph here, BS/TAB/LF/CR included
+CP437_MAP = cp437_tables.FULL_GLYPH_MAP
+UNICODE_TO_CP437 = cp437_tables.FULL_GLYPH_UNICODE_TO_CP437
 
 
 def decode_cp437(data: bytes) -> str:
     """Decode CP437 bytes to Unicode string with graphical characters."""
     if isinstance(data, str):
         return data
-    return "".join(CP437_MAP.get(b, "?") for b in data)
+    return cp437_tables.decode_cp437(data, cp437_tables.FULL_GLYPH_TABLE)
 
 
-def encode_cp437(text: str) -> bytes:
-    """Encode Unicode string to CP437 bytes."""
+def encode_cp437(text: str, errors: str = "replace") -> bytes:
+    """Encode Unicode string to CP437 bytes (errors: strict, replace, approximate)."""
     if isinstance(text, bytes):
         return text
-    result = bytearray()
-    for char in text:
-        if char in UNICODE_TO_CP437:
-            result.append(UNICODE_TO_CP437[char])
-        else:
-            try:
-                result.append(char.encode("latin-1")[0])
-            except Exception:
-                result.append(ord("?"))  # Safe fallback
-    return bytes(result)
+    return cp437_tables.encode_cp437(text, errors, cp437_tables.FULL_GLYPH_TABLE)
 
 
 def print_cp437(data: bytes) -> None:
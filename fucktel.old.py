@@ -19,6 +19,8 @@ from typing import Optional, Dict
 
 import telnetlib3
 
+from cp437_tables import CP437_MAP, UNICODE_TO_CP437, encode_cp437  # noqa: F401
+
 # Patch telnetlib3 TTYPE handler to prevent crashes on problematic servers
 # Some servers send malformed TTYPE subnegotiations that cause AssertionErrors
 try:
@@ -34,60 +36,6 @@ try:
 except Exception:
     pass  # If we can't patch, continue anyway
 
-# Dynamically build CP437 graphical map (standard + low symbol overrides)
-raw = bytes(range(256))
-standard_decoded = raw.decode("cp437")
-# Only override printable graphical characters from low ASCII range
-# Include ALL low ASCII characters that have graphical representations in CP437
-graphical_low = {
-    0x01: "\u263a",  # ☺
-    0x02: "\u263b",  # ☻
-    0x03: "\u2665",  # ♥
-    0x04: "\u2666",  # ♦
-    0x05: "\u2663",  # ♣
-    0x06: "\u2660",  # ♠
-    0x07: "\u2022",  # •
-    # 0x08: BS - keep as-is (backspace control)
-    # 0x09: TAB - keep as-is (tab control)
-    # 0x0A: LF - keep as-is (line feed control)
-    0x0B: "\u2642",  # ♂
-    0x0C: "\u2640",  # ♀
-    # 0x0D: CR - keep as-is (carriage return control)
-    0x0E: "\u25ba",  # ►
-    0x0F: "\u25c4",  # ◄
-    0x10: "\u2195",  # ↕
-    0x11: "\u203c",  # ‼
-    0x12: "\u00b6",  # ¶
-    0x13: "\u00a7",  # §
-    0x14: "\u25ac",  # ▬
-    0x15: "\u21a8",  # ↨
-    0x16: "\u2191",  # ↑
-    0x17: "\u2193",  # ↓
-    0x18: "\u2192",  # →
-    0x19: "\u2190",  # ←
-    0x1A: "\u221f",  # ∟
-    0x1B: "\u2194",  # ↔
-    0x1C: "\u25b2",  # ▲
-    0x1D: "\u25bc",  # ▼
-    0x1E: "\u2320",  # ⌠
-    0x1F: "\u2321",  # ⌡
-    0x7F: "\u2302",  # ⌂
-}
-
-CP437_MAP = {}
-for i in range(256):
-    if i in graphical_low:
-        CP437_MAP[i] = graphical_low[i]
-    else:
-        CP437_MAP[i] = standard_decoded[i]
-
-# Inverse map for encoding (Unicode to CP437; first match wins)
-UNICODE_TO_CP437 = {}
-for k, v in CP437_MAP.items():
-    if v not in UNICODE_TO_CP437:
-        UNICODE_TO_CP437[v] = k
-
-
 def decode_cp437_graphical(data: bytes) -> str:
     """Custom decoder: Maps CP437 bytes to graphical Unicode, preserving ANSI codes."""
     result, _ = decode_cp437_graphical_buffered(data)
@@ -217,16 +165,7 @@ def decode_cp437_graphical_buffered(data: bytes) -> tuple:
 
 def encode_to_cp437(text: str) -> bytes:
     """Encode UTF-8 input back to CP437 (inverse map; latin-1 fallback)."""
-    result = bytearray()
-    for char in text:
-        if char in UNICODE_TO_CP437:
-            result.append(UNICODE_TO_CP437[char])
-        else:
-            try:
-                result.append(char.encode("latin-1")[0])
-            except Exception:
-                result.append(ord("?"))  # Safe fallback
-    return bytes(result)
+    return encode_cp437(text)
 
 
 # Register custom CP437 codec
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Multi-Session Client - Headless monitoring of many BBS nodes in one process.
+
+Opens one telnet connection per target inside a single event loop. Each
+session runs its own CP437 decoder and writes to its own session log and/or
+raw recording; nothing is displayed and no session history is kept in
+memory, so hundreds of mostly idle sessions stay cheap.
+
+Usage:
+    python3 multi_session.py bbs1.example.com bbs2.example.com:2323 \\
+        --log-dir logs --record-dir recordings --stats-interval 60
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import List, Optional, Tuple
+
+import telnetlib3
+
+from cp437_filters import DEFAULT_FILTERS, build_filters
+from cp437_telnet import CP437IncrementalDecoder, SessionLogger, decode_filtered
+from session_recorder import SERVER, SessionRecorder
+
+
+class HeadlessSession:
+    """One monitored connection: decoder, log/recording outputs and stats."""
+
+    __slots__ = (
+        'name', 'host', 'port', 'log_file', 'record_file', 'cols', 'rows',
+        'status', 'error', 'bytes_in', 'chars_decoded', 'reads',
+        'connect_seconds', 'connected_at', 'last_activity',
+    )
+
+    def __init__(self, name: str, host: str, port: int = 23,
+                 log_file: Optional[str] = None, record_file: Optional[str] = None,
+                 cols: int = 80, rows: int = 24):
+        self.name = name
+        self.host = host
+        self.port = port
+        self.log_file = log_file
+        self.record_file = record_file
+        self.cols = cols
+        self.rows = rows
+        self.status = 'pending'
+        self.error = None
+        self.bytes_in = 0
+        self.chars_decoded = 0
+        self.reads = 0
+        self.connect_seconds = None
+        self.connected_at = None
+        self.last_activity = None
+
+    async def run(self, connect_slots: asyncio.Semaphore, read_size: int = 4096,
+                  buffer_limit: int = 65536, connect_timeout: float = 10.0):
+        """Connect, then decode server output until the connection closes."""
+        logger = recorder = writer = None
+        try:
+            async with connect_slots:
+                self.status = 'connecting'
+                started = time.monotonic()
+                reader, writer = await asyncio.wait_for(
+                    telnetlib3.open_connection(
+                        self.host,
+                        self.port,
+                        encoding=False,
+                        force_binary=True,
+                        connect_minwait=0.0,
+                        cols=self.cols,
+                        rows=self.rows,
+                        limit=buffer_limit,
+                    ),
+                    timeout=connect_timeout,
+                )
+                self.connect_seconds = time.monotonic() - started
+            self.status = 'connected'
+            self.connected_at = time.time()
+
+            logger = SessionLogger(self.log_file) if self.log_file else None
+            recorder = SessionRecorder(self.record_file) if self.record_file else None
+            decoder = CP437IncrementalDecoder()
+            filters = build_filters(DEFAULT_FILTERS)
+
+            while True:
+                data = await reader.read(read_size)
+                if not data:
+                    break
+                self.reads += 1
+                self.bytes_in += len(data)
+                self.last_activity = time.time()
+                if recorder:
+                    recorder.record(SERVER, data)
+                decoded = decode_filtered(decoder, data, filters)
+                self.chars_decoded += len(decoded)
+                if logger:
+                    logger.log(decoded)
+
+            if logger:
+                logger.log(decode_filtered(decoder, b'', filters, final=True))
+            self.status = 'closed'
+        except asyncio.CancelledError:
+            self.status = 'stopped'
+            raise
+        except Exception as e:
+            self.status = 'failed'
+            self.error = f"{type(e).__name__}: {e}"
+        finally:
+            if writer is not None:
+                writer.close()
+            if logger:
+                logger.close()
+            if recorder:
+                recorder.close()
+
+    def stats(self) -> dict:
+        """Return this session's statistics."""
+        return {
+            'name': self.name,
+            'host': self.host,
+            'port': self.port,
+            'status': self.status,
+            'error': self.error,
+            'bytes_in': self.bytes_in,
+            'chars_decoded': self.chars_decoded,
+            'reads': self.reads,
+            'connect_seconds': self.connect_seconds,
+            'connected_at': self.connected_at,
+            'last_activity': self.last_activity,
+        }
+
+
+class MultiSessionClient:
+    """Runs many HeadlessSessions concurrently in one event loop."""
+
+    def __init__(self, targets: List[Tuple[str, int]], log_dir: Optional[str] = None,
+                 record_dir: Optional[str] = None, max_connecting: int = 20,
+                 read_size: int = 4096, buffer_limit: int = 65536,
+                 connect_timeout: float = 10.0, cols: int = 80, rows: int = 24):
+        self.max_connecting = max_connecting
+        self.read_size = read_size
+        self.buffer_limit = buffer_limit
+        self.connect_timeout = connect_timeout
+        self.sessions = []
+
+        names = set()
+        for host, port in targets:
+            name = f"{host}_{port}"
+            if name in names:
+                name = f"{name}_{len(self.sessions)}"
+            names.add(name)
+            self.sessions.append(HeadlessSession(
+                name,
+                host,
+                port,
+                log_file=os.path.join(log_dir, f"{name}.log") if log_dir else None,
+                record_file=os.path.join(record_dir, f"{name}.rec") if record_dir else None,
+                cols=cols,
+                rows=rows,
+            ))
+
+    async def run(self, duration: Optional[float] = None,
+                  stats_interval: Optional[float] = None, stats_callback=None):
+        """
+        Run all sessions until they close (or for duration seconds), calling
+        stats_callback(stats) every stats_interval seconds and at the end.
+        """
+        # Limit simultaneous connection attempts, not open sessions
+        connect_slots = asyncio.Semaphore(self.max_connecting)
+        tasks = [
+            asyncio.create_task(session.run(
+                connect_slots, self.read_size, self.buffer_limit, self.connect_timeout))
+            for session in self.sessions
+        ]
+        reporter = None
+        if stats_interval and stats_callback:
+            reporter = asyncio.create_task(self._report(stats_interval, stats_callback))
+        try:
+            await asyncio.wait(tasks, timeout=duration)
+        finally:
+            for task in tasks + ([reporter] if reporter else []):
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if reporter:
+                await asyncio.gather(reporter, return_exceptions=True)
+        if stats_callback:
+            stats_callback(self.stats())
+
+    async def _report(self, interval: float, callback):
+        while True:
+            await asyncio.sleep(interval)
+            callback(self.stats())
+
+    def stats(self) -> dict:
+        """Return totals plus per-session statistics."""
+        sessions = [session.stats() for session in self.sessions]
+        status_counts = {}
+        for entry in sessions:
+            status_counts[entry['status']] = status_counts.get(entry['status'], 0) + 1
+        return {
+            'sessions': len(sessions),
+            'status': status_counts,
+            'bytes_in': sum(entry['bytes_in'] for entry in sessions),
+            'per_session': sessions,
+        }
+
+
+def parse_target(text: str, default_port: int = 23) -> Tuple[str, int]:
+    """Parse 'host' or 'host:port'."""
+    host, sep, port = text.rpartition(':')
+    if sep and port.isdigit():
+        return host, int(port)
+    return text, default_port
+
+
+def print_stats(stats: dict):
+    """Print a stats table to stdout."""
+    counts = ", ".join(f"{count} {status}" for status, count in sorted(stats['status'].items()))
+    print(f"\n{stats['sessions']} sessions ({counts}), {stats['bytes_in']} bytes received")
+    print(f"  {'Session':<32} {'Status':<11} {'Bytes':>10} {'Reads':>7} {'Connect':>8}")
+    for entry in stats['per_session']:
+        connect = f"{entry['connect_seconds']:.3f}s" if entry['connect_seconds'] is not None else "-"
+        print(f"  {entry['name']:<32} {entry['status']:<11} {entry['bytes_in']:>10} "
+              f"{entry['reads']:>7} {connect:>8}")
+        if entry['error']:
+            print(f"    {entry['error']}")
+    sys.stdout.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Headless CP437 telnet client for many concurrent BBS sessions"
+    )
+    parser.add_argument("targets", nargs="*", help="Targets as host or host:port")
+    parser.add_argument("--hosts-file", help="File with one host[:port] per line")
+    parser.add_argument("--log-dir", help="Write a decoded session log per target here")
+    parser.add_argument("--record-dir", help="Write a raw recording per target here")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds")
+    parser.add_argument("--stats-interval", type=float, help="Print stats every N seconds")
+    parser.add_argument("--json", action="store_true", help="Print stats as JSON")
+    parser.add_argument(
+        "--max-connecting",
+        type=int,
+        default=20,
+        help="Simultaneous connection attempts (default: 20)"
+    )
+    parser.add_argument(
+        "--buffer-limit",
+        type=int,
+        default=65536,
+        help="Per-session receive buffer limit in bytes (default: 65536)"
+    )
+    parser.add_argument("--cols", type=int, default=80, help="Terminal width (default: 80)")
+    parser.add_argument("--rows", type=int, default=24, help="Terminal height (default: 24)")
+    args = parser.parse_args()
+
+    targets = [parse_target(t) for t in args.targets]
+    if args.hosts_file:
+        with open(args.hosts_file, encoding='utf-8') as f:
+            targets.extend(parse_target(line.strip()) for line in f
+                           if line.strip() and not line.startswith('#'))
+    if not targets:
+        parser.error("no targets given")
+    for directory in (args.log_dir, args.record_dir):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    client = MultiSessionClient(
+        targets,
+        log_dir=args.log_dir,
+        record_dir=args.record_dir,
+        max_connecting=args.max_connecting,
+        buffer_limit=args.buffer_limit,
+        cols=args.cols,
+        rows=args.rows,
+    )
+    report = (lambda stats: print(json.dumps(stats))) if args.json else print_stats
+    try:
+        asyncio.run(client.run(args.duration, args.stats_interval, report))
+    except KeyboardInterrupt:
+        report(client.stats())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Session Recorder - Raw byte recordings of telnet sessions for replay.
+
+A recording keeps the original CP437 bytes exactly as they crossed the
+wire, with timing, so a session can be replayed deterministically (see
+cp437_telnet.py --replay) or analysed without guessing packet boundaries.
+
+File format (all integers little-endian):
+
+    header  8s magic b'CP437REC', B version, 3x pad, Q wall-clock start (ns)
+    frame   c direction, Q monotonic offset from start (ns), I length,
+            followed by length bytes of payload
+
+Direction is SERVER (b'S', server to client) or CLIENT (b'C').
+"""
+
+import struct
+import time
+from typing import Iterator, NamedTuple
+
+MAGIC = b'CP437REC'
+VERSION = 1
+
+SERVER = b'S'
+CLIENT = b'C'
+
+_HEADER = struct.Struct('<8sB3xQ')
+_FRAME = struct.Struct('<cQI')
+
+
+class Frame(NamedTuple):
+    """One recorded chunk of session data."""
+    direction: bytes
+    timestamp: float  # Seconds since the start of the recording
+    data: bytes
+
+
+class SessionRecorder:
+    """Writes length-prefixed, timestamped frames to a recording file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.frames = 0
+        self.bytes_recorded = 0
+        self._file = open(path, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, VERSION, time.time_ns()))
+        self._start = time.monotonic_ns()
+
+    def record(self, direction: bytes, data: bytes):
+        """Append one frame of raw data travelling in the given direction."""
+        if not data or self._file is None:
+            return
+        offset = time.monotonic_ns() - self._start
+        self._file.write(_FRAME.pack(direction, offset, len(data)))
+        self._file.write(data)
+        self.frames += 1
+        self.bytes_recorded += len(data)
+
+    def close(self):
+        """Flush and close the recording."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_recording(path: str) -> Iterator[Frame]:
+    """Yield the frames of a recording in order."""
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"{path}: not a session recording")
+        magic, version, _ = _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a session recording")
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported recording version {version}")
+
+        while True:
+            prefix = f.read(_FRAME.size)
+            if len(prefix) < _FRAME.size:
+                return  # End of file (a truncated trailing frame is ignored)
+            direction, offset, length = _FRAME.unpack(prefix)
+            data = f.read(length)
+            if len(data) < length:
+                return
+            yield Frame(direction, offset / 1e9, data)
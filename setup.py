@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """Setup configuration for CP437 Telnet Client."""
 
-from setuptools import setup, find_packages
+from setuptools import Extension, setup, find_packages
 
 with open("README.md", "r", encoding="utf-8") as fh:
     long_description = fh.read()
@@ -15,10 +15,11 @@ setup(
     long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/yourusername/cp437-telnet",
-    py_modules=["cp437_telnet"],
+    py_modules=["cp437_telnet", "cp437_tables", "cp437_tokens", "cp437_speedups", "cp437_filters", "cp437_macros", "cp437_pool", "cp437_screen", "cp437_script", "session_recorder", "multi_session"],
+    # Compiled decoder; optional, the pure-Python code is used without it
+    ext_modules=[Extension("_cp437_speedups", ["_cp437_speedups.c"], optional=True)],
     classifiers=[
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
         "Programming Language :: Python :: 3.11",
@@ -29,9 +30,9 @@ setup(
         "Topic :: Communications :: Conferencing",
         "Environment :: Console",
     ],
-    python_requires=">=3.8",
+    python_requires=">=3.9",
     install_requires=[
-        "telnetlib3>=1.0.4",
+        "telnetlib3>=5.0",
     ],
     entry_points={
         "console_scripts": [
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Unit tests for the streaming ANSI log diagnostics."""
+
+import os
+import tempfile
+import unittest
+
+from ansi_diagnostics import (
+    ANSIDiagnostics,
+    analyze_files,
+    analyze_shard,
+    expand_paths,
+    shard_ranges,
+)
+
+SAMPLE_LOG = (
+    "\x1b[2J\x1b[H\x1b[1;31mRed\x1b[0m\r\n"
+    "\x1b]0;title\x07\x1b(B\x1b[3A\x1b[K"
+    "text\rmore\x1bZ\x1b[12\n"
+    "\x1b[10;5H\x1b[2K\x1b[?25l"
+)
+
+
+def analyze(text, chunk_size):
+    diagnostics = ANSIDiagnostics("unused.log")
+    for i in range(0, len(text), chunk_size):
+        diagnostics.feed(text[i : i + chunk_size])
+    diagnostics.finish()
+    return diagnostics
+
+
+class TestANSIDiagnostics(unittest.TestCase):
+    """Test sequence statistics and issue detection."""
+
+    def test_counts(self):
+        """Test each sequence and issue kind is counted."""
+        diagnostics = analyze(SAMPLE_LOG, 4096)
+        self.assertEqual(
+            dict(diagnostics.sequence_counts), {"CSI": 9, "OSC": 1, "Charset": 1}
+        )
+        self.assertEqual(
+            dict(diagnostics.stats),
+            {
+                "Clear screen": 1,
+                "Absolute positioning": 2,
+                "Color/SGR": 2,
+                "Relative cursor moves": 1,
+                "Erase line": 2,
+            },
+        )
+        self.assertEqual(
+            dict(diagnostics.issues),
+            {
+                "cr_not_lf": 1,
+                "control_then_text": 2,
+                "orphaned_esc": 1,
+                "incomplete_csi": 1,
+            },
+        )
+        self.assertEqual(diagnostics.chars, len(SAMPLE_LOG))
+        self.assertEqual(diagnostics.lines, 2)
+
+    def test_chunk_boundaries_do_not_matter(self):
+        """Test sequences split across chunks are counted exactly once."""
+        expected = analyze(SAMPLE_LOG * 50, 1 << 20)
+        for chunk_size in (1, 2, 3, 7, 300):
+            with self.subTest(chunk_size=chunk_size):
+                diagnostics = analyze(SAMPLE_LOG * 50, chunk_size)
+                self.assertEqual(diagnostics.sequence_counts, expected.sequence_counts)
+                self.assertEqual(diagnostics.stats, expected.stats)
+                self.assertEqual(diagnostics.issues, expected.issues)
+                self.assertEqual(diagnostics.samples, expected.samples)
+
+    def test_issue_samples_are_bounded(self):
+        """Test only the first sample_limit locations are kept per issue."""
+        diagnostics = ANSIDiagnostics("unused.log", sample_limit=3)
+        diagnostics.feed("x\ry\n" * 100)
+        diagnostics.finish()
+        self.assertEqual(diagnostics.issues["cr_not_lf"], 100)
+        self.assertEqual(diagnostics.samples["cr_not_lf"], [(1, 1), (2, 5), (3, 9)])
+
+    def test_parse_log_keeps_bare_cr(self):
+        """Test reading a log file does not translate bare CRs."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "session.log")
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                f.write("\x1b[2Jone\rtwo\r\n")
+            diagnostics = ANSIDiagnostics(path, chunk_size=5)
+            diagnostics.parse_log()
+        self.assertEqual(diagnostics.issues["cr_not_lf"], 1)
+        self.assertEqual(diagnostics.stats["Clear screen"], 1)
+
+
+class TestBatchDiagnostics(unittest.TestCase):
+    """Test sharded and multi-file analysis."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = self.write("session.log", SAMPLE_LOG * 40)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmpdir.name, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        return path
+
+    def test_shards_start_on_newlines(self):
+        """Test every shard after the first begins at a line break."""
+        ranges = shard_ranges(self.path, 100)
+        self.assertGreater(len(ranges), 1)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertIsNone(ranges[-1][1])
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for (start, end), (next_start, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(end, next_start)
+            self.assertEqual(data[next_start : next_start + 1], b"\n")
+
+    def test_merged_shards_match_whole_file(self):
+        """Test merging shard reports reproduces a single-pass analysis."""
+        whole = ANSIDiagnostics(self.path)
+        whole.analyze_range()
+        merged = ANSIDiagnostics(self.path)
+        for start, end in shard_ranges(self.path, 100):
+            merged.merge(analyze_shard(self.path, start, end))
+        self.assertEqual(merged.to_dict(), whole.to_dict())
+
+    def test_expand_paths(self):
+        """Test directories are walked and duplicates dropped."""
+        other = self.write("sub/other.log", "\x1b[2J")
+        files = expand_paths(
+            [self.tmpdir.name, os.path.join(self.tmpdir.name, "*.log")]
+        )
+        self.assertEqual(sorted(files), sorted([self.path, other]))
+
+    def test_analyze_files(self):
+        """Test per-file reports and the merged total."""
+        other = self.write("other.log", "\x1b[2J\x1b[1m")
+        per_file, total = analyze_files([self.path, other], jobs=2, shard_size=100)
+        self.assertEqual([d.log_file for d in per_file], [self.path, other])
+        self.assertEqual(per_file[1].stats["Clear screen"], 1)
+        self.assertEqual(total.stats["Clear screen"], 41)
+        self.assertEqual(total.sequence_total, per_file[0].sequence_total + 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""Unit tests for the event-driven connect/negotiation phase."""
+
+import asyncio
+import time
+import unittest
+
+import telnetlib3
+from telnetlib3.telopt import BINARY, DO, ECHO, IAC, NAWS, SB, SE, SGA, WILL
+
+from cp437_telnet import FastConnectClient, format_timings
+
+BANNER = b"\x1b[2JWelcome\r\n"
+
+
+async def connect(handler, deadline: float = 5.0):
+    """Connect a FastConnectClient to a local server run by handler."""
+    server = await asyncio.start_server(handler, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    started = time.monotonic()
+    reader, writer = await telnetlib3.open_connection(
+        "127.0.0.1",
+        port,
+        client_factory=FastConnectClient,
+        encoding=False,
+        force_binary=True,
+        cols=132,
+        rows=50,
+        connect_minwait=0.0,
+        connect_maxwait=deadline,
+    )
+    elapsed = time.monotonic() - started
+    return server, reader, writer, elapsed
+
+
+class TestFastConnect(unittest.TestCase):
+    """Test the session starts when negotiation settles, not after a sleep."""
+
+    def test_negotiating_server(self):
+        """Test connect completes once BINARY/SGA/NAWS settle, NAWS carries our size."""
+
+        async def run():
+            reply = asyncio.get_running_loop().create_future()
+
+            async def handler(r, w):
+                w.write(
+                    IAC
+                    + DO
+                    + NAWS
+                    + IAC
+                    + WILL
+                    + SGA
+                    + IAC
+                    + WILL
+                    + ECHO
+                    + IAC
+                    + DO
+                    + BINARY
+                    + IAC
+                    + WILL
+                    + BINARY
+                )
+                data = b""
+                while IAC + SE not in data:
+                    data += await r.read(100)
+                reply.set_result(data)
+                w.write(BANNER)
+                await w.drain()
+
+            server, reader, writer, elapsed = await connect(handler)
+            banner = await asyncio.wait_for(reader.readexactly(len(BANNER)), 5)
+            timings = writer.protocol.timings()
+            writer.close()
+            server.close()
+            return elapsed, banner, await reply, timings
+
+        elapsed, banner, reply, timings = asyncio.run(run())
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(banner, BANNER)
+        # NAWS: width 132, height 50
+        self.assertIn(IAC + SB + NAWS + b"\x00\x84\x00\x32" + IAC + SE, reply)
+        self.assertIsNotNone(timings["first_byte_seconds"])
+        self.assertLessEqual(timings["negotiation_seconds"], elapsed)
+
+    def test_data_ends_negotiation(self):
+        """Test a server that just sends output is connected at once, output kept."""
+
+        async def run():
+            async def handler(r, w):
+                w.write(BANNER)
+                await w.drain()
+                await asyncio.sleep(10)
+
+            server, reader, writer, elapsed = await connect(handler)
+            banner = await asyncio.wait_for(reader.readexactly(len(BANNER)), 5)
+            writer.close()
+            server.close()
+            return elapsed, banner
+
+        elapsed, banner = asyncio.run(run())
+        self.assertLess(elapsed, 1.0)
+        self.assertEqual(banner, BANNER)
+
+    def test_silent_server_hits_deadline(self):
+        """Test a server that neither negotiates nor sends waits out the deadline."""
+
+        async def run():
+            async def handler(r, w):
+                await asyncio.sleep(10)
+
+            server, reader, writer, elapsed = await connect(handler, deadline=0.3)
+            timings = writer.protocol.timings()
+            writer.close()
+            server.close()
+            return elapsed, timings
+
+        elapsed, timings = asyncio.run(run())
+        self.assertGreaterEqual(elapsed, 0.25)
+        self.assertLess(elapsed, 2.0)
+        self.assertIsNone(timings["first_byte_seconds"])
+
+    def test_plain_reader_falls_back(self):
+        """Test a reader without first-data timing still connects, at the latest by the deadline."""
+
+        class PlainReaderClient(FastConnectClient):
+            _reader_factory = telnetlib3.TelnetReader
+
+        async def run():
+            async def handler(r, w):
+                w.write(BANNER)
+                await w.drain()
+                await asyncio.sleep(10)
+
+            server = await asyncio.start_server(handler, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            started = time.monotonic()
+            reader, writer = await telnetlib3.open_connection(
+                "127.0.0.1",
+                port,
+                client_factory=PlainReaderClient,
+                encoding=False,
+                force_binary=True,
+                connect_minwait=0.0,
+                connect_maxwait=0.3,
+            )
+            elapsed = time.monotonic() - started
+            banner = await asyncio.wait_for(reader.readexactly(len(BANNER)), 5)
+            timings = writer.protocol.timings()
+            writer.close()
+            server.close()
+            return elapsed, banner, timings
+
+        elapsed, banner, timings = asyncio.run(run())
+        self.assertLess(elapsed, 2.0)
+        self.assertEqual(banner, BANNER)
+        self.assertIsNone(timings["first_byte_seconds"])
+        self.assertIsNotNone(timings["negotiation_seconds"])
+
+    def test_format_timings(self):
+        """Test the --stats line when either timing is missing."""
+        self.assertEqual(
+            format_timings({"negotiation_seconds": 0.0123, "first_byte_seconds": 0.5}),
+            "Negotiation took 0.012s, first byte after 0.500s",
+        )
+        self.assertEqual(
+            format_timings({"negotiation_seconds": None, "first_byte_seconds": None}),
+            "Negotiation took (none), first byte after (none)",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
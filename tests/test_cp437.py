@@ -1,14 +1,23 @@
 #!/usr/bin/env python3
 """Unit tests for CP437 encoding and decoding functions."""
 
+import codecs
+import io
 import os
 import sys
 import unittest
 
+import cp437_speedups
+import cp437_tables
+import cp437_tokens
+import cp437_translator
 from cp437_telnet import (
     CP437_MAP,
+    DECODER_ENGINES,
+    CP437IncrementalDecoder,
     UNICODE_TO_CP437,
     decode_cp437_graphical,
+    decode_cp437_graphical_buffered,
     encode_to_cp437,
 )
 
@@ -16,7 +25,20 @@ from cp437_telnet import (
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 
-class TestCP437Decoding(unittest.TestCase):
+class BackendTestCase(unittest.TestCase):
+    """Runs its tests with cp437_speedups switched to BACKEND."""
+
+    BACKEND = "python"
+
+    def setUp(self):
+        if self.BACKEND not in cp437_speedups.available():
+            self.skipTest(f"{self.BACKEND} backend is not built")
+        self.addCleanup(
+            cp437_speedups.use_backend, cp437_speedups.use_backend(self.BACKEND)
+        )
+
+
+class TestCP437Decoding(BackendTestCase):
     """Test CP437 to Unicode decoding."""
 
     def test_decode_smiley_face(self):
@@ -56,7 +78,7 @@ class TestCP437Decoding(unittest.TestCase):
         self.assertEqual(result, "A\u263aB")
 
 
-class TestCP437Encoding(unittest.TestCase):
+class TestCP437Encoding(BackendTestCase):
     """Test Unicode to CP437 encoding."""
 
     def test_encode_ascii(self):
@@ -97,6 +119,44 @@ class TestCP437Encoding(unittest.TestCase):
         decoded = decode_cp437_graphical(encoded)
         self.assertEqual(decoded, original)
 
+    def test_encode_matches_first_match_semantics(self):
+        """Test bulk encoding matches a per-character walk of the inverse map."""
+        text = "".join(chr(i) for i in range(0x2600))
+        expected = bytes(
+            (
+                UNICODE_TO_CP437[char]
+                if char in UNICODE_TO_CP437
+                else ord(char) if ord(char) < 256 else ord("?")
+            )
+            for char in text
+        )
+        self.assertEqual(encode_to_cp437(text), expected)
+
+    def test_encode_table_is_selected_by_value(self):
+        """Test an equal copy of a table encodes the same; others are rejected."""
+        table = "".join(list(cp437_tables.FULL_GLYPH_TABLE))
+        self.assertIsNot(table, cp437_tables.FULL_GLYPH_TABLE)
+        self.assertEqual(
+            cp437_tables.encode_cp437("\u25d8\u263a\u2502", table=table),
+            b"\x08\x01\xb3",
+        )  # ◘☺│
+        with self.assertRaises(ValueError):
+            cp437_tables.encode_cp437("x", table="x" * 256)
+
+    def test_encode_strict(self):
+        """Test errors='strict' raises on characters CP437 lacks."""
+        self.assertEqual(encode_to_cp437("\u2502\u00e9", errors="strict"), b"\xb3\x82")
+        with self.assertRaises(UnicodeEncodeError) as ctx:
+            encode_to_cp437("ab\u20ac", errors="strict")
+        self.assertEqual(ctx.exception.start, 2)
+
+    def test_encode_approximate(self):
+        """Test errors='approximate' substitutes CP437 look-alikes."""
+        text = "\u256d\u2501\u256e\u2026\u20ac"  # ╭━╮…€
+        self.assertEqual(
+            encode_to_cp437(text, errors="approximate"), b"\xda\xc4\xbf...?"
+        )
+
 
 class TestCP437Maps(unittest.TestCase):
     """Test CP437 mapping integrity."""
@@ -145,6 +205,202 @@ class TestCP437Maps(unittest.TestCase):
         for byte_val, unicode_char in graphical_low.items():
             self.assertEqual(CP437_MAP[byte_val], unicode_char)
 
+    def test_tables_match_cp437_codec(self):
+        """Test the frozen tables are the cp437 codec plus glyph overrides."""
+        standard = bytes(range(256)).decode("cp437")
+        for table in (
+            cp437_tables.CONTROL_PRESERVING_TABLE,
+            cp437_tables.FULL_GLYPH_TABLE,
+        ):
+            self.assertEqual(len(table), 256)
+            for byte_val in range(0x20, 0x7F):
+                self.assertEqual(table[byte_val], standard[byte_val])
+            self.assertEqual(table[0x80:], standard[0x80:])
+
+    def test_variants_differ_only_in_controls(self):
+        """Test the full-glyph variant only replaces BS, TAB, LF and CR."""
+        differing = [
+            byte_val
+            for byte_val in range(256)
+            if cp437_tables.CONTROL_PRESERVING_TABLE[byte_val]
+            != cp437_tables.FULL_GLYPH_TABLE[byte_val]
+        ]
+        self.assertEqual(differing, [0x08, 0x09, 0x0A, 0x0D])
+        self.assertEqual(cp437_translator.CP437_MAP[0x0A], "\u25d9")  # ◙
+        self.assertEqual(CP437_MAP[0x0A], "\n")
+
+    def test_shared_maps_are_read_only(self):
+        """Test no module can modify the shared maps."""
+        with self.assertRaises(TypeError):
+            CP437_MAP[0x01] = "?"
+        with self.assertRaises(TypeError):
+            UNICODE_TO_CP437["?"] = 0x01
+
+    def test_duplicate_glyphs_first_match(self):
+        """Test glyphs appearing twice encode to the lower byte."""
+        self.assertEqual(UNICODE_TO_CP437["\u2320"], 0x1E)  # ⌠ (also 0xF4)
+        self.assertEqual(
+            cp437_translator.encode_cp437("\u2321\u266a"), b"\x1f\x0d"
+        )  # ⌡♪
+
+
+class TestDecoderEngines(BackendTestCase):
+    """Test that every decoder engine matches the bytewise reference."""
+
+    SAMPLES = [
+        b"",
+        b"plain ascii text",
+        bytes(range(256)),
+        b"\x1b[1;31mRed\x1b[0m\r\n\xdb\xdb\xb0",
+        b"\x1b",
+        b"\x1b[",
+        b"\x1b[12;4",
+        b"\x1b[" + b"1" * 150,
+        b"\x1b]0;title\x07after",
+        b"\x1b]0;title\x1b\\after",
+        b"\x1b]0;unterminated",
+        b"\x1b]" + b"x" * 250,
+        b"\x1b(0lqqk\x1b(B",
+        b"\x1b(",
+        b"\x1b(Z",
+        b"\x1b7\x1b8",
+        b"\x01\x1b\x1b[A\x7f",
+    ]
+
+    def test_engines_match_reference(self):
+        """Test each engine returns the same text and incomplete tail."""
+        for data in self.SAMPLES:
+            expected = decode_cp437_graphical_buffered(data, engine="bytewise")
+            for name in DECODER_ENGINES:
+                with self.subTest(engine=name, data=data[:20]):
+                    self.assertEqual(
+                        decode_cp437_graphical_buffered(data, engine=name),
+                        expected,
+                    )
+
+    def test_engines_match_reference_on_splits(self):
+        """Test engines agree when the input is cut at every position."""
+        data = b"A\x1b[1;31mB\x1b]2;t\x07\x1b(0q\x1b[" + b"9" * 4 + b"H\x02"
+        for cut in range(len(data) + 1):
+            expected = decode_cp437_graphical_buffered(data[:cut], engine="bytewise")
+            for name in DECODER_ENGINES:
+                with self.subTest(engine=name, cut=cut):
+                    self.assertEqual(
+                        decode_cp437_graphical_buffered(data[:cut], engine=name),
+                        expected,
+                    )
+
+
+class TestIncrementalDecoder(BackendTestCase):
+    """Test the stateful cp437_graphical incremental decoder."""
+
+    def test_split_csi_sequence(self):
+        """Test a CSI sequence split across chunks is reassembled."""
+        decoder = CP437IncrementalDecoder()
+        self.assertEqual(decoder.decode(b"A\x1b[3"), "A")
+        self.assertEqual(decoder.decode(b"1mB"), "\x1b[31mB")
+
+    def test_split_at_every_position(self):
+        """Test chunked decoding matches one-shot decoding."""
+        data = b"\x01\x1b[1;31mX\x1b]0;t\x07\x1b(0q\x1b[2J\xdb"
+        expected = decode_cp437_graphical(data)
+        for cut in range(len(data) + 1):
+            decoder = CP437IncrementalDecoder()
+            text = decoder.decode(data[:cut]) + decoder.decode(data[cut:])
+            self.assertEqual(text, expected)
+
+    def test_final_flushes_incomplete_tail(self):
+        """Test an unterminated sequence is shown as glyphs at end of stream."""
+        decoder = CP437IncrementalDecoder()
+        self.assertEqual(decoder.decode(b"x\x1b["), "x")
+        self.assertEqual(decoder.decode(b"", final=True), "\u2194[")
+
+    def test_state_roundtrip_and_reset(self):
+        """Test getstate/setstate carry the pending tail, reset drops it."""
+        decoder = CP437IncrementalDecoder()
+        decoder.decode(b"\x1b[1")
+        state = decoder.getstate()
+        other = CP437IncrementalDecoder()
+        other.setstate(state)
+        self.assertEqual(other.decode(b"m"), "\x1b[1m")
+        decoder.reset()
+        self.assertEqual(decoder.getstate(), (b"", 0))
+
+    def test_codec_machinery(self):
+        """Test iterdecode and TextIOWrapper use the stateful decoder."""
+        chunks = [b"\x1b[3", b"1mX\x1b", b"]0;t\x07\x01"]
+        text = "".join(codecs.iterdecode(chunks, "cp437_graphical"))
+        self.assertEqual(text, "\x1b[31mX\x1b]0;t\x07\u263a")
+        stream = io.TextIOWrapper(
+            io.BytesIO(b"a\x1b[1mb\x02"), encoding="cp437_graphical"
+        )
+        self.assertEqual(stream.read(), "a\x1b[1mb\u263b")
+
+    def test_codec_encode_errors(self):
+        """Test the codec honors errors=, including cp437-approximate."""
+        text = "\u256d\u2500x\u2603"  # ╭─x☃
+        self.assertEqual(
+            text.encode("cp437_graphical", "cp437-approximate"), b"\xda\xc4x?"
+        )
+        self.assertEqual(text.encode("cp437_graphical", "replace"), b"?\xc4x?")
+        self.assertEqual(text.encode("cp437_graphical", "ignore"), b"\xc4x")
+        with self.assertRaises(UnicodeEncodeError):
+            text.encode("cp437_graphical")
+        encoder = codecs.getincrementalencoder("cp437_graphical")("cp437-approximate")
+        self.assertEqual(encoder.encode("\u256e"), b"\xbf")  # ╮ -> ┐
+        stream = io.BytesIO()
+        writer = codecs.getwriter("cp437_graphical")(stream, "replace")
+        writer.write("\u2603\u263a")  # ☃☺
+        self.assertEqual(stream.getvalue(), b"?\x01")
+
+
+class TestBackends(unittest.TestCase):
+    """Test backend selection and that the backends agree."""
+
+    def test_unknown_backend(self):
+        """Test an unknown backend name is rejected."""
+        with self.assertRaises(ValueError):
+            cp437_speedups.use_backend("rust")
+        self.assertIn(cp437_speedups.backend(), cp437_speedups.available())
+
+    @unittest.skipUnless("c" in cp437_speedups.available(), "c backend is not built")
+    def test_tokens_match(self):
+        """Test both backends produce the same tokens, text and tails."""
+        data = b"".join(TestDecoderEngines.SAMPLES)
+        results = []
+        self.addCleanup(cp437_speedups.use_backend, cp437_speedups.backend())
+        for backend in ("python", "c"):
+            cp437_speedups.use_backend(backend)
+            results.append(
+                [
+                    cp437_tokens.tokenize(data, cut, controls, offset=7)
+                    for cut in range(0, len(data), 13)
+                    for controls in (True, False)
+                ]
+                + [
+                    decode_cp437_graphical_buffered(sample)
+                    for sample in TestDecoderEngines.SAMPLES
+                ]
+            )
+        self.assertEqual(results[0], results[1])
+
+
+# The codec tests again, against the compiled backend (skipped if not built)
+class TestCP437DecodingCompiled(TestCP437Decoding):
+    BACKEND = "c"
+
+
+class TestCP437EncodingCompiled(TestCP437Encoding):
+    BACKEND = "c"
+
+
+class TestDecoderEnginesCompiled(TestDecoderEngines):
+    BACKEND = "c"
+
+
+class TestIncrementalDecoderCompiled(TestIncrementalDecoder):
+    BACKEND = "c"
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Unit tests for the streaming output filters."""
+
+import unittest
+
+from cp437_filters import (
+    CRLF,
+    ClearHome,
+    ColorDowngrade,
+    FilterChain,
+    build_filters,
+)
+from cp437_telnet import CP437IncrementalDecoder, decode_filtered
+from cp437_tokens import tokenize, tokens_text
+
+
+def run(token_filter, *reads, controls=False):
+    """Filter each read's tokens in turn; return the output text per read."""
+    return [
+        tokens_text(token_filter.filter(tokenize(data, controls=controls)[0]))
+        for data in reads
+    ]
+
+
+class TestClearHome(unittest.TestCase):
+    """Test homing the cursor after a clear screen."""
+
+    def test_bare_clear_is_homed(self):
+        """Test ESC[H is inserted right after a clear."""
+        self.assertEqual(run(ClearHome(), b"\x1b[2JMenu"), ["\x1b[2J\x1b[HMenu"])
+
+    def test_positioned_clear_is_left_alone(self):
+        """Test a clear followed by a cursor position is unchanged."""
+        self.assertEqual(
+            run(ClearHome(), b"\x1b[2J\x1b[5;1HMenu"), ["\x1b[2J\x1b[5;1HMenu"]
+        )
+
+    def test_home_elsewhere_in_read(self):
+        """Test a home later in the read does not hide the bare clear."""
+        self.assertEqual(
+            run(ClearHome(), b"\x1b[H\x1b[2JMenu"),
+            ["\x1b[H\x1b[2J\x1b[HMenu"],
+        )
+
+    def test_every_clear_is_checked(self):
+        """Test each clear in a read gets its own home."""
+        self.assertEqual(
+            run(ClearHome(), b"\x1b[2Ja\x1b[2J\x1b[Hb\x1b[2J"),
+            ["\x1b[2J\x1b[Ha\x1b[2J\x1b[Hb\x1b[2J"],
+        )
+
+    def test_clear_at_end_of_read(self):
+        """Test a clear ending one read is homed only if the next read does not position."""
+        self.assertEqual(
+            run(ClearHome(), b"a\x1b[2J", b"\x1b[5;1HMenu"),
+            ["a\x1b[2J", "\x1b[5;1HMenu"],
+        )
+        self.assertEqual(
+            run(ClearHome(), b"a\x1b[2J", b"Menu\x1b[2J", b"\x1b[H"),
+            ["a\x1b[2J", "\x1b[HMenu\x1b[2J", "\x1b[H"],
+        )
+        token_filter = ClearHome()
+        run(token_filter, b"\x1b[2J")
+        token_filter.reset()
+        self.assertEqual(run(token_filter, b"Menu"), ["Menu"])
+
+    def test_inserted_token_has_no_input_bytes(self):
+        """Test inserted tokens are marked with start == end."""
+        tokens = ClearHome().filter(tokenize(b"\x1b[2Jx")[0])
+        self.assertEqual(tokens[1][2:], (4, 4))
+
+
+class TestCRLF(unittest.TestCase):
+    """Test bare LF normalization."""
+
+    def test_bare_lf(self):
+        """Test CR is added only where missing."""
+        self.assertEqual(
+            run(CRLF(), b"a\nb\r\nc\n\n", controls=True), ["a\r\nb\r\nc\r\n\r\n"]
+        )
+
+    def test_cr_at_end_of_read(self):
+        """Test a CR ending one read pairs with an LF starting the next."""
+        self.assertEqual(run(CRLF(), b"a\r", b"\nb", controls=True), ["a\r", "\nb"])
+
+
+class TestColorDowngrade(unittest.TestCase):
+    """Test SGR color rewriting."""
+
+    def test_eight_colors(self):
+        """Test bright, 256-color and RGB colors map to basic ones."""
+        reads = [b"\x1b[1;91mA\x1b[104mB\x1b[38;5;196mC\x1b[48;2;0;0;255mD\x1b[0;32mE"]
+        self.assertEqual(
+            run(ColorDowngrade("8"), *reads),
+            ["\x1b[1;31mA\x1b[44mB\x1b[31mC\x1b[44mD\x1b[0;32mE"],
+        )
+
+    def test_mono(self):
+        """Test colors are dropped and other attributes kept."""
+        self.assertEqual(
+            run(ColorDowngrade("mono"), b"\x1b[1;31;44mA\x1b[32mB\x1b[0mC\x1b[mD"),
+            ["\x1b[1mAB\x1b[0mC\x1b[mD"],
+        )
+
+    def test_non_sgr_and_truncated(self):
+        """Test private or sub-parameter sequences pass through, truncated colors end the sequence."""
+        for text in (b"\x1b[>4;2m", b"\x1b[?1m", b"\x1b[38:5:196m"):
+            with self.subTest(text=text):
+                self.assertEqual(run(ColorDowngrade("8"), text), [text.decode()])
+        self.assertEqual(
+            run(ColorDowngrade("8"), b"\x1b[1;38;5mA\x1b[48;2;0;0mB\x1b[38mC"),
+            ["\x1b[1mABC"],
+        )
+
+    def test_unknown_mode(self):
+        """Test an unknown mode is rejected."""
+        with self.assertRaises(ValueError):
+            ColorDowngrade("256")
+
+
+class TestFilterChain(unittest.TestCase):
+    """Test composing filters and the decode stage."""
+
+    def test_build_filters(self):
+        """Test filters are built by name, in order."""
+        chain = build_filters(["clear-home", "crlf", "mono"])
+        self.assertEqual(
+            [type(f) for f in chain.filters], [ClearHome, CRLF, ColorDowngrade]
+        )
+        self.assertTrue(chain.needs_controls)
+        self.assertFalse(build_filters([]))
+        with self.assertRaises(ValueError):
+            build_filters(["bogus"])
+
+    def test_decode_filtered(self):
+        """Test decoding through a chain across reads."""
+        chain = build_filters(["clear-home", "crlf", "mono"])
+        decoder = CP437IncrementalDecoder()
+        reads = [b"\x1b[2", b"J\x1b[31mhi\n", b"\x1b[2Jyo\r", b"\n"]
+        text = "".join(decode_filtered(decoder, data, chain) for data in reads)
+        self.assertEqual(text, "\x1b[2J\x1b[Hhi\r\n\x1b[2J\x1b[Hyo\r\n")
+
+    def test_no_filters_is_plain_decode(self):
+        """Test an empty chain returns exactly the decoder's text."""
+        data = b"\x1b[2J\x1b[31m\xdb\n"
+        self.assertEqual(
+            decode_filtered(CP437IncrementalDecoder(), data, FilterChain()),
+            CP437IncrementalDecoder().decode(data),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Unit tests for keyboard input parsing and key remapping."""
+
+import unittest
+
+from cp437_telnet import (
+    ANSI_KEY_MAP,
+    KEY_PROFILES,
+    SYNCTERM_KEY_MAP,
+    KeySequenceParser,
+)
+
+
+class TestKeySequenceParser(unittest.TestCase):
+    """Test incremental parsing of terminal key sequences."""
+
+    def test_plain_text_passes_through(self):
+        """Test text without escapes is returned unchanged."""
+        parser = KeySequenceParser(SYNCTERM_KEY_MAP)
+        self.assertEqual(parser.feed("hello world\r"), "hello world\r")
+        self.assertEqual(parser.pending, "")
+
+    def test_remaps_function_keys(self):
+        """Test mapped CSI sequences are translated."""
+        parser = KeySequenceParser(SYNCTERM_KEY_MAP)
+        self.assertEqual(parser.feed("\x1b[2~\x1b[5~\x1b[6~"), "\x1b[@\x1b[V\x1b[U")
+
+    def test_unmapped_sequences_pass_through(self):
+        """Test arrow keys and unknown sequences are sent unchanged."""
+        parser = KeySequenceParser(ANSI_KEY_MAP)
+        self.assertEqual(parser.feed("\x1b[A\x1bOP\x1b[24~"), "\x1b[A\x1bOP\x1b[24~")
+
+    def test_sequence_split_across_reads(self):
+        """Test a sequence cut off at a read boundary is completed later."""
+        parser = KeySequenceParser(SYNCTERM_KEY_MAP)
+        self.assertEqual(parser.feed("ab\x1b[2"), "ab")
+        self.assertEqual(parser.pending, "\x1b[2")
+        self.assertEqual(parser.feed("~c"), "\x1b[@c")
+
+    def test_lone_escape_flushed(self):
+        """Test a lone ESC is held until flush() sends it as-is."""
+        parser = KeySequenceParser(SYNCTERM_KEY_MAP)
+        self.assertEqual(parser.feed("\x1b"), "")
+        self.assertEqual(parser.flush(), "\x1b")
+        self.assertEqual(parser.pending, "")
+
+    def test_overlong_csi_is_cut(self):
+        """Test a CSI without terminator is given up after 10 chars."""
+        parser = KeySequenceParser(SYNCTERM_KEY_MAP)
+        self.assertEqual(parser.feed("\x1b[" + "1" * 12), "\x1b[" + "1" * 12)
+
+
+class TestKeyMapLayering(unittest.TestCase):
+    """Test terminal profiles and user-supplied maps."""
+
+    def test_profile_sequences(self):
+        """Test profile entries are full sequences resolved by the trie."""
+        parser = KeySequenceParser(SYNCTERM_KEY_MAP, KEY_PROFILES["putty"])
+        self.assertEqual(parser.feed("\x1b[[A\x1bOB\x1b[2~"), "\x1bOP\x1b[B\x1b[@")
+
+    def test_waits_inside_longer_mapped_sequence(self):
+        """Test input ending on a mapped prefix waits for more input."""
+        parser = KeySequenceParser(SYNCTERM_KEY_MAP, KEY_PROFILES["putty"])
+        self.assertEqual(parser.feed("\x1b[["), "")
+        self.assertEqual(parser.feed("B"), "\x1bOQ")
+
+    def test_later_maps_override(self):
+        """Test later maps win, whichever key form they use."""
+        parser = KeySequenceParser(ANSI_KEY_MAP, {"\x1b[2~": "INS"})
+        self.assertEqual(parser.feed("\x1b[2~"), "INS")
+
+    def test_escape_prefixed_legacy_keys(self):
+        """Test single-character legacy keys also match after a bare ESC."""
+        parser = KeySequenceParser(SYNCTERM_KEY_MAP)
+        self.assertEqual(parser.feed("\x1bH\x1bF"), "\x1b[H\x1b[F")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""Unit tests for compiled keystroke macros."""
+
+import asyncio
+import unittest
+
+from cp437_macros import (
+    EXPECT,
+    SEND,
+    WAIT,
+    MacroTimeout,
+    OutputWatcher,
+    compile_macro,
+    compile_macros,
+    macro_key,
+    run_macro,
+)
+from cp437_telnet import parse_macro_keys
+
+
+class TestCompileMacro(unittest.TestCase):
+    """Test compiling macro text into steps."""
+
+    def test_plain_text_is_paced(self):
+        """Test each plain character is sent on its own with the key delay after it."""
+        self.assertEqual(
+            compile_macro("ab\r", 0.01).steps,
+            [
+                (SEND, "a"),
+                (WAIT, 0.01),
+                (SEND, "b"),
+                (WAIT, 0.01),
+                (SEND, "\r"),
+            ],
+        )
+
+    def test_burst_sends_plain_text_at_once(self):
+        """Test burst=True sends a run of plain characters as a single send."""
+        steps = compile_macro("sysop\rsecret\r", 0.01, burst=True).steps
+        self.assertEqual(steps, [(SEND, "sysop\rsecret\r")])
+
+    def test_keys_are_paced(self):
+        """Test with burst=True named keys are still sent on their own, delay after them."""
+        steps = compile_macro("ab{up}{up}c", 0.05, burst=True).steps
+        self.assertEqual(
+            steps,
+            [
+                (SEND, "ab\x1b[A"),
+                (WAIT, 0.05),
+                (SEND, "\x1b[A"),
+                (WAIT, 0.05),
+                (SEND, "c"),
+            ],
+        )
+
+    def test_no_delay_coalesces_everything(self):
+        """Test a zero key delay sends keys and text in one write."""
+        self.assertEqual(
+            compile_macro("{down}{down}x{enter}", 0).steps, [(SEND, "\x1b[B\x1b[Bx\r")]
+        )
+
+    def test_vim_keys_and_prefix(self):
+        """Test --bell macros: Ctrl+G first, h/j/k/l as arrows."""
+        steps = compile_macro("jx", 0, vim_keys=True, prefix="\x07").steps
+        self.assertEqual(steps, [(SEND, "\x07\x1b[Bx")])
+        self.assertEqual(compile_macro("jx", 0).steps, [(SEND, "jx")])
+
+    def test_wait_expect_and_timeout(self):
+        """Test explicit waits, expects and the expect timeout."""
+        steps = compile_macro(
+            "{expect Name:}sysop{enter}{wait 0.5}{timeout 3}{expect Password:}pw{{1}", 0
+        ).steps
+        self.assertEqual(
+            steps,
+            [
+                (EXPECT, "Name:", 10.0),
+                (SEND, "sysop\r"),
+                (WAIT, 0.5),
+                (EXPECT, "Password:", 3.0),
+                (SEND, "pw{1}"),
+            ],
+        )
+
+    def test_names_ignore_case(self):
+        """Test {Enter} and {UP} are the named keys, not literal text."""
+        self.assertEqual(
+            compile_macro("{Enter}{UP}{Wait 0.5}x", 0).steps,
+            [(SEND, "\r\x1b[A"), (WAIT, 0.5), (SEND, "x")],
+        )
+
+    def test_bad_commands(self):
+        """Test unknown or malformed commands are rejected at compile time."""
+        for text in (
+            "{bogus}",
+            "{Bogus}",
+            "{wait}",
+            "{wait soon}",
+            "{timeout -1}",
+            "{expect}",
+        ):
+            with self.subTest(text=text), self.assertRaises(ValueError):
+                compile_macro(text)
+
+    def test_parse_macro_keys_compatible(self):
+        """Test the old per-key parser still maps vim keys."""
+        self.assertEqual(parse_macro_keys("hjx"), ["\x1b[D", "\x1b[B", "x"])
+
+
+class TestMacroKeys(unittest.TestCase):
+    """Test binding macros to keys."""
+
+    def test_key_specs(self):
+        """Test ^B and ctrl-b style specs."""
+        self.assertEqual(macro_key("^B"), "\x02")
+        self.assertEqual(macro_key("ctrl-b"), "\x02")
+        self.assertEqual(macro_key("Ctrl+T"), "\x14")
+        for spec in (
+            "B",
+            "^]",
+            "ctrl-",
+            "^1",
+            "^[",
+            "ctrl-[",
+            "^M",
+            "ctrl-j",
+            "^H",
+            "^I",
+        ):
+            with self.subTest(spec=spec), self.assertRaises(ValueError):
+                macro_key(spec)
+
+    def test_compile_macros(self):
+        """Test bindings and the bell macro are keyed by trigger character."""
+        programs = compile_macros({"^B": "hi"}, 0, bell_macro="k")
+        self.assertEqual(sorted(programs), ["\x02", "\x07"])
+        self.assertEqual(programs["\x07"].steps, [(SEND, "\x07\x1b[A")])
+        self.assertEqual(programs["\x02"].name, "^B")
+        programs = compile_macros({"^B": "hi"}, 0.01, bell_macro="kx")
+        self.assertEqual(
+            programs["\x02"].steps, [(SEND, "h"), (WAIT, 0.01), (SEND, "i")]
+        )
+        self.assertEqual(
+            programs["\x07"].steps, [(SEND, "\x07\x1b[A"), (WAIT, 0.01), (SEND, "x")]
+        )
+        programs = compile_macros({"^B": "hi"}, 0.01, burst=True)
+        self.assertEqual(programs["\x02"].steps, [(SEND, "hi")])
+
+    def test_conflicting_bindings(self):
+        """Test a ^G macro with --bell, or one key bound twice, is rejected."""
+        with self.assertRaisesRegex(ValueError, "--bell"):
+            compile_macros({"^G": "hi"}, 0, bell_macro="k")
+        with self.assertRaises(ValueError):
+            compile_macros({"^B": "hi", "ctrl-b": "there"})
+        self.assertEqual(sorted(compile_macros({"^G": "hi"})), ["\x07"])
+
+
+class TestRunMacro(unittest.TestCase):
+    """Test running compiled macros."""
+
+    def test_schedule_does_not_drift(self):
+        """Test sends are due at fixed offsets from the start."""
+        program = compile_macro("{up}" * 20, 0.01)
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            times = []
+            start = loop.time()
+            await run_macro(program, lambda text: times.append(loop.time() - start))
+            return times
+
+        times = asyncio.run(run())
+        self.assertEqual(len(times), 20)
+        # Each send is due at n * 10 ms; lateness must not accumulate
+        self.assertLess(times[-1], 0.19 + 0.05)
+        self.assertGreaterEqual(times[-1], 0.19 - 0.001)
+
+    def test_expect_waits_for_output(self):
+        """Test an expect matches text split across reads."""
+        program = compile_macro("x{expect Password:}pw{enter}")
+        watcher = OutputWatcher()
+        sent = []
+
+        async def run():
+            task = asyncio.create_task(run_macro(program, sent.append, watcher))
+            await asyncio.sleep(0.01)
+            before = list(sent)
+            for piece in ("\x1b[2JPass", "wo", "rd: "):
+                watcher.feed(piece)
+                await asyncio.sleep(0)
+            await asyncio.wait_for(task, 1)
+            return before
+
+        self.assertEqual(asyncio.run(run()), ["x"])
+        self.assertEqual(sent, ["x", "pw\r"])
+        self.assertEqual(watcher.window, "")
+
+    def test_prompt_during_key_delay(self):
+        """Test a prompt sent while the key delay before an expect runs is seen."""
+        program = compile_macro(
+            "sysop{enter}{expect Password:}secret", 0.01, burst=True
+        )
+        watcher = OutputWatcher()
+        sent = []
+
+        def send(text):
+            sent.append(text)
+            if text.endswith("\r"):
+                # The server answers on the next loop pass, inside the key delay
+                asyncio.get_running_loop().call_soon(watcher.feed, "Password: ")
+
+        asyncio.run(asyncio.wait_for(run_macro(program, send, watcher), 1))
+        self.assertEqual(sent, ["sysop\r", "secret"])
+        self.assertEqual(watcher.window, "")
+
+    def test_expect_timeout(self):
+        """Test an expect that never matches raises MacroTimeout."""
+        program = compile_macro("{timeout 0.05}{expect never}x")
+        sent = []
+        with self.assertRaises(MacroTimeout):
+            asyncio.run(run_macro(program, sent.append, OutputWatcher()))
+        self.assertEqual(sent, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
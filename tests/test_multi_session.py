@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Tests for the headless multi-session client against a local server."""
+
+import asyncio
+import os
+import tempfile
+import unittest
+
+import telnetlib3
+
+from multi_session import MultiSessionClient, parse_target
+from session_recorder import read_recording
+
+
+async def bbs_shell(reader, writer):
+    """Minimal BBS: a CP437 screen with a sequence split across writes."""
+    writer.write(b"\x01 hello \xdb\x1b[3")
+    await writer.drain()
+    await asyncio.sleep(0.01)
+    writer.write(b"1mX")
+    await asyncio.sleep(0.05)
+    writer.close()
+
+
+class TestMultiSessionClient(unittest.TestCase):
+    """Test many sessions in one event loop."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def run_client(self, count, **kwargs):
+        async def run():
+            server = await telnetlib3.create_server(
+                "127.0.0.1", 0, shell=bbs_shell, encoding=False
+            )
+            port = server.sockets[0].getsockname()[1]
+            client = MultiSessionClient([("127.0.0.1", port)] * count, **kwargs)
+            await client.run(duration=10)
+            server.close()
+            return client
+
+        return asyncio.run(run())
+
+    def test_sessions_logged_separately(self):
+        """Test each session gets its own decoded log and stats."""
+        client = self.run_client(5, log_dir=self.tmpdir.name, max_connecting=2)
+        stats = client.stats()
+        self.assertEqual(stats["status"], {"closed": 5})
+        self.assertEqual(len(os.listdir(self.tmpdir.name)), 5)
+        for session in client.sessions:
+            self.assertEqual(session.bytes_in, 15)
+            with open(session.log_file, encoding="utf-8") as f:
+                self.assertIn("☺ hello █\x1b[31mX", f.read())
+
+    def test_sessions_recorded(self):
+        """Test raw recordings keep the original bytes."""
+        client = self.run_client(2, record_dir=self.tmpdir.name)
+        for session in client.sessions:
+            data = b"".join(f.data for f in read_recording(session.record_file))
+            self.assertEqual(data, b"\x01 hello \xdb\x1b[31mX")
+
+    def test_connection_failure_is_reported(self):
+        """Test a refused connection marks only that session as failed."""
+
+        async def run():
+            client = MultiSessionClient([("127.0.0.1", 1)], connect_timeout=2)
+            await client.run(duration=5)
+            return client
+
+        stats = asyncio.run(run()).stats()
+        self.assertEqual(stats["status"], {"failed": 1})
+        self.assertTrue(stats["per_session"][0]["error"])
+
+    def test_parse_target(self):
+        """Test host and host:port targets."""
+        self.assertEqual(parse_target("bbs.example.com"), ("bbs.example.com", 23))
+        self.assertEqual(
+            parse_target("bbs.example.com:2323"), ("bbs.example.com", 2323)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
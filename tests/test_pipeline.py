@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Unit tests for adaptive read sizing and the bounded read pipeline."""
+
+import asyncio
+import io
+import threading
+import unittest
+
+from cp437_telnet import FrameRenderer, ReadPipeline, ReadSizer
+
+
+class FakeReader:
+    """Serves canned server output; read(n) returns up to n bytes."""
+
+    def __init__(self, data: bytes, error: Exception = None):
+        self.data = data
+        self.error = error
+        self.sizes = []
+
+    async def read(self, n: int) -> bytes:
+        await asyncio.sleep(0)
+        self.sizes.append(n)
+        if not self.data and self.error:
+            raise self.error
+        chunk, self.data = self.data[:n], self.data[n:]
+        return chunk
+
+
+class BlockingStream(io.BytesIO):
+    """BytesIO whose writes wait until released (a terminal that stopped reading)."""
+
+    def __init__(self):
+        super().__init__()
+        self.released = threading.Event()
+
+    def write(self, data):
+        self.released.wait()
+        return super().write(data)
+
+
+class TestReadSizer(unittest.TestCase):
+    """Test read size growth and shrinking."""
+
+    def test_grows_while_reads_are_full(self):
+        """Test full reads double the size up to the maximum."""
+        sizer = ReadSizer(4096, 32768)
+        self.assertEqual(
+            [sizer.update(sizer.size) for _ in range(5)],
+            [8192, 16384, 32768, 32768, 32768],
+        )
+
+    def test_shrinks_on_small_reads(self):
+        """Test reads under a quarter of the size halve it down to the minimum."""
+        sizer = ReadSizer(4096, 32768)
+        sizer.size = 32768
+        self.assertEqual(sizer.update(10000), 32768)
+        self.assertEqual([sizer.update(1) for _ in range(4)], [16384, 8192, 4096, 4096])
+
+    def test_bad_range(self):
+        """Test a minimum above the maximum is rejected."""
+        with self.assertRaises(ValueError):
+            ReadSizer(8192, 4096)
+
+
+class TestReadPipeline(unittest.TestCase):
+    """Test the network -> terminal pipeline."""
+
+    def test_delivers_everything_in_order(self):
+        """Test all data reaches handle() and reads grow under load."""
+        data = bytes(range(256)) * 4096
+        reader = FakeReader(data)
+        received = []
+        recorded = []
+
+        async def run():
+            pipeline = ReadPipeline(reader, received.append, on_read=recorded.append)
+            await pipeline.run()
+            return pipeline.stats()
+
+        stats = asyncio.run(run())
+        self.assertEqual(b"".join(received), data)
+        self.assertEqual(b"".join(recorded), data)
+        self.assertEqual(stats["bytes_read"], len(data))
+        self.assertEqual(stats["reads"], len(recorded))
+        self.assertEqual(reader.sizes[:4], [4096, 8192, 16384, 32768])
+        self.assertEqual(stats["max_read"], 256 * 1024)
+
+    def test_reading_stops_while_output_is_behind(self):
+        """Test the reader stalls at max_bytes until drain() returns."""
+        reader = FakeReader(b"x" * 100000)
+        released = asyncio.Event()
+        received = []
+
+        async def drain():
+            await released.wait()
+
+        async def run():
+            pipeline = ReadPipeline(
+                reader,
+                received.append,
+                drain=drain,
+                sizer=ReadSizer(1000, 1000),
+                max_bytes=5000,
+            )
+            task = asyncio.create_task(pipeline.run())
+            for _ in range(50):
+                await asyncio.sleep(0)
+            blocked = (len(received), pipeline.reads, pipeline.stats())
+            released.set()
+            await task
+            return blocked, pipeline.stats()
+
+        (handled, reads, blocked), stats = asyncio.run(run())
+        # One batch is being drained; at most max_bytes more were read
+        self.assertEqual(handled, 1)
+        self.assertEqual(blocked["queue_bytes"], 5000)
+        self.assertEqual(reads, 1 + 5)
+        self.assertEqual(blocked["stalls"], 1)
+        self.assertEqual(stats["bytes_read"], 100000)
+        self.assertEqual(stats["max_queue_bytes"], 5000)
+        self.assertLess(stats["batches"], stats["reads"])
+
+    def test_read_error_is_raised(self):
+        """Test a failed read ends the pipeline with that error."""
+        received = []
+
+        async def run():
+            await ReadPipeline(
+                FakeReader(b"abc", ConnectionResetError()), received.append
+            ).run()
+
+        with self.assertRaises(ConnectionResetError):
+            asyncio.run(run())
+        self.assertEqual(received, [b"abc"])
+
+
+class TestBackgroundRenderer(unittest.TestCase):
+    """Test FrameRenderer's writer thread."""
+
+    def test_drain_waits_for_the_terminal(self):
+        """Test drain() blocks while too much output is unwritten."""
+        stream = BlockingStream()
+
+        async def run():
+            renderer = FrameRenderer(0, stream=stream, background=True, output_limit=4)
+            renderer.write("hello")
+            drain = asyncio.create_task(renderer.drain())
+            await asyncio.sleep(0.05)
+            waiting = not drain.done()
+            stream.released.set()
+            await asyncio.wait_for(drain, 5)
+            renderer.write("!")
+            renderer.close()
+            return waiting, renderer.output_pending
+
+        waiting, pending = asyncio.run(run())
+        self.assertTrue(waiting)
+        self.assertEqual(pending, 0)
+        self.assertEqual(stream.getvalue(), b"hello!")
+
+    def test_foreground_drain_is_immediate(self):
+        """Test drain() without a writer thread returns at once."""
+
+        async def run():
+            output = io.BytesIO()
+            renderer = FrameRenderer(0, stream=output)
+            renderer.write("a")
+            await renderer.drain()
+            return output.getvalue()
+
+        self.assertEqual(asyncio.run(run()), b"a")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""Unit tests for the scripted session connection pool."""
+
+import asyncio
+import unittest
+
+from telnetlib3.telopt import IAC, NOP
+
+from cp437_pool import ConnectionPool
+from cp437_script import run_scripts
+
+
+class FakeBBS:
+    """Local server: asks for a name, then echoes each line back."""
+
+    def __init__(self, hang_up_after: int = 0):
+        self.connections = 0
+        self.received = b""
+        self.hang_up_after = hang_up_after
+        self.server = None
+        self.writers = []
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        self.writers.append(writer)
+        writer.write(b"Name: ")
+        lines = 0
+        try:
+            while True:
+                data = await reader.read(100)
+                if not data:
+                    break
+                self.received += data
+                for line in data.split(b"\r")[:-1]:
+                    writer.write(b"<" + line + b">\r\n")
+                    lines += 1
+                if self.hang_up_after and lines >= self.hang_up_after:
+                    break
+        finally:
+            writer.close()
+
+    def broadcast(self, data: bytes):
+        """Write data to every connection, as a sysop message would."""
+        for writer in self.writers:
+            writer.write(data)
+
+    def close(self):
+        self.server.close()
+
+
+async def login(session):
+    await session.expect("Name:")
+    session.sendline("sysop")
+    await session.expect("<sysop>")
+
+
+async def echo(session, text="hi"):
+    session.sendline(text)
+    await session.expect(f"<{text}>")
+    return text
+
+
+POOL_OPTIONS = dict(negotiate_timeout=0.1, keepalive_interval=None, idle_timeout=None)
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Test checkout/checkin and reuse."""
+
+    def test_reuse_after_checkin(self):
+        """Test a checked-in session is handed out again without reconnecting."""
+        bbs = FakeBBS()
+
+        async def run():
+            port = await bbs.start()
+            pool = ConnectionPool(login=login, **POOL_OPTIONS)
+            for _ in range(3):
+                async with pool.session("127.0.0.1", port) as session:
+                    await echo(session)
+            stats = pool.stats()
+            await pool.close()
+            bbs.close()
+            return stats
+
+        stats = asyncio.run(run())
+        self.assertEqual(bbs.connections, 1)
+        self.assertEqual((stats["misses"], stats["hits"], stats["created"]), (1, 2, 1))
+        self.assertGreater(stats["setup_seconds"], 0)
+        self.assertEqual(
+            stats["hosts"][next(iter(stats["hosts"]))],
+            {"open": 1, "idle": 1, "busy": 0},
+        )
+
+    def test_per_host_limit(self):
+        """Test at most max_per_host sessions are opened; others wait."""
+        bbs = FakeBBS()
+
+        async def run():
+            port = await bbs.start()
+            pool = ConnectionPool(login=login, max_per_host=2, **POOL_OPTIONS)
+            results = await run_scripts(echo, [("127.0.0.1", port)] * 6, pool=pool)
+            stats = pool.stats()
+            await pool.close()
+            bbs.close()
+            return results, stats
+
+        results, stats = asyncio.run(run())
+        self.assertEqual([entry.get("result") for entry in results], ["hi"] * 6)
+        self.assertEqual(bbs.connections, 2)
+        self.assertEqual(stats["hits"] + stats["misses"], 6)
+        self.assertGreater(stats["waits"], 0)
+
+    def test_error_discards_session(self):
+        """Test a session returned after an error is closed, not reused."""
+        bbs = FakeBBS()
+
+        async def run():
+            port = await bbs.start()
+            pool = ConnectionPool(login=login, **POOL_OPTIONS)
+            with self.assertRaises(RuntimeError):
+                async with pool.session("127.0.0.1", port):
+                    raise RuntimeError("script failed")
+            async with pool.session("127.0.0.1", port) as session:
+                await echo(session)
+            stats = pool.stats()
+            await pool.close()
+            bbs.close()
+            return stats
+
+        stats = asyncio.run(run())
+        self.assertEqual(bbs.connections, 2)
+        self.assertEqual(stats["misses"], 2)
+
+    def test_dead_session_is_replaced(self):
+        """Test an idle session the server hung up on is not handed out."""
+        bbs = FakeBBS(hang_up_after=2)
+
+        async def run():
+            port = await bbs.start()
+            pool = ConnectionPool(login=login, **POOL_OPTIONS)
+            async with pool.session("127.0.0.1", port) as session:
+                await echo(session)
+            await asyncio.sleep(0.1)
+            async with pool.session("127.0.0.1", port) as session:
+                await echo(session)
+            stats = pool.stats()
+            await pool.close()
+            bbs.close()
+            return stats
+
+        stats = asyncio.run(run())
+        self.assertEqual(bbs.connections, 2)
+        self.assertEqual(stats["hits"], 0)
+        # Both sessions were hung up on by the time they were checked in
+        self.assertEqual(stats["discarded"], 2)
+
+    def test_keepalive_and_idle_timeout(self):
+        """Test idle sessions get NOPs and are closed after idle_timeout."""
+        bbs = FakeBBS()
+
+        async def run():
+            port = await bbs.start()
+            pool = ConnectionPool(
+                login=login,
+                negotiate_timeout=0.1,
+                keepalive_interval=0.05,
+                idle_timeout=0.3,
+            )
+            async with pool.session("127.0.0.1", port) as session:
+                await echo(session)
+            await asyncio.sleep(0.2)
+            during = pool.stats()
+            await asyncio.sleep(0.3)
+            after = pool.stats()
+            await pool.close()
+            bbs.close()
+            return during, after
+
+        during, after = asyncio.run(run())
+        self.assertGreater(during["keepalives_sent"], 0)
+        self.assertIn(IAC + NOP, bbs.received)
+        self.assertEqual(after["discarded"], 1)
+        self.assertEqual(next(iter(after["hosts"].values()))["open"], 0)
+
+    def test_idle_output_is_dropped(self):
+        """Test output sent while a session is idle is not matched by the next user."""
+        bbs = FakeBBS()
+
+        async def run():
+            port = await bbs.start()
+            pool = ConnectionPool(login=login, **POOL_OPTIONS)
+            async with pool.session("127.0.0.1", port) as session:
+                await echo(session)
+            # A stale echo, then an escape sequence cut off mid-way
+            bbs.broadcast(b"*** System going down ***\r\n<hi>\r\n\x1b[1;3")
+            await asyncio.sleep(0.05)
+            async with pool.session("127.0.0.1", port) as session:
+                await echo(session)
+                before = session.before
+            stats = pool.stats()
+            await pool.close()
+            bbs.close()
+            return before, stats
+
+        before, stats = asyncio.run(run())
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(before, "")
+
+    def test_keepalive_waits_a_full_interval(self):
+        """Test a session is not sent a keepalive sooner than keepalive_interval after checkin."""
+        bbs = FakeBBS()
+
+        async def run():
+            port = await bbs.start()
+            # Wakes every 0.15 s for the idle timeout, before any keepalive is due
+            pool = ConnectionPool(
+                login=login,
+                negotiate_timeout=0.1,
+                keepalive_interval=0.2,
+                idle_timeout=0.15,
+            )
+            async with pool.session("127.0.0.1", port) as session:
+                await echo(session)
+            await asyncio.sleep(0.4)
+            stats = pool.stats()
+            await pool.close()
+            bbs.close()
+            return stats
+
+        stats = asyncio.run(run())
+        self.assertEqual(stats["keepalives_sent"], 0)
+        self.assertNotIn(IAC + NOP, bbs.received)
+        self.assertEqual(stats["discarded"], 1)
+
+    def test_keepalive_counts_from_checkin(self):
+        """Test a session checked in between wakeups gets its keepalive one interval later."""
+        bbs = FakeBBS()
+
+        async def run():
+            port = await bbs.start()
+            loop = asyncio.get_running_loop()
+            pool = ConnectionPool(
+                login=login,
+                negotiate_timeout=0.1,
+                keepalive_interval=0.2,
+                idle_timeout=None,
+            )
+            started = loop.time()
+            async with pool.session("127.0.0.1", port) as session:
+                await echo(session)
+                # Check in just after the pool would have woken at 0.2 s
+                await asyncio.sleep(max(0.0, started + 0.25 - loop.time()))
+            await asyncio.sleep(0.28)
+            stats = pool.stats()
+            await pool.close()
+            bbs.close()
+            return stats
+
+        stats = asyncio.run(run())
+        self.assertEqual(stats["keepalives_sent"], 1)
+
+    def test_bad_options(self):
+        """Test unknown keepalive commands and limits are rejected."""
+        with self.assertRaises(ValueError):
+            ConnectionPool(keepalive="ping")
+        with self.assertRaises(ValueError):
+            ConnectionPool(max_per_host=0)
+
+
+if __name__ == "__main__":
+    unittest.main()
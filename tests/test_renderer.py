@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Unit tests for the frame-paced terminal renderer."""
+
+import asyncio
+import io
+import unittest
+
+from cp437_screen import Screen
+from cp437_telnet import DiffRenderer, FrameRenderer, create_renderer
+
+MENU = (
+    "\x1b[2J\x1b[H\x1b[1;33;44mMain Menu\x1b[0m\r\n"
+    "\x1b[3;5H{0}M) Messages\x1b[0m"
+    "\x1b[4;5H{1}F) Files\x1b[0m"
+    "\x1b[6;1HSelection: "
+)
+SELECTED = "\x1b[1;37;44m"
+NORMAL = "\x1b[0;36m"
+
+
+class TestFrameRenderer(unittest.TestCase):
+    """Test output coalescing in FrameRenderer."""
+
+    def test_idle_write_is_immediate(self):
+        """Test a write after an idle period goes out at once (echo)."""
+
+        async def run():
+            output = io.BytesIO()
+            renderer = FrameRenderer(0.05, stream=output)
+            renderer.write("x")
+            return output.getvalue()
+
+        self.assertEqual(asyncio.run(run()), b"x")
+
+    def test_burst_is_coalesced_into_one_frame(self):
+        """Test writes inside one interval are written together as UTF-8."""
+
+        async def run():
+            output = io.BytesIO()
+            renderer = FrameRenderer(0.02, stream=output)
+            renderer.write("a")
+            for text in ("░", "\x1b[31m", "b"):
+                renderer.write(text)
+            before = output.getvalue()
+            await asyncio.sleep(0.05)
+            return before, output.getvalue(), renderer.frames
+
+        before, after, frames = asyncio.run(run())
+        self.assertEqual(before, b"a")
+        self.assertEqual(after, "a░\x1b[31mb".encode("utf-8"))
+        self.assertEqual(frames, 2)
+
+    def test_close_flushes_pending_frame(self):
+        """Test close() writes output still waiting for its frame."""
+
+        async def run():
+            output = io.BytesIO()
+            renderer = FrameRenderer(10.0, stream=output)
+            renderer.write("a")
+            renderer.write("b")
+            renderer.close()
+            return output.getvalue()
+
+        self.assertEqual(asyncio.run(run()), b"ab")
+
+    def test_zero_interval_writes_every_call(self):
+        """Test an interval of 0 disables coalescing."""
+
+        async def run():
+            output = io.BytesIO()
+            renderer = FrameRenderer(0, stream=output)
+            renderer.write("a")
+            renderer.write("b")
+            return output.getvalue(), renderer.frames
+
+        self.assertEqual(asyncio.run(run()), (b"ab", 2))
+
+
+class TestDiffRenderer(unittest.TestCase):
+    """Test screen-diff rendering."""
+
+    def render(self, frames, cols=40, rows=8):
+        output = io.BytesIO()
+        renderer = DiffRenderer(0, stream=output, cols=cols, rows=rows)
+        terminal = Screen(cols, rows)
+        written = []
+        for frame in frames:
+            renderer.write(frame)
+            data = output.getvalue()[sum(written) :]
+            written.append(len(data))
+            terminal.feed(data.decode("utf-8"))
+        return renderer, terminal, written
+
+    def assertSameScreen(self, terminal, screen):
+        self.assertEqual(terminal.chars, screen.chars)
+        self.assertEqual(terminal.attrs, screen.attrs)
+        self.assertEqual(terminal.cursor, screen.cursor)
+
+    def test_output_reproduces_screen(self):
+        """Test the terminal ends up showing exactly the server's screen."""
+        frames = [
+            MENU.format(SELECTED, NORMAL),
+            "x\r\n" * 10 + "\x1b[1;31mred\x1b[0m\x1b[2;3H\x1b[K",
+            "\x1b[3;10r\x1b[10;1H\r\nscrolled\x1b[r\x1b[5;5H\x1b[2P\x1b[1L",
+            "0123456789" * 5,
+        ]
+        renderer, terminal, _ = self.render(frames)
+        self.assertSameScreen(terminal, renderer.screen)
+
+    def test_repaint_writes_only_changes(self):
+        """Test repainting a menu costs only the changed cells."""
+        first = MENU.format(SELECTED, NORMAL)
+        second = MENU.format(NORMAL, SELECTED)
+        renderer, terminal, written = self.render([first, first, second])
+        self.assertSameScreen(terminal, renderer.screen)
+        self.assertEqual(written[1], 0)
+        self.assertLess(written[2], len(second.encode("utf-8")) * 2 // 3)
+
+    def test_scroll_is_passed_on(self):
+        """Test a whole-screen scroll is sent as linefeeds, not a redraw."""
+        lines = "".join(f"line {i:02}\r\n" for i in range(8))
+        renderer, terminal, written = self.render([lines, "line 08\r\n"])
+        self.assertSameScreen(terminal, renderer.screen)
+        self.assertLess(written[1], 40)
+
+    def test_bell_is_passed_through(self):
+        """Test BEL reaches the terminal although it is not part of the screen."""
+        output = io.BytesIO()
+        renderer = DiffRenderer(0, stream=output)
+        renderer.write("\x07")
+        self.assertTrue(output.getvalue().endswith(b"\x07"))
+
+    def test_create_renderer(self):
+        """Test render modes select the renderer class."""
+        self.assertIs(
+            type(create_renderer("passthrough", 0, stream=io.BytesIO())), FrameRenderer
+        )
+        self.assertIs(
+            type(create_renderer("diff", 0, stream=io.BytesIO())), DiffRenderer
+        )
+        with self.assertRaises(ValueError):
+            create_renderer("bogus", 0, stream=io.BytesIO())
+
+
+if __name__ == "__main__":
+    unittest.main()
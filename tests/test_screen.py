@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""Unit tests for the in-memory terminal screen."""
+
+import os
+import tempfile
+import unittest
+
+from ansi_diagnostics import CursorTracker
+from cp437_screen import BOLD, DEFAULT_ATTR, Screen, apply_sgr
+from cp437_tokens import tokenize
+
+
+def screen_with(text, cols=10, rows=3, chunk_size=None):
+    screen = Screen(cols, rows)
+    step = chunk_size or len(text) or 1
+    for i in range(0, len(text), step):
+        screen.feed(text[i : i + step])
+    return screen
+
+
+class TestScreen(unittest.TestCase):
+    """Test cursor tracking and cell contents."""
+
+    def test_text_and_newlines(self):
+        """Test CR/LF move the cursor and the screen scrolls at the bottom."""
+        screen = screen_with("one\r\ntwo\r\nthree\r\nfour")
+        self.assertEqual(screen.display(), ["two", "three", "four"])
+        self.assertEqual(screen.cursor, (4, 2))
+
+    def test_autowrap(self):
+        """Test writing past the last column wraps only when more text follows."""
+        screen = screen_with("0123456789")
+        self.assertEqual(screen.cursor, (9, 0))
+        screen.feed("ab")
+        self.assertEqual(screen.display(), ["0123456789", "ab", ""])
+        self.assertEqual(screen.cursor, (2, 1))
+
+    def test_relative_and_absolute_moves(self):
+        """Test CUP is 1-based and relative moves are clamped to the screen."""
+        screen = screen_with("\x1b[2;5H")
+        self.assertEqual(screen.cursor, (4, 1))
+        screen.feed("\x1b[3C\x1b[A\x1b[20D")
+        self.assertEqual(screen.cursor, (0, 0))
+        screen.feed("\x1b[99;99H")
+        self.assertEqual(screen.cursor, (9, 2))
+        screen.feed("\x1b7\x1b[H\x1b8")
+        self.assertEqual(screen.cursor, (9, 2))
+
+    def test_erase(self):
+        """Test erase in line and erase display."""
+        screen = screen_with("abcdef\x1b[1;3H\x1b[K")
+        self.assertEqual(screen.line(0), "ab        ")
+        screen.feed("\x1b[2J")
+        self.assertEqual(screen.display(), ["", "", ""])
+
+    def test_sgr_attributes(self):
+        """Test cells keep the colors they were written with."""
+        screen = screen_with("\x1b[1;31;44mA\x1b[0mB")
+        self.assertEqual(screen.cell(0, 0), ("A", BOLD | 1 | (4 << 4)))
+        self.assertEqual(screen.cell(1, 0), ("B", DEFAULT_ATTR))
+        self.assertEqual(apply_sgr(DEFAULT_ATTR, "38;5;9"), 9)
+
+    def test_scrolling_region(self):
+        """Test linefeeds scroll only inside the DECSTBM region."""
+        screen = screen_with("top\x1b[2;3r\x1b[2;1Hx\r\ny\r\nz", rows=3)
+        self.assertEqual(screen.display(), ["top", "y", "z"])
+
+    def test_split_sequences(self):
+        """Test escape sequences split across feeds are applied once."""
+        text = "\x1b[1;31mHi\x1b[2;4Hthere\x1b]0;title\x07!"
+        expected = screen_with(text)
+        for chunk_size in (1, 2, 3):
+            with self.subTest(chunk_size=chunk_size):
+                screen = screen_with(text, chunk_size=chunk_size)
+                self.assertEqual(screen.chars, expected.chars)
+                self.assertEqual(screen.attrs, expected.attrs)
+                self.assertEqual(screen.cursor, expected.cursor)
+
+    def test_nul_is_ignored(self):
+        """Test NUL padding neither fills a cell nor moves the cursor."""
+        screen = screen_with("ab\x00\x00c\x00")
+        self.assertEqual(screen.line(0), "abc       ")
+        self.assertEqual(screen.cursor, (3, 0))
+        tokens, _ = tokenize("ab\x00\x00c\x00".encode("cp437"))
+        screen = Screen(10, 3)
+        screen.feed_tokens(tokens)
+        self.assertEqual(screen.line(0), "abc       ")
+        self.assertEqual(screen.cursor, (3, 0))
+
+    def test_on_position(self):
+        """Test absolute positioning reports where the cursor came from."""
+        moves = []
+        screen = Screen(
+            80, 24, on_position=lambda before, after: moves.append((before, after))
+        )
+        screen.feed("abc\r\n\x1b[10;20H")
+        self.assertEqual(moves, [((0, 1), (19, 9))])
+
+
+class TestCursorTracker(unittest.TestCase):
+    """Test jump detection on a replayed log."""
+
+    def test_jumps_follow_relative_moves(self):
+        """Test a jump is measured from the real cursor position."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "session.log")
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                # Text and newlines move the cursor to row 20 before the CUP
+                f.write("x\r\n" * 19 + "\x1b[20;1H\x1b[1;1H")
+            tracker = CursorTracker(path, chunk_size=7)
+            tracker.analyze()
+        self.assertEqual(tracker.jump_count, 1)
+        self.assertEqual(tracker.jumps[0]["from"], (20, 1))
+        self.assertEqual(tracker.jumps[0]["to"], (1, 1))
+        self.assertEqual(tracker.screen.cursor, (0, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
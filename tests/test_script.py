@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Unit tests for the expect-style scripting API."""
+
+import asyncio
+import re
+import unittest
+
+from cp437_script import (
+    ExpectEOF,
+    ExpectTimeout,
+    Literal,
+    Regex,
+    ScriptSession,
+    run_scripts,
+)
+
+
+class ChunkReader:
+    """Returns canned reads one at a time, then EOF (or waits forever)."""
+
+    def __init__(self, *chunks: bytes, hang: bool = False):
+        self.chunks = list(chunks)
+        self.hang = hang
+
+    async def read(self, n: int) -> bytes:
+        await asyncio.sleep(0)
+        if self.chunks:
+            return self.chunks.pop(0)
+        if self.hang:
+            await asyncio.sleep(3600)
+        return b""
+
+
+class SentWriter:
+    """Collects what was written."""
+
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data: bytes):
+        self.data += data
+
+    def close(self):
+        pass
+
+
+def expect(session, patterns, timeout=5.0):
+    return asyncio.run(session.expect(patterns, timeout))
+
+
+class TestExpect(unittest.TestCase):
+    """Test matching server output."""
+
+    def test_literal_split_across_reads_and_colors(self):
+        """Test a prompt split by reads and SGR sequences still matches."""
+        session = ScriptSession(
+            ChunkReader(b"\x1b[2JWelcome\r\nPass", b"\x1b[1;33mwo", b"rd\x1b[0m: "),
+            SentWriter(),
+        )
+        self.assertEqual(expect(session, "Password:"), 0)
+        self.assertEqual(session.before, "Welcome\r\n")
+        self.assertEqual(session.match, "Password:")
+        self.assertEqual(session.buffer, " ")
+
+    def test_raw_mode_keeps_escapes(self):
+        """Test plain=False matches the decoded stream including escapes."""
+        session = ScriptSession(ChunkReader(b"a\x1b[1mb"), SentWriter(), plain=False)
+        expect(session, "\x1b[1mb")
+        self.assertEqual(session.before, "a")
+
+    def test_cp437_glyphs(self):
+        """Test output is decoded as CP437 before matching."""
+        session = ScriptSession(ChunkReader(b"\xc9\xcd\xbb"), SentWriter())
+        expect(session, "╔═╗")  # ╔═╗
+
+    def test_earliest_match_wins(self):
+        """Test the pattern matching earliest in the output is returned."""
+        session = ScriptSession(
+            ChunkReader(b"Unknown user 42. Password:"), SentWriter()
+        )
+        index = expect(session, [Literal("Password:"), Regex(r"Unknown user (\d+)")])
+        self.assertEqual(index, 1)
+        self.assertEqual(session.match.group(1), "42")
+        self.assertEqual(
+            expect(session, [Literal("Password:"), re.compile(r"Unknown")]), 0
+        )
+
+    def test_search_is_incremental(self):
+        """Test many small reads are not re-scanned from the start."""
+        chunks = [b"x" * 10] * 500 + [b"READY"]
+        session = ScriptSession(ChunkReader(*chunks), SentWriter())
+        expect(session, "READY")
+        total = 10 * 500 + 5
+        self.assertLess(session.chars_scanned, total + 5 * len(chunks))
+
+    def test_timeout(self):
+        """Test ExpectTimeout when nothing matches in time."""
+        session = ScriptSession(ChunkReader(b"hello", hang=True), SentWriter())
+        with self.assertRaises(ExpectTimeout):
+            expect(session, "bye", timeout=0.05)
+        self.assertEqual(session.buffer, "hello")
+
+    def test_eof(self):
+        """Test ExpectEOF when the connection closes first."""
+        session = ScriptSession(ChunkReader(b"bye"), SentWriter())
+        with self.assertRaises(ExpectEOF):
+            expect(session, "never")
+
+    def test_send_encodes_cp437(self):
+        """Test send() and sendline() write CP437 bytes."""
+        writer = SentWriter()
+        session = ScriptSession(ChunkReader(), writer)
+        session.send("█")  # █
+        session.sendline("go")
+        self.assertEqual(writer.data, b"\xdbgo\r")
+
+
+class TestRunScripts(unittest.TestCase):
+    """Test running scripts against many servers at once."""
+
+    def test_concurrent_logins(self):
+        """Test each target runs the script; failures are reported per target."""
+
+        async def handler(r, w):
+            w.write(b"\x1b[2J\x1b[1mName:\x1b[0m ")
+            name = (await r.readuntil(b"\r")).strip()
+            w.write(b"Hello " + name + b"!\r\n")
+            await w.drain()
+            w.close()
+
+        async def script(session):
+            await session.expect("Name:")
+            session.sendline("sysop")
+            await session.expect(Regex(r"Hello (\w+)!"))
+            return session.match.group(1)
+
+        async def run():
+            servers = [
+                await asyncio.start_server(handler, "127.0.0.1", 0) for _ in range(3)
+            ]
+            targets = [
+                ("127.0.0.1", server.sockets[0].getsockname()[1]) for server in servers
+            ]
+            # Nothing listens on port 1
+            results = await run_scripts(
+                script, targets + [("127.0.0.1", 1)], negotiate_timeout=0.2
+            )
+            for server in servers:
+                server.close()
+            return results
+
+        results = asyncio.run(run())
+        self.assertEqual([entry.get("result") for entry in results[:3]], ["sysop"] * 3)
+        self.assertIn("error", results[3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""Unit tests for SessionLogger (direct and background modes)."""
+
+import gzip
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import cp437_telnet
+from cp437_telnet import SessionLogger
+
+
+class SessionLoggerTestCase(unittest.TestCase):
+    """Base class providing a temporary log path."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "session.log")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def read_log(self, path=None):
+        with open(path or self.path, encoding="utf-8") as f:
+            return f.read()
+
+
+class TestSessionLogger(SessionLoggerTestCase):
+    """Test header, footer and content of session logs."""
+
+    def test_direct_mode(self):
+        """Test chunks are written with header and footer."""
+        logger = SessionLogger(self.path)
+        logger.log("\x1b[31m☺hello")
+        logger.close()
+        content = self.read_log()
+        self.assertTrue(content.startswith("=== Session started at "))
+        self.assertIn("\x1b[31m☺hello", content)
+        self.assertIn("=== Session ended at ", content)
+
+    def test_close_is_idempotent(self):
+        """Test closing twice writes a single footer."""
+        logger = SessionLogger(self.path)
+        logger.close()
+        logger.close()
+        self.assertEqual(self.read_log().count("Session ended"), 1)
+
+    def test_background_mode(self):
+        """Test queued chunks reach the file in order before the footer."""
+        logger = SessionLogger(self.path, background=True, batch_interval=0.01)
+        for i in range(100):
+            logger.log(f"line {i}\n")
+        logger.close()
+        content = self.read_log()
+        self.assertIn("line 0\nline 1\n", content)
+        self.assertLess(content.index("line 99"), content.index("Session ended"))
+        stats = logger.stats()
+        self.assertEqual(stats["bytes_dropped"], 0)
+        self.assertEqual(stats["bytes_written"], len(content.encode("utf-8")))
+
+    def test_background_drops_when_queue_full(self):
+        """Test chunks over the queue limit are dropped and counted."""
+        logger = SessionLogger(self.path, background=True, queue_limit=64)
+        logger.log("x" * 100)
+        logger.close()
+        self.assertEqual(logger.stats()["chunks_dropped"], 1)
+        self.assertEqual(logger.stats()["bytes_dropped"], 100)
+        self.assertIn("Session ended", self.read_log())
+
+    def test_invalid_options(self):
+        """Test unknown fsync policies and compressions are rejected."""
+        with self.assertRaises(ValueError):
+            SessionLogger(self.path, fsync="sometimes")
+        with self.assertRaises(ValueError):
+            SessionLogger(self.path, compress="lzma")
+
+
+class TestSessionLoggerRotation(SessionLoggerTestCase):
+    """Test size based rotation and segment compression."""
+
+    def test_rotate_by_size(self):
+        """Test segments are moved aside once they reach rotate_size."""
+        logger = SessionLogger(self.path, rotate_size=100)
+        logger.log("a" * 150)
+        logger.log("b" * 10)
+        logger.close()
+        self.assertIn("a" * 150, self.read_log(self.path + ".1"))
+        self.assertIn("b" * 10, self.read_log())
+        self.assertIn("Session ended", self.read_log())
+
+    def test_rotate_with_gzip(self):
+        """Test rotated segments are gzip-compressed in background mode."""
+        logger = SessionLogger(
+            self.path, background=True, rotate_size=10, compress="gzip"
+        )
+        logger.log("a" * 150)
+        time.sleep(0.05)  # Let the writer thread take the first batch
+        logger.log("b")
+        logger.close()
+        self.assertGreaterEqual(logger.stats()["segments"], 1)
+        rotated = ""
+        for n in range(1, logger.stats()["segments"] + 1):
+            self.assertFalse(os.path.exists(f"{self.path}.{n}"))
+            with gzip.open(f"{self.path}.{n}.gz", "rt", encoding="utf-8") as f:
+                rotated += f.read()
+        self.assertIn("a" * 150, rotated)
+        self.assertIn("Session ended", self.read_log())
+
+    def test_compression_off_the_calling_thread(self):
+        """Test direct mode compresses rotated segments on a worker thread."""
+        started = threading.Event()
+        release = threading.Event()
+        threads = []
+        compress_file = cp437_telnet._compress_file
+
+        def slow_compress(path, method):
+            threads.append(threading.current_thread())
+            started.set()
+            release.wait(5)
+            compress_file(path, method)
+
+        with mock.patch.object(cp437_telnet, "_compress_file", slow_compress):
+            logger = SessionLogger(self.path, rotate_size=10, compress="gzip")
+            logger.log("a" * 150)
+            logger.log("b")  # Rotates; must not wait for the compression
+            self.assertTrue(started.wait(5))
+            logger.log("c")
+            self.assertIn("c", self.read_log())
+            release.set()
+            logger.close()
+        self.assertNotIn(threading.current_thread(), threads)
+        # The header fills segment 1, so the a's are rotated out as segment 2
+        with gzip.open(self.path + ".2.gz", "rt", encoding="utf-8") as f:
+            self.assertEqual(f.read(), "a" * 150)
+
+
+if __name__ == "__main__":
+    unittest.main()
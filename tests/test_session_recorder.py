@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Unit tests for raw session recordings and replay."""
+
+import asyncio
+import io
+import os
+import tempfile
+import unittest
+
+from cp437_telnet import FrameRenderer, replay_session
+from session_recorder import CLIENT, SERVER, SessionRecorder, read_recording
+
+
+class RecordingTestCase(unittest.TestCase):
+    """Base class providing a temporary recording path."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "session.rec")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def record(self, frames):
+        recorder = SessionRecorder(self.path)
+        for direction, data in frames:
+            recorder.record(direction, data)
+        recorder.close()
+
+
+class TestSessionRecorder(RecordingTestCase):
+    """Test the binary recording format."""
+
+    def test_roundtrip(self):
+        """Test frames are read back in order with direction and data."""
+        self.record([(SERVER, b"\x1b[2J\x01"), (CLIENT, b"x"), (SERVER, b"\xdb")])
+        frames = list(read_recording(self.path))
+        self.assertEqual(
+            [(f.direction, f.data) for f in frames],
+            [(SERVER, b"\x1b[2J\x01"), (CLIENT, b"x"), (SERVER, b"\xdb")],
+        )
+        timestamps = [f.timestamp for f in frames]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_empty_data_is_not_recorded(self):
+        """Test empty chunks do not produce frames."""
+        self.record([(SERVER, b"")])
+        self.assertEqual(list(read_recording(self.path)), [])
+
+    def test_rejects_other_files(self):
+        """Test files without the recording header are rejected."""
+        with open(self.path, "wb") as f:
+            f.write(b"=== Session started ===\n")
+        with self.assertRaises(ValueError):
+            list(read_recording(self.path))
+
+
+class TestReplay(RecordingTestCase):
+    """Test replaying recordings through the decoder."""
+
+    def test_unthrottled_replay(self):
+        """Test server frames are decoded, split sequences included."""
+        self.record([(SERVER, b"A\x1b[3"), (CLIENT, b"q"), (SERVER, b"1m\x01")])
+        output = io.BytesIO()
+
+        async def run():
+            renderer = FrameRenderer(0, stream=output)
+            return await replay_session(self.path, speed=0, renderer=renderer)
+
+        stats = asyncio.run(run())
+        self.assertEqual(output.getvalue(), "A\x1b[31m☺".encode("utf-8"))
+        self.assertEqual(stats["frames"], 2)
+        self.assertEqual(stats["bytes"], 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
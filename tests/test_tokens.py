@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Unit tests for the CP437 ANSI tokenizer."""
+
+import unittest
+
+from cp437_screen import Screen
+from cp437_telnet import CP437IncrementalDecoder, decode_cp437_graphical_buffered
+from cp437_tokens import (
+    CHARSET,
+    CONTROL,
+    CSI,
+    OSC,
+    TEXT,
+    csi_params,
+    csi_private,
+    tokenize,
+    tokenize_into,
+    tokens_text,
+)
+
+SESSION = (
+    b"\x1b[2J\x1b[H\x1b[1;31m\xdb\xb0Red\x1b[0m\r\n"
+    b"\x1b]0;title\x07\x1b(B\x1b[?25l\x1b[10;5H\x01\x1b7x\x1b[K\x08\t"
+)
+
+
+class TestTokenize(unittest.TestCase):
+    """Test token kinds, text and offsets."""
+
+    def test_token_kinds(self):
+        """Test each kind of token is recognized with its byte offsets."""
+        tokens, tail = tokenize(b"\x1b[1;31mA\xdb\r\n\x1b]2;t\x07\x1b(0")
+        self.assertEqual(tail, b"")
+        self.assertEqual(
+            tokens,
+            [
+                (CSI, "\x1b[1;31m", 0, 7),
+                (TEXT, "A\u2588", 7, 9),  # █
+                (CONTROL, "\r", 9, 10),
+                (CONTROL, "\n", 10, 11),
+                (OSC, "\x1b]2;t\x07", 11, 17),
+                (CHARSET, "\x1b(0", 17, 20),
+            ],
+        )
+
+    def test_offsets_slice_the_input(self):
+        """Test start/end address the bytes each token came from."""
+        tokens, _ = tokenize(SESSION)
+        self.assertEqual(
+            b"".join(SESSION[start:end] for _, _, start, end in tokens), SESSION
+        )
+
+    def test_controls_stay_in_text(self):
+        """Test controls=False keeps controls inside text runs."""
+        tokens, _ = tokenize(b"ab\r\ncd\x1b[m", controls=False)
+        self.assertEqual(tokens, [(TEXT, "ab\r\ncd", 0, 6), (CSI, "\x1b[m", 6, 9)])
+
+    def test_incomplete_tail(self):
+        """Test an unfinished sequence is returned as the tail."""
+        tokens, tail = tokenize(b"hi\x1b[12;", offset=100)
+        self.assertEqual(tokens, [(TEXT, "hi", 100, 102)])
+        self.assertEqual(tail, b"\x1b[12;")
+
+    def test_csi_params(self):
+        """Test CSI parameters are parsed on demand."""
+        self.assertEqual(csi_params("\x1b[10;5H"), (10, 5))
+        self.assertEqual(csi_params("\x1b[;5H"), (None, 5))
+        self.assertEqual(csi_params("\x1b[H"), ())
+        self.assertEqual(csi_params("\x1b[38:5:9m"), (38,))
+        self.assertEqual(csi_params("\x1b[?25l"), (25,))
+        self.assertEqual(csi_private("\x1b[?25l"), "?")
+        self.assertEqual(csi_private("\x1b[2J"), "")
+
+    def test_tokenize_into_returns_tail_index(self):
+        """Test tokenize_into stops at stop and reports where the tail starts."""
+        buffer = bytearray(b"xx" + SESSION + b"\x1b[12;" + b"\0" * 8)
+        stop = len(buffer) - 8
+        tokens = []
+        index = tokenize_into(tokens, buffer, 2, stop, True, -2)
+        expected, tail = tokenize(SESSION + b"\x1b[12;")
+        self.assertEqual(tokens, expected)
+        self.assertEqual(bytes(buffer[index:stop]), tail)
+
+    def test_string_decoder_is_token_text(self):
+        """Test the string decoder returns exactly the tokens' text."""
+        tokens, tail = tokenize(SESSION)
+        self.assertEqual(
+            decode_cp437_graphical_buffered(SESSION), (tokens_text(tokens), tail)
+        )
+
+
+class TestIncrementalTokens(unittest.TestCase):
+    """Test tokens from the incremental decoder."""
+
+    def test_offsets_are_stream_positions(self):
+        """Test split sequences come out whole, with stream offsets."""
+        expected, _ = tokenize(SESSION)
+        escapes = [token for token in expected if token[0] != TEXT]
+        for chunk_size in (1, 2, 3, 5, 64):
+            with self.subTest(chunk_size=chunk_size):
+                decoder = CP437IncrementalDecoder()
+                tokens = []
+                for i in range(0, len(SESSION), chunk_size):
+                    tokens.extend(decoder.decode_tokens(SESSION[i : i + chunk_size]))
+                tokens.extend(decoder.decode_tokens(b"", final=True))
+                self.assertEqual(
+                    [token for token in tokens if token[0] != TEXT], escapes
+                )
+                self.assertEqual(tokens_text(tokens), tokens_text(expected))
+                for _, _, start, end in tokens:
+                    self.assertLess(start, end)
+
+    def test_carry_buffer_is_reused(self):
+        """Test carrying sequences over never replaces or grows the buffer."""
+        decoder = CP437IncrementalDecoder()
+        carry = decoder._carry
+        data = SESSION * 40 + b"\x1b]2;" + b"t" * 180 + b"\x07"
+        text = ""
+        for chunk_size in (7, 150, 199, 3):
+            for i in range(0, len(data), chunk_size):
+                text += decoder.decode(data[i : i + chunk_size])
+                self.assertIs(decoder._carry, carry)
+                self.assertEqual(len(carry), decoder.CARRY_SIZE)
+        self.assertEqual(text, CP437IncrementalDecoder().decode(data * 4))
+        self.assertEqual(decoder.pending, b"")
+
+    def test_unterminated_tail_at_end_of_stream(self):
+        """Test a tail that never completes is flushed as glyphs."""
+        decoder = CP437IncrementalDecoder()
+        self.assertEqual(decoder.decode_tokens(b"ok\x1b["), [(TEXT, "ok", 0, 2)])
+        self.assertEqual(
+            decoder.decode_tokens(b"", final=True),
+            [(TEXT, "\u2194", 2, 3), (TEXT, "[", 3, 4)],  # ↔ (ESC glyph)
+        )
+
+    def test_screen_from_tokens(self):
+        """Test a Screen fed tokens matches one fed the decoded text."""
+        from_text, from_tokens = Screen(20, 5), Screen(20, 5)
+        from_text.feed(CP437IncrementalDecoder().decode(SESSION * 3, final=True))
+        from_tokens.feed_tokens(
+            CP437IncrementalDecoder().decode_tokens(SESSION * 3, final=True)
+        )
+        self.assertEqual(from_tokens.chars, from_text.chars)
+        self.assertEqual(from_tokens.attrs, from_text.attrs)
+        self.assertEqual(from_tokens.cursor, from_text.cursor)
+
+
+if __name__ == "__main__":
+    unittest.main()